@@ -18,6 +18,19 @@ float vBuffer[BUF_SIZE];
 float iBuffer[BUF_SIZE];
 int bufIdx = 0;
 
+// oversampling per reading (binary mode trades this for rate)
+int oversample = 10;
+int settleUs = 100;
+
+// binary frame: sync, len, seq, v (10 mV), i (1 mA), f (Hz), crc8
+// host asks for it with BIN after seeing "bin" in the INFO reply
+const byte FRAME_SYNC = 0xA5;
+const byte FRAME_LEN = 7;
+const int FRAME_SIZE = 10;
+const unsigned long BIN_INTERVAL_US = 1000;
+bool binMode = false;
+byte frameSeq = 0;
+
 void countPulse() {
     pulses++;
 }
@@ -38,21 +51,21 @@ void setup() {
 
 float readVoltage() {
     long total = 0;
-    for (int i = 0; i < 10; i++) {
+    for (int i = 0; i < oversample; i++) {
         total += analogRead(VOLTAGE_PIN);
-        delayMicroseconds(100);
+        if (settleUs) delayMicroseconds(settleUs);
     }
-    float avg = total / 10.0;
+    float avg = total / (float)oversample;
     return (avg / 1023.0) * V_REF * V_DIVIDER;
 }
 
 float readCurrent() {
     long total = 0;
-    for (int i = 0; i < 10; i++) {
+    for (int i = 0; i < oversample; i++) {
         total += analogRead(CURRENT_PIN);
-        delayMicroseconds(100);
+        if (settleUs) delayMicroseconds(settleUs);
     }
-    float avg = total / 10.0;
+    float avg = total / (float)oversample;
     float v = (avg / 1023.0) * V_REF;
     return (v - I_OFFSET) / I_SENSITIVITY;
 }
@@ -112,6 +125,45 @@ void sendData() {
     Serial.println("}");
 }
 
+// CRC-8, poly 0x07, init 0
+byte crc8(const byte* data, int len) {
+    byte crc = 0;
+    for (int n = 0; n < len; n++) {
+        crc ^= data[n];
+        for (int b = 0; b < 8; b++) {
+            crc = (crc & 0x80) ? (byte)((crc << 1) ^ 0x07) : (byte)(crc << 1);
+        }
+    }
+    return crc;
+}
+
+void sendFrame() {
+    float v = readVoltage();
+    float i = readCurrent();
+    
+    vBuffer[bufIdx] = v;
+    iBuffer[bufIdx] = i;
+    bufIdx = (bufIdx + 1) % BUF_SIZE;
+    
+    // host derives P, R, WL, Vrms and Vpp itself
+    int vq = (int)constrain(round(v * 100.0), -32768L, 32767L);
+    int iq = (int)constrain(round(i * 1000.0), -32768L, 32767L);
+    unsigned int fq = (freq > 65535) ? 65535 : (unsigned int)freq;
+    
+    byte frame[FRAME_SIZE];
+    frame[0] = FRAME_SYNC;
+    frame[1] = FRAME_LEN;
+    frame[2] = frameSeq++;
+    frame[3] = vq & 0xFF;
+    frame[4] = (vq >> 8) & 0xFF;
+    frame[5] = iq & 0xFF;
+    frame[6] = (iq >> 8) & 0xFF;
+    frame[7] = fq & 0xFF;
+    frame[8] = (fq >> 8) & 0xFF;
+    frame[9] = crc8(frame + 1, FRAME_SIZE - 2);
+    Serial.write(frame, FRAME_SIZE);
+}
+
 void handleSerial() {
     if (Serial.available()) {
         String cmd = Serial.readStringUntil('\n');
@@ -121,11 +173,25 @@ void handleSerial() {
             Serial.println("PONG");
         }
         else if (cmd == "INFO") {
-            Serial.println("{\"device\":\"Board Tester\",\"version\":\"3.0\"}");
+            Serial.println("{\"device\":\"Board Tester\",\"version\":\"3.1\",\"bin\":1}");
+        }
+        else if (cmd == "BIN") {
+            Serial.println("OK");
+            binMode = true;
+            oversample = 2;
+            settleUs = 0;
+            frameSeq = 0;
+        }
+        else if (cmd == "JSON") {
+            binMode = false;
+            oversample = 10;
+            settleUs = 100;
+            Serial.println("OK");
         }
         else if (cmd == "RESET") {
             bufIdx = 0;
             pulses = 0;
+            frameSeq = 0;
             Serial.println("OK");
         }
     }
@@ -141,9 +207,16 @@ void loop() {
         lastCalc = millis();
     }
     
-    // send data every 50ms
+    // binary frames every 1ms, json every 50ms
     static unsigned long lastSend = 0;
-    if (millis() - lastSend >= 50) {
+    static unsigned long lastFrame = 0;
+    if (binMode) {
+        if (micros() - lastFrame >= BIN_INTERVAL_US) {
+            lastFrame = micros();
+            sendFrame();
+        }
+    }
+    else if (millis() - lastSend >= 50) {
         sendData();
         lastSend = millis();
     }
@@ -0,0 +1,511 @@
+# Acquisition pipeline, from serial bytes to the plots, stage by stage.
+#
+#   python benchmarks/bench_acquisition.py [--stages parser,latency] [--json]
+#                                          [--stream capture.bin] [--rates 1000,10000]
+#
+# stages:
+#   parser      SerialReader bytes -> sample blocks, json lines and binary
+#               frames at a few read sizes (and --stream, a raw capture of a
+#               port, replayed through the same reader), with and without
+#               Diagnostics recording, median of --repeat interleaved runs
+#   signals     cross-thread delivery to the gui thread: a data_received dict
+#               per sample vs batch_received blocks
+#   on_data     MainWindow._on_data / _on_batch cost per sample, idle and
+#               while recording a test
+#   plots       MainWindow._update_plots and the repaint after it, with the
+#               history buffer full at several sizes. fails (exit 1) when the
+#               frame p90 is over --frame-budget, 50 ms is the default 20 fps
+#   latency     VirtualDevice on a pty -> SerialWorker -> _on_batch, the age
+#               of every sample when it reaches the gui thread, with the
+#               window drawing at its normal frame rate
+# --json prints one json object, keep them to compare releases.
+# runs offscreen, no display needed. the latency stage needs a pty (linux)
+import gc
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from PyQt5.QtCore import QObject, QThread, QTimer, QEventLoop, pyqtSignal, pyqtSlot, PYQT_VERSION_STR
+from PyQt5.QtWidgets import QApplication
+
+from boardtester.core import (
+    SerialReader, FrameDecoder, SimulatedDevice, Diagnostics, SAMPLE_FIELDS
+)
+from boardtester.simulator import encode_frames, format_lines
+
+STAGES = ("parser", "signals", "on_data", "plots", "latency")
+
+TEST_DATA = {'name': "bench", 'board': "", 'serial': "", 'operator': "", 'notes': "",
+             'v_min': 0.0, 'v_max': 50.0, 'i_min': 0.0, 'i_max': 5.0, 'f_min': 0.0, 'f_max': 1000.0}
+
+
+def pct(values):
+    a = np.asarray(values, dtype=np.float64)
+    if not len(a):
+        return {}
+    p50, p90, p99 = np.percentile(a, (50, 90, 99))
+    return {'p50': float(p50), 'p90': float(p90), 'p99': float(p99), 'max': float(a.max())}
+
+
+def best_of(fn, repeat=3):
+    # fastest of a few runs, in seconds
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+
+class Feed:
+    # SimulatedDevice blocks with a steady clock, starting at t
+    def __init__(self, t, rate=10000):
+        self.dev = SimulatedDevice(rate=rate, seed=0)
+        self.t = t
+        self.rate = rate
+    
+    def restart(self, t):
+        self.t = t
+    
+    def __call__(self, n):
+        t = self.t + np.arange(1, n + 1) / self.rate
+        self.t = float(t[-1])
+        return self.dev._block(t)
+
+
+# --------------------------------
+# Parser
+# --------------------------------
+class Replay:
+    # stands in for the serial port: hands out data `chunk` bytes per read
+    is_open = True
+    
+    def __init__(self, data, chunk):
+        self.data = data
+        self.chunk = chunk
+        self.pos = 0
+    
+    @property
+    def in_waiting(self):
+        return min(self.chunk, len(self.data) - self.pos)
+    
+    def read(self, n):
+        self.pos += n
+        return self.data[self.pos - n:self.pos]
+    
+    def write(self, data):
+        pass
+
+
+def parse_stream(data, chunk, mode, diag=None):
+    # mode: 'json', 'binary' (frames from the first byte) or 'negotiate',
+    # json until the device advertises "bin" and acks BIN, like a live port
+    reader = SerialReader(None, binary=mode != 'json')
+    reader.ser = Replay(data, chunk)
+    reader.diag = diag
+    if mode == 'binary':
+        reader.decoder = FrameDecoder()
+    n = 0
+    while reader.waiting():
+        n += len(reader.read()['t'])
+    return n, reader
+
+
+def bench_parser(args):
+    rng = np.random.default_rng(0)
+    v = 12.0 + rng.normal(0, 0.02, args.samples)
+    i = 0.5 + rng.normal(0, 0.002, args.samples)
+    streams = {
+        'json': (b''.join(format_lines(v[:args.samples // 20], i[:args.samples // 20], 50.0)), 'json'),
+        'binary': (encode_frames(0, v, i, 50), 'binary'),
+    }
+    if args.stream:
+        with open(args.stream, 'rb') as fh:
+            streams['stream'] = (fh.read(), 'negotiate')
+    
+    results = []
+    for name, (data, mode) in streams.items():
+        for chunk in (64, 4096, 65536):
+            out = {}
+            # small reads of the whole stream take forever, a few thousand will do
+            part = data if mode == 'negotiate' else data[:chunk * 5000]
+            
+            def run(diag=None):
+                out['n'], out['reader'] = parse_stream(part, chunk, mode, diag)
+            
+            # interleaved, taking turns at going first and with the garbage of
+            # the previous run collected, so neither side gets the warm caches.
+            # single runs swing by a few % either way, compare the medians
+            times, times_diag = [], []
+            for k in range(args.repeat):
+                pair = [(times, run), (times_diag, lambda: run(Diagnostics()))]
+                for out_times, fn in pair[::1 if k % 2 else -1]:
+                    gc.collect()
+                    out_times.append(best_of(fn, 1))
+            dt, dt_diag = float(np.median(times)), float(np.median(times_diag))
+            decoder = out['reader'].decoder
+            results.append({
+                'stream': name, 'chunk': chunk, 'bytes': len(part), 'samples': out['n'],
+                'samples_per_s': out['n'] / dt, 'mb_per_s': len(part) / dt / 1e6,
+                'runs': args.repeat, 'diag_overhead_pct': (dt_diag / dt - 1) * 100,
+                'dropped': decoder.dropped if decoder else 0,
+                'bad_bytes': decoder.bad_bytes if decoder else 0,
+            })
+    return results
+
+
+# --------------------------------
+# Signals
+# --------------------------------
+class Emitter(QThread):
+    # what SerialWorker._flush does with a list of blocks
+    data_received = pyqtSignal(dict)
+    batch_received = pyqtSignal(object)
+    
+    def __init__(self, blocks, per_sample):
+        super().__init__()
+        self.blocks = blocks
+        self.per_sample = per_sample
+        self.sent = []
+    
+    def run(self):
+        for block in self.blocks:
+            if self.per_sample:
+                for row in zip(*(block[k].tolist() for k in SAMPLE_FIELDS)):
+                    self.sent.append(time.perf_counter())
+                    self.data_received.emit(dict(zip(SAMPLE_FIELDS, row)))
+            else:
+                self.sent.append(time.perf_counter())
+                self.batch_received.emit(block)
+
+
+class Receiver(QObject):
+    def __init__(self):
+        super().__init__()
+        self.arrived = []
+        self.samples = 0
+    
+    @pyqtSlot(dict)
+    def on_data(self, d):
+        self.arrived.append(time.perf_counter())
+        self.samples += 1
+    
+    @pyqtSlot(object)
+    def on_batch(self, b):
+        self.arrived.append(time.perf_counter())
+        self.samples += len(b['t'])
+
+
+def bench_signals(args, app):
+    feed = Feed(time.time())
+    results = []
+    # the dicts are made on the worker thread, from 2000 sample blocks
+    cases = (("data_received", 1, 2000, args.samples // 20), ("batch_received", 100, 100, args.samples),
+             ("batch_received", 2000, 2000, args.samples))
+    for signal, size, block, n in cases:
+        per_sample = signal == "data_received"
+        blocks = [feed(block) for _ in range(max(n // block, 1))]
+        total = sum(len(b['t']) for b in blocks)
+        
+        em = Emitter(blocks, per_sample)
+        rx = Receiver()
+        getattr(em, signal).connect(rx.on_data if per_sample else rx.on_batch)
+        t = time.perf_counter()
+        em.start()
+        while rx.samples < total:
+            app.processEvents()
+        dt = time.perf_counter() - t
+        em.wait()
+        
+        lat = (np.array(rx.arrived) - np.array(em.sent)) * 1000
+        results.append({
+            'signal': signal, 'batch': size, 'samples': total, 'emits': len(em.sent),
+            'us_per_sample': dt / total * 1e6, 'us_per_emit': dt / len(em.sent) * 1e6,
+            'latency_ms': pct(lat),
+        })
+    return results
+
+
+# --------------------------------
+# Window stages
+# --------------------------------
+def make_window(app):
+    import main
+    
+    win = main.MainWindow()
+    win.resize(1400, 900)
+    win.show()
+    deadline = time.time() + 30
+    while not (win.db_ready and win.plot_curves) and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+    if not (win.db_ready and win.plot_curves):
+        raise RuntimeError("window did not finish starting")
+    win.right_tabs.setCurrentWidget(win.graphs_tab)
+    return win
+
+
+def bench_on_data(args, app, win):
+    win.frames.stop()
+    feed = Feed(win.t0)
+    results = []
+    
+    def run(label, size, n, fn):
+        blocks = [feed(size) for _ in range(max(n // size, 1))]
+        t = time.perf_counter()
+        for b in blocks:
+            fn(b)
+        dt = time.perf_counter() - t
+        results.append({'case': label, 'batch': size, 'samples': len(blocks) * size,
+                        'us_per_sample': dt / (len(blocks) * size) * 1e6})
+    
+    def on_data(b):
+        # one dict per sample, the old data_received path
+        for row in zip(*(b[k].tolist() for k in SAMPLE_FIELDS)):
+            win._on_data(dict(zip(SAMPLE_FIELDS, row)))
+    
+    run("_on_data", 1000, args.samples // 20, on_data)
+    for size in (1, 100, 2000):
+        run("_on_batch", size, args.samples // (20 if size == 1 else 1), win._on_batch)
+    
+    win._begin_test(dict(TEST_DATA))
+    feed.restart(win.t0)
+    for size in (100, 2000):
+        run("_on_batch recording", size, args.samples, win._on_batch)
+    win._finish_test("ABORTED")
+    win.frames.start()
+    return results
+
+
+def bench_plots(args, app, win):
+    win.frames.stop()
+    feed = Feed(win.t0)
+    per_frame = feed.rate // 20
+    results = []
+    for size in args.sizes:
+        win.hist_spin.setValue(size)
+        win._set_history()
+        win.buf.clear()
+        win.pyramid.clear()
+        feed.restart(win.t0)
+        while len(win.buf) < size:
+            win._on_batch(feed(min(50000, size - len(win.buf))))
+        win._update_plots()
+        app.processEvents()
+        
+        update, frame = [], []
+        for _ in range(args.frames):
+            win._on_batch(feed(per_frame))
+            t = time.perf_counter()
+            win._update_plots()
+            t1 = time.perf_counter()
+            app.processEvents()
+            t2 = time.perf_counter()
+            update.append((t1 - t) * 1000)
+            frame.append((t2 - t) * 1000)
+        results.append({'history': size, 'frames': args.frames,
+                        'update_ms': pct(update), 'frame_ms': pct(frame)})
+    
+    win.hist_spin.setValue(200000)
+    win._set_history()
+    win.frames.start()
+    return results
+
+
+class Probe(QObject):
+    # connected after MainWindow._on_batch, so a sample's age includes it.
+    # the device's current is its own clock (see bench_latency)
+    def __init__(self, dev):
+        super().__init__()
+        self.dev = dev
+        self.on = False
+        self.ages = []
+        self.samples = 0
+    
+    @pyqtSlot(object)
+    def on_batch(self, b):
+        if not self.on:
+            return
+        now = time.monotonic() - self.dev._boot_at
+        self.ages.append(((now - b['I']) % 30.0) * 1000)
+        self.samples += len(b['I'])
+
+
+def bench_latency(args, app, win):
+    try:
+        from boardtester.simulator import VirtualDevice, Waveform
+    except ImportError as e:
+        return {'skipped': str(e)}
+    from main import SerialWorker
+    
+    def wait(seconds):
+        loop = QEventLoop()
+        QTimer.singleShot(int(seconds * 1000), loop.quit)
+        loop.exec_()
+    
+    # with the plots drawing, and with another tab in front (plots paused)
+    views = {'graphs': win.graphs_tab, 'hidden': win.stats_tab}
+    results = []
+    for view, tab in views.items():
+        win.right_tabs.setCurrentWidget(tab)
+        for rate in args.rates:
+            # current = seconds since boot (mod 30), to the 1 mA = 1 ms the frames carry
+            with VirtualDevice(rate=rate, i=Waveform('sawtooth', 15.0, 15.0, 1 / 30),
+                               v_noise=0.0, i_noise=0.0) as dev:
+                probe = Probe(dev)
+                worker = SerialWorker()
+                win._set_worker(worker)
+                worker.batch_received.connect(probe.on_batch)
+                worker.connect_to(dev.path)
+                
+                deadline = time.time() + 10
+                while time.time() < deadline and not (worker.reader and worker.reader.decoder):
+                    app.processEvents()
+                    time.sleep(0.001)
+                decoder = worker.reader.decoder if worker.reader else None
+                if decoder is None:
+                    worker.disconnect()
+                    results.append({'view': view, 'rate': rate, 'error': "no binary mode after 10 s"})
+                    continue
+                wait(0.5)
+                
+                first = (decoder.dropped, decoder.bad_bytes, dev.stats['skipped'])
+                probe.on = True
+                t = time.perf_counter()
+                wait(args.seconds)
+                dt = time.perf_counter() - t
+                probe.on = False
+                worker.disconnect()
+                
+                ages = np.concatenate(probe.ages) if probe.ages else []
+                results.append({
+                    'view': view, 'rate': rate, 'seconds': dt, 'samples': probe.samples,
+                    'samples_per_s': probe.samples / dt,
+                    'dropped': decoder.dropped - first[0],
+                    'bad_bytes': decoder.bad_bytes - first[1],
+                    'skipped': dev.stats['skipped'] - first[2],
+                    'age_ms': pct(ages),
+                })
+    win.right_tabs.setCurrentWidget(win.graphs_tab)
+    return results
+
+
+# --------------------------------
+# Report
+# --------------------------------
+def report(result):
+    if 'parser' in result:
+        print(f"\nparser (median of {result['parser'][0]['runs']})")
+        print(f"{'stream':<8} {'chunk':>6} {'samples/s':>12} {'MB/s':>8} {'diag %':>7} {'dropped':>8} {'bad':>6}")
+        for r in result['parser']:
+            print(f"{r['stream']:<8} {r['chunk']:>6} {r['samples_per_s']:>12.0f} {r['mb_per_s']:>8.1f}"
+                  f" {r['diag_overhead_pct']:>+7.1f} {r['dropped']:>8} {r['bad_bytes']:>6}")
+    
+    if 'signals' in result:
+        print("\nsignals, worker thread -> gui thread")
+        print(f"{'signal':<15} {'batch':>6} {'us/sample':>10} {'us/emit':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for r in result['signals']:
+            lat = r['latency_ms']
+            print(f"{r['signal']:<15} {r['batch']:>6} {r['us_per_sample']:>10.2f} {r['us_per_emit']:>9.1f}"
+                  f" {lat['p50']:>8.2f} {lat['p99']:>8.2f}")
+    
+    if 'on_data' in result:
+        print("\nMainWindow slots")
+        print(f"{'case':<20} {'batch':>6} {'us/sample':>10}")
+        for r in result['on_data']:
+            print(f"{r['case']:<20} {r['batch']:>6} {r['us_per_sample']:>10.2f}")
+    
+    if 'plots' in result:
+        print("\n_update_plots, ms per frame")
+        print(f"{'history':>9} {'update p50':>11} {'update p99':>11} {'frame p50':>10} {'frame p90':>10}"
+              f" {'frame p99':>10}")
+        for r in result['plots']:
+            u, f = r['update_ms'], r['frame_ms']
+            print(f"{r['history']:>9} {u['p50']:>11.2f} {u['p99']:>11.2f} {f['p50']:>10.2f} {f['p90']:>10.2f}"
+                  f" {f['p99']:>10.2f}")
+    
+    if 'latency' in result:
+        print("\nend to end, sample age at the gui thread")
+        lat = result['latency']
+        if isinstance(lat, dict):
+            print(f"skipped: {lat['skipped']}")
+            return
+        print(f"{'view':<7} {'rate':>6} {'samples/s':>10} {'dropped':>8} {'skipped':>8}"
+              f" {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for r in lat:
+            if 'error' in r:
+                print(f"{r['view']:<7} {r['rate']:>6} {r['error']}")
+                continue
+            a = r['age_ms'] or dict.fromkeys(('p50', 'p90', 'p99', 'max'), float('nan'))
+            print(f"{r['view']:<7} {r['rate']:>6} {r['samples_per_s']:>10.0f} {r['dropped']:>8} {r['skipped']:>8}"
+                  f" {a['p50']:>8.1f} {a['p90']:>8.1f} {a['p99']:>8.1f} {a['max']:>8.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--stages", default=",".join(STAGES), help=f"comma separated, from {', '.join(STAGES)}")
+    ap.add_argument("--samples", type=int, default=400000, help="samples per parser/slot case")
+    ap.add_argument("--repeat", type=int, default=15, help="runs per parser case, the median is kept")
+    ap.add_argument("--stream", help="raw capture of a port to replay through the parser")
+    ap.add_argument("--sizes", default="10000,100000,1000000", help="history sizes for the plots stage")
+    ap.add_argument("--frames", type=int, default=10, help="frames per history size")
+    ap.add_argument("--frame-budget", type=float, default=50.0, help="ms, plots stage frame p90 limit")
+    ap.add_argument("--rates", default="1000,10000,20000", help="device rates for the latency stage")
+    ap.add_argument("--seconds", type=float, default=3.0, help="seconds per latency run")
+    ap.add_argument("--json", action="store_true", help="print the results as json")
+    args = ap.parse_args()
+    
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    for s in stages:
+        if s not in STAGES:
+            ap.error(f"unknown stage {s}")
+    args.sizes = [int(s) for s in args.sizes.split(",")]
+    args.rates = [int(r) for r in args.rates.split(",")]
+    
+    app = QApplication(sys.argv)
+    result = {
+        'python': platform.python_version(), 'numpy': np.__version__, 'pyqt': PYQT_VERSION_STR,
+        'platform': platform.platform(), 'machine': platform.machine(),
+    }
+    if "parser" in stages:
+        result['parser'] = bench_parser(args)
+    if "signals" in stages:
+        result['signals'] = bench_signals(args, app)
+    
+    window_stages = [s for s in ("on_data", "plots", "latency") if s in stages]
+    if window_stages:
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            # the window opens test_records.db in the working directory
+            os.chdir(tmp)
+            try:
+                win = make_window(app)
+                for s in window_stages:
+                    result[s] = globals()[f"bench_{s}"](args, app, win)
+                win.close()
+            finally:
+                os.chdir(cwd)
+    
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        report(result)
+    
+    over = [r for r in result.get('plots', []) if r['frame_ms']['p90'] > args.frame_budget]
+    for r in over:
+        print(f"plots: history {r['history']} frame p90 {r['frame_ms']['p90']:.1f} ms"
+              f" over the {args.frame_budget:g} ms budget", file=sys.stderr)
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# Database call latency with a large tests table.
+#
+#   python benchmarks/bench_db.py [--rows 100000] [--repeat 20]
+#
+# compares the persistent connections against opening a fresh connection
+# per call, which is what Database used to do. the file is in WAL mode for
+# both, so the difference is connection setup and statement preparation.
+import os
+import sys
+import time
+import random
+import argparse
+import sqlite3
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from boardtester.core import Database
+
+# MainWindow.records_page, what RecordsModel fetches at a time
+PAGE = 50
+
+
+class PerCallDatabase(Database):
+    # new rollback-journal connection for every call, like before
+    def _conn(self):
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def close(self):
+        pass
+
+
+def make_record(n):
+    status = random.choice(["PASS", "PASS", "PASS", "FAIL", "ABORTED"])
+    rec = {
+        'name': f"Test_{n}", 'board': random.choice(["PSU-12", "CTRL-A", "DRV-3"]),
+        'serial_num': f"SN{n:08d}", 'operator': random.choice(["ana", "ben", "chen"]),
+        'start_time': "2024-01-01T08:00:00", 'end_time': "2024-01-01T08:01:00",
+        'duration': 60.0, 'status': status, 'notes': "", 'raw_data': "",
+        'v_violations': 0, 'i_violations': 0, 'f_violations': 0,
+    }
+    for k in "vipf":
+        rec[f"{k}_min"], rec[f"{k}_max"], rec[f"{k}_avg"] = 1.0, 2.0, 1.5
+    return rec
+
+
+def seed(path, rows):
+    db = Database(path)
+    with db._tx():
+        for n in range(rows):
+            db.save_test(make_record(n))
+    db.close()
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    return statistics.median(times), max(times)
+
+
+def run(db, repeat):
+    def refresh():
+        # what _load_records does for the records tab: first page and counters
+        db.get_page(limit=PAGE)
+        db.get_stats()
+    
+    last_id = max(db._conn().execute('SELECT MAX(id) FROM tests').fetchone()[0] or 0, PAGE)
+    
+    def scroll():
+        # RecordsModel.fetchMore from somewhere down the list
+        db.get_page(before=random.randint(PAGE, last_id), limit=PAGE)
+    
+    n = [0]
+    
+    def save():
+        n[0] += 1
+        db.save_test(make_record(10 ** 7 + n[0]))
+    
+    def get():
+        db.get_test(random.randint(1, 1000))
+    
+    return {
+        "records refresh": timed(refresh, repeat),
+        "records scroll": timed(scroll, repeat),
+        "get_stats": timed(db.get_stats, repeat),
+        "get_test": timed(get, repeat * 10),
+        "save_test": timed(save, repeat * 5),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        t = time.perf_counter()
+        seed(path, args.rows)
+        print(f"seeded {args.rows} rows in {time.perf_counter() - t:.1f}s\n")
+        
+        results = {}
+        for label, cls in (("per-call", PerCallDatabase), ("persistent", Database)):
+            db = cls(path)
+            results[label] = run(db, args.repeat)
+            db.close()
+        
+        print(f"{'call':<16} {'per-call ms':>16} {'persistent ms':>16}")
+        print(f"{'':<16} {'median / max':>16} {'median / max':>16}")
+        for call in results["persistent"]:
+            a = results["per-call"][call]
+            b = results["persistent"][call]
+            print(f"{call:<16} {a[0]:>7.2f} / {a[1]:<7.2f} {b[0]:>7.2f} / {b[1]:<7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Meter update rate, old always-restyle behaviour vs change-only rendering.
+#
+#   python benchmarks/bench_meter.py [--updates 20000]
+#
+# runs offscreen, no display needed
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+
+from main import Meter
+
+
+class LegacyMeter(Meter):
+    # what Meter did before: new text and a style sheet on every sample
+    def set_value(self, val, decimals=3):
+        self.value = val
+        self.value_lbl.setText(f"{val:.{decimals}f}")
+        self._check()
+    
+    def _check(self):
+        if self.min_th is None or self.max_th is None:
+            self.violation = False
+            return
+        
+        if self.value < self.min_th:
+            self.violation = True
+            self.status_lbl.setText("LOW")
+            self.status_lbl.setStyleSheet("""
+                background-color: #ffa500; color: black;
+                padding: 3px 10px; border-radius: 3px;
+                font-size: 10px; font-weight: bold;
+            """)
+        elif self.value > self.max_th:
+            self.violation = True
+            self.status_lbl.setText("HIGH")
+            self.status_lbl.setStyleSheet("""
+                background-color: #e94560; color: white;
+                padding: 3px 10px; border-radius: 3px;
+                font-size: 10px; font-weight: bold;
+            """)
+        else:
+            self.violation = False
+            self.status_lbl.setText("NORMAL")
+            self.status_lbl.setStyleSheet("""
+                background-color: #00a86b; color: white;
+                padding: 3px 10px; border-radius: 3px;
+                font-size: 10px; font-weight: bold;
+            """)
+
+
+def run(cls, values, app):
+    m = cls("VOLTAGE", "V", "#ff6b6b")
+    m.set_thresholds(10.0, 14.0)
+    m.show()
+    app.processEvents()
+    
+    t = time.perf_counter()
+    for v in values:
+        m.set_value(v)
+    app.processEvents()
+    dt = time.perf_counter() - t
+    m.close()
+    return len(values) / dt
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--updates", type=int, default=20000)
+    args = ap.parse_args()
+    
+    app = QApplication(sys.argv)
+    rng = np.random.default_rng(0)
+    n = args.updates
+    
+    cases = {
+        # steady reading, display text rarely changes
+        "steady": np.round(12.0 + rng.normal(0, 0.0002, n), 3).tolist(),
+        # noisy reading, new text every sample, state stays NORMAL
+        "noisy": (12.0 + rng.normal(0, 0.5, n)).tolist(),
+        # hovering around a limit, state flips often
+        "flapping": (14.0 + rng.normal(0, 0.2, n)).tolist(),
+    }
+    
+    print(f"{'case':<10} {'before':>12} {'after':>12} {'speedup':>8}")
+    for name, values in cases.items():
+        before = run(LegacyMeter, values, app)
+        after = run(Meter, values, app)
+        print(f"{name:<10} {before:>10.0f}/s {after:>10.0f}/s {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
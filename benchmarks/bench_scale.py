@@ -0,0 +1,144 @@
+# Database calls against a production-sized history: latency and memory.
+#
+#   python benchmarks/bench_scale.py [--rows 10000,100000,1000000] [--repeat 10]
+#                                    [--keep DIR] [--calls get_stats,search] [--json]
+#
+# every size gets a database from gen_history.py (kept in --keep DIR and
+# reused on the next run, a million tests take a few minutes to make).
+# each call reports median and max ms over up to --repeat runs (fewer when
+# a call is slow) and the peak python memory of one more run under
+# tracemalloc, i.e. the rows, dicts and strings it builds; sqlite's own page
+# cache isn't included. max_rss_mb is the process high-water mark so far.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from boardtester.core import Database
+from gen_history import generate, make_tests
+
+# seed of the records inserted by the save_test call
+SAVE_SEED = 12345
+
+
+def timed(fn, repeat, budget=10.0):
+    # ms per run, stops early once `budget` seconds are spent
+    times = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+        if time.perf_counter() - start > budget:
+            break
+    return times
+
+
+def peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def calls(db, rows, tmp, repeat):
+    # name -> callable, what the app does with the database
+    from main import ExportWorker
+    
+    # made up front, without legacy raw_data, so save_test times only the insert
+    new = iter([rec for rec, _ in make_tests(repeat + 1, legacy=0, seed=SAVE_SEED)])
+    
+    def save():
+        db.save_test(next(new))
+    
+    def export(**kw):
+        def run():
+            path = os.path.join(tmp, "export.csv" + (".gz" if kw.get('compress') else ""))
+            ExportWorker(db, path, **kw).run()
+            os.remove(path)
+        return run
+    
+    return {
+        'save_test': save,
+        'get_test': lambda: db.get_test(random.randint(1, rows)),
+        'get_stats': db.get_stats,
+        'get_page': lambda: db.get_page(),
+        'get_page search': lambda: db.get_page(query="P12"),
+        'search': lambda: db.search("P12"),
+        'search rare': lambda: db.search("reflowed"),
+        'filter_by_status': lambda: db.filter_by_status("FAIL"),
+        'get_all_tests': db.get_all_tests,
+        'export FAIL': export(status="FAIL"),
+        'export all': export(),
+        'export all gz': export(compress=True),
+    }
+
+
+def run_size(rows, args, tmp):
+    path = os.path.join(args.keep or tmp, f"history_{rows}.db")
+    made = None
+    if not os.path.exists(path):
+        t = time.perf_counter()
+        generate(path, rows, legacy=args.legacy)
+        made = time.perf_counter() - t
+    
+    db = Database(path)
+    result = {'rows': rows, 'file_mb': os.path.getsize(path) / 1e6, 'generate_s': made, 'calls': {}}
+    for name, fn in calls(db, rows, tmp, args.repeat).items():
+        if args.calls and name not in args.calls:
+            continue
+        times = timed(fn, args.repeat)
+        result['calls'][name] = {
+            'runs': len(times), 'median_ms': statistics.median(times), 'max_ms': max(times),
+            'peak_mb': peak_mb(fn),
+        }
+    db.close()
+    result['max_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if not args.keep:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", default="10000,100000,1000000")
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--legacy", type=float, default=0.01, help="see gen_history.py")
+    ap.add_argument("--keep", help="directory to keep the generated databases in")
+    ap.add_argument("--calls", help="comma separated, default all")
+    ap.add_argument("--json", action="store_true", help="print the results as json")
+    args = ap.parse_args()
+    args.calls = [c.strip() for c in args.calls.split(",")] if args.calls else None
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+    
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in (int(r) for r in args.rows.split(",")):
+            r = run_size(rows, args, tmp)
+            results.append(r)
+            if not args.json:
+                made = f", generated in {r['generate_s']:.0f}s" if r['generate_s'] else ""
+                print(f"\n{rows} tests, {r['file_mb']:.0f} MB{made}, max rss {r['max_rss_mb']:.0f} MB")
+                print(f"{'call':<18} {'median ms':>10} {'max ms':>10} {'peak MB':>9}")
+                for name, c in r['calls'].items():
+                    print(f"{name:<18} {c['median_ms']:>10.2f} {c['max_ms']:>10.2f} {c['peak_mb']:>9.1f}")
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
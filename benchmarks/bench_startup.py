@@ -0,0 +1,142 @@
+# Startup time, from process start to a usable window.
+#
+#   python benchmarks/bench_startup.py [--runs 5] [--rows 100000] [--json]
+#
+# every run is a fresh interpreter in a temp dir holding a test_records.db
+# with --rows tests. phases, in ms since the process started:
+#   deps        qt, numpy and the core imported
+#   import      `import main` done
+#   window      MainWindow() constructed
+#   paint       first paint of the window, what the operator sees
+#   ready       database open, ports listed and plots built
+#   records     first page of the records list loaded
+# main.py on its own is import - deps, reported as "main.py" after them.
+# runs offscreen, no display needed
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import py_compile
+import statistics
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from boardtester.core import Database
+from bench_db import make_record
+
+PHASES = ("deps", "import", "window", "paint", "ready", "records")
+
+CHILD = r'''
+import os, sys, time
+t0 = time.perf_counter()
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, ROOT)
+marks = {}
+import numpy
+import PyQt5.QtWidgets, PyQt5.QtCore, PyQt5.QtGui
+import boardtester.core
+marks["deps"] = time.perf_counter()
+import main
+marks["import"] = time.perf_counter()
+from PyQt5.QtCore import QObject, QEvent
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and "paint" not in marks:
+            marks["paint"] = time.perf_counter()
+        return False
+
+
+painted = FirstPaint()
+app.installEventFilter(painted)
+win = main.MainWindow()
+marks["window"] = time.perf_counter()
+win.show()
+
+
+def ready():
+    # attributes older versions don't have count as ready
+    return (getattr(win, "db_ready", True) and bool(getattr(win, "plot_curves", True))
+            and win.port_cb.count() > 0)
+
+
+deadline = time.perf_counter() + 60
+while time.perf_counter() < deadline and len(marks) < 6:
+    app.processEvents()
+    now = time.perf_counter()
+    if "ready" not in marks and ready():
+        marks["ready"] = now
+    if "records" not in marks and (ROWS == 0 or win.records_model.rowCount() > 0):
+        marks["records"] = now
+    time.sleep(0.001)
+print(json.dumps({k: (v - t0) * 1000 for k, v in marks.items()}))
+win.close()
+'''
+
+
+def seed(path, rows):
+    db = Database(path)
+    with db._tx():
+        for n in range(rows):
+            db.save_test(make_record(n))
+    db.close()
+
+
+def run_child(cwd, rows):
+    code = f"import json\nROOT = {ROOT!r}\nROWS = {rows}\n" + CHILD
+    t = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True)
+    wall = (time.perf_counter() - t) * 1000
+    lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+    if not lines:
+        raise RuntimeError(out.stderr.strip() or "no output from child")
+    marks = json.loads(lines[-1])
+    marks["process"] = wall
+    return marks
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--json", action="store_true", help="print the results as json")
+    args = ap.parse_args()
+    
+    # a fresh .pyc, as installed. without one main.py's import is mostly
+    # compiling it (PYTHONDONTWRITEBYTECODE or a read-only checkout)
+    py_compile.compile(os.path.join(ROOT, "main.py"))
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.rows:
+            seed(os.path.join(tmp, "test_records.db"), args.rows)
+        runs = [run_child(tmp, args.rows) for _ in range(args.runs)]
+    
+    result = {"rows": args.rows, "runs": args.runs, "phases": {}}
+    for phase in PHASES + ("process",):
+        values = [r[phase] for r in runs if phase in r]
+        if values:
+            result["phases"][phase] = {"median_ms": statistics.median(values), "max_ms": max(values)}
+    own = [r["import"] - r["deps"] for r in runs if "import" in r and "deps" in r]
+    if own:
+        result["main_import"] = {"median_ms": statistics.median(own), "max_ms": max(own)}
+    
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{args.runs} runs, {args.rows} tests in the database\n")
+    print(f"{'phase':<10} {'median ms':>10} {'max ms':>10}")
+    for phase, r in result["phases"].items():
+        print(f"{phase:<10} {r['median_ms']:>10.0f} {r['max_ms']:>10.0f}")
+    if "main_import" in result:
+        r = result["main_import"]
+        print(f"\n{'main.py':<10} {r['median_ms']:>10.1f} {r['max_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# Synthetic test history, for measuring the database at production sizes.
+#
+#   python benchmarks/gen_history.py history.db --tests 100000 [--per-week 3000]
+#                                    [--legacy 0.01] [--recordings 0] [--seed 0]
+#
+# the tests look like a line's: a handful of board types with their own
+# readings and fail rates, operators on shifts (06-22, no sundays), a few
+# thousand tests a week going back from now, ids in time order. the oldest
+# --legacy fraction predates sample recordings and carries the old raw_data
+# json (up to 1000 samples, 100-200 KB each). --recordings is the fraction of
+# newer tests with a full 1 kHz recording in test_samples, ~1 MB a minute.
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from boardtester.core import Database, RECORD_FIELDS
+
+# board, serial prefix, nominal V, I, F, fail rate, share of the tests
+BOARDS = [
+    ("PSU-12V", "P12", 12.0, 0.5, 50.0, 0.06, 30),
+    ("PSU-5V", "P05", 5.0, 1.2, 50.0, 0.04, 20),
+    ("PSU-24V", "P24", 24.0, 0.25, 50.0, 0.08, 8),
+    ("CTRL-A", "CTA", 3.3, 0.08, 1000.0, 0.03, 15),
+    ("DRV-3", "DR3", 12.0, 2.0, 20000.0, 0.12, 10),
+    ("LED-DRV", "LED", 36.0, 0.35, 0.0, 0.05, 10),
+    ("SENS-7", "SN7", 5.0, 0.02, 100.0, 0.02, 7),
+]
+OPERATORS = ["ana", "ben", "chen", "dara", "eli", "fatima", "goran", "hana",
+             "ivan", "jo", "kemal", "lena", "mo", "nina"]
+NOTES = ["retest after rework", "connector loose, reseated", "fan noisy",
+         "customer return", "first article", "cosmetic scratch on enclosure",
+         "reflowed U3", "label reprinted"]
+ABORT_RATE = 0.03
+NOTE_RATE = 0.06
+
+
+def start_times(n, per_week, rng, end=None):
+    # n sorted datetimes during shifts, per_week of them a week up to `end`
+    end = np.datetime64(end or datetime.now().replace(microsecond=0), 'us')
+    span = max(n / per_week, 1 / 7) * 7 * 86400
+    out = np.empty(0, 'datetime64[us]')
+    while len(out) < n:
+        t = end - (rng.uniform(0, span, int(n * 1.6) + 16) * 1e6).astype('timedelta64[us]')
+        day = t.astype('datetime64[D]')
+        hour = (t - day).astype('timedelta64[h]').astype(int)
+        weekday = (day.astype(int) + 3) % 7  # 1970-01-01 was a thursday
+        out = np.concatenate((out, t[(hour >= 6) & (hour < 22) & (weekday != 6)]))
+    return np.sort(out[:n]).tolist()
+
+
+def legacy_raw_data(n, board, rng):
+    # what the old app saved: json of the last 1000 sample dicts
+    _, _, v, i, f = board[:5]
+    t = np.arange(n) * 0.05
+    vv = v * (1 + rng.normal(0, 0.005, n))
+    ii = i * (1 + rng.normal(0, 0.01, n))
+    ff = np.full(n, f)
+    rows = np.column_stack((t, vv, ii, vv * ii, vv / ii, ff, np.where(ff > 0, 299792458.0 / np.maximum(ff, 1), 0)))
+    return json.dumps([dict(zip(RECORD_FIELDS, r)) for r in rows.tolist()])
+
+
+def recording(duration, board, rng, rate=1000):
+    # (fields, n) like TestRecorder.to_numpy()
+    _, _, v, i, f = board[:5]
+    n = max(int(duration * rate), 1)
+    out = np.empty((len(RECORD_FIELDS), n))
+    out[0] = np.arange(n) / rate
+    out[1] = v + rng.normal(0, v * 0.002, n)
+    out[2] = i + rng.normal(0, i * 0.005, n)
+    out[3] = out[1] * out[2]
+    out[4] = out[1] / out[2]
+    out[5] = f
+    out[6] = 299792458.0 / f if f > 0 else 0.0
+    return out
+
+
+def make_tests(n, per_week=3000, legacy=0.01, seed=0, end=None):
+    # (record, board) in time order, see Database.save_test
+    rng = np.random.default_rng(seed)
+    weights = np.array([b[6] for b in BOARDS], dtype=float)
+    boards = rng.choice(len(BOARDS), n, p=weights / weights.sum())
+    operators = rng.integers(len(OPERATORS), size=n)
+    durations = np.clip(np.exp(rng.normal(np.log(45), 0.6, n)), 5, 1800)
+    roll = rng.random(n)
+    noise = rng.normal(0, 1, (n, 8))
+    notes = rng.random(n) < NOTE_RATE
+    n_legacy = int(n * legacy)
+    serials = {}
+    
+    # a pool of old raw_data strings per board, building 1000 dicts per test is slow
+    pool = {}
+    
+    for k, start in enumerate(start_times(n, per_week, rng, end)):
+        b = BOARDS[boards[k]]
+        name, prefix, v, i, f, fail_rate = b[:6]
+        if roll[k] < ABORT_RATE:
+            status = 'ABORTED'
+            duration = float(durations[k] * 0.3)
+        else:
+            status = 'FAIL' if roll[k] < ABORT_RATE + fail_rate else 'PASS'
+            duration = float(durations[k])
+        
+        z = noise[k]
+        spread = 3.0 if status == 'FAIL' else 1.0
+        v_avg = v * (1 + 0.003 * z[0])
+        i_avg = i * (1 + 0.005 * z[1])
+        f_avg = f * (1 + 0.001 * z[2])
+        v_lo, v_hi = v_avg - v * 0.01 * spread * abs(z[3]), v_avg + v * 0.01 * spread * abs(z[4])
+        i_lo, i_hi = i_avg - i * 0.02 * spread * abs(z[5]), i_avg + i * 0.02 * spread * abs(z[6])
+        f_lo, f_hi = f_avg - f * 0.002 * abs(z[7]), f_avg + f * 0.002 * abs(z[7])
+        
+        serials[name] = serials.get(name, 0) + 1
+        end_time = start + timedelta(seconds=duration)
+        info = {
+            'name': f"Test_{start:%Y%m%d_%H%M%S}", 'board': name,
+            'serial': f"{prefix}{start:%y}{serials[name]:06d}", 'operator': OPERATORS[operators[k]],
+            'v_min': round(v * 0.95, 2), 'v_max': round(v * 1.05, 2),
+            'i_min': 0.0, 'i_max': round(i * 1.5, 3), 'f_min': round(f * 0.98, 1), 'f_max': round(f * 1.02, 1),
+            'notes': NOTES[k % len(NOTES)] if notes[k] else '',
+        }
+        fails = status == 'FAIL'
+        rec = {
+            'name': info['name'], 'board': name, 'serial_num': info['serial'],
+            'operator': info['operator'], 'start_time': start.isoformat(),
+            'end_time': end_time.isoformat(), 'duration': duration, 'status': status,
+            'v_min': v_lo, 'v_max': v_hi, 'v_avg': v_avg,
+            'i_min': i_lo, 'i_max': i_hi, 'i_avg': i_avg,
+            'p_min': v_lo * i_lo, 'p_max': v_hi * i_hi, 'p_avg': v_avg * i_avg,
+            'f_min': f_lo, 'f_max': f_hi, 'f_avg': f_avg,
+            'v_violations': int(fails and z[3] > 0) * int(1 + abs(z[0]) * 40),
+            'i_violations': int(fails and z[3] <= 0) * int(1 + abs(z[1]) * 40),
+            'f_violations': 0,
+            'notes': info['notes'], 'raw_data': '', 'params': json.dumps(info),
+        }
+        if k < n_legacy:
+            # before params and recordings existed
+            size = min(1000, int(duration * 20))
+            key = (boards[k], size // 100)
+            if key not in pool:
+                pool[key] = legacy_raw_data(max(size, 1), b, rng)
+            rec['raw_data'] = pool[key]
+            rec['params'] = None
+        yield rec, b
+
+
+def generate(path, n, per_week=3000, legacy=0.01, recordings=0.0, seed=0, batch=10000, progress=None):
+    # appends n tests to the database at path, returns how many were written
+    db = Database(path)
+    rng = np.random.default_rng(seed + 1)
+    done = 0
+    try:
+        tests = make_tests(n, per_week, legacy, seed)
+        while done < n:
+            with db._tx():
+                for rec, board in tests:
+                    samples = None
+                    if recordings and not rec['raw_data'] and rng.random() < recordings:
+                        samples = recording(rec['duration'], board, rng)
+                    db.save_test(rec, samples)
+                    done += 1
+                    if done % batch == 0:
+                        break
+            if progress:
+                progress(done, n)
+    finally:
+        db.close()
+    return done
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fill a database with synthetic tests")
+    ap.add_argument("path")
+    ap.add_argument("--tests", type=int, default=100000)
+    ap.add_argument("--per-week", type=int, default=3000, help="tests per week, sets how far back it goes")
+    ap.add_argument("--legacy", type=float, default=0.01, help="fraction of old tests with json raw_data")
+    ap.add_argument("--recordings", type=float, default=0.0, help="fraction of tests with a full recording")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    
+    if os.path.exists(args.path):
+        ap.error(f"{args.path} exists, pick a new file")
+    
+    t = time.perf_counter()
+    
+    def progress(done, total):
+        print(f"\r{done}/{total} tests, {time.perf_counter() - t:.0f}s", end="", flush=True)
+    
+    generate(args.path, args.tests, args.per_week, args.legacy, args.recordings, args.seed, progress=progress)
+    print(f"\n{os.path.getsize(args.path) / 1e6:.0f} MB in {args.path}")
+
+
+if __name__ == "__main__":
+    main()
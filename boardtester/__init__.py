@@ -0,0 +1,2 @@
+# Board Tester Pro. the qt-free core lives in boardtester.core, the gui in
+# main.py and the headless runner in boardtester.__main__
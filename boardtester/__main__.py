@@ -0,0 +1,93 @@
+# Headless runner, no qt:
+#
+#   python -m boardtester run --port COM3 --template "PSU 12V" --duration 30
+#
+# runs one test, stores it like the gui does and exits with the verdict:
+# 0 PASS, 1 FAIL, 2 error, 3 ABORTED (no samples, or interrupted). the
+# result is printed as one line, or as json with --json.
+import sys
+import json
+import argparse
+from datetime import datetime
+
+from boardtester.core import Database, open_device, run_test
+
+EXIT_CODES = {'PASS': 0, 'FAIL': 1, 'ABORTED': 3}
+EXIT_ERROR = 2
+
+# same defaults as the new test dialog
+DEFAULT_LIMITS = {'v_min': 0, 'v_max': 50, 'i_min': 0, 'i_max': 5, 'f_min': 0, 'f_max': 100000}
+
+
+def build_info(args, db):
+    info = {
+        'name': args.name or f"Test_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        'board': args.board or '',
+        'serial': args.serial or '',
+        'operator': args.operator or '',
+        'notes': args.notes or '',
+    }
+    info.update(DEFAULT_LIMITS)
+    if args.template:
+        tmpl = next((t for t in db.get_templates() if t['name'] == args.template), None)
+        if tmpl is None:
+            raise ValueError(f"no template named {args.template!r}")
+        info.update({k: tmpl[k] for k in DEFAULT_LIMITS if tmpl.get(k) is not None})
+        info['board'] = info['board'] or tmpl.get('board_type') or ''
+    return info
+
+
+def cmd_run(args) -> int:
+    db = Database(args.db)
+    try:
+        info = build_info(args, db)
+        device = open_device(args.port, args.baud, binary=not args.json_protocol)
+        record = run_test(device, db, info, args.duration,
+                          checkpoint=args.checkpoint, reset_delay=args.reset_delay)
+    except KeyboardInterrupt:
+        print("ABORTED interrupted", file=sys.stderr)
+        return EXIT_CODES['ABORTED']
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        db.close()
+    
+    if args.json:
+        print(json.dumps({k: v for k, v in record.items() if k not in ('raw_data', 'params')}))
+    else:
+        print(f"{record['status']} test #{record['id']} {record['name']} "
+              f"{record['samples']} samples {record['duration']:.1f}s "
+              f"V {record['v_min']:.3f}..{record['v_max']:.3f} "
+              f"I {record['i_min']:.3f}..{record['i_max']:.3f} "
+              f"violations V {record['v_violations']} I {record['i_violations']} F {record['f_violations']}")
+    return EXIT_CODES[record['status']]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='boardtester', description="Board Tester Pro, headless")
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    run = sub.add_parser('run', help="run one test and store it")
+    run.add_argument('--port', required=True, help="serial port, or SIM for the simulator")
+    run.add_argument('--template', help="limits (and board) from this saved template")
+    run.add_argument('--duration', type=float, required=True, help="seconds")
+    run.add_argument('--db', default="test_records.db")
+    run.add_argument('--baud', type=int, default=115200)
+    run.add_argument('--reset-delay', type=float, default=2.0, help="seconds to wait after opening the port")
+    run.add_argument('--json-protocol', action='store_true', help="don't switch the firmware to binary frames")
+    run.add_argument('--checkpoint', type=float, default=5.0, help="seconds between checkpoints")
+    run.add_argument('--name')
+    run.add_argument('--board')
+    run.add_argument('--serial')
+    run.add_argument('--operator')
+    run.add_argument('--notes')
+    run.add_argument('--json', action='store_true', help="print the result as json")
+    run.set_defaults(func=cmd_run)
+    
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1520 @@
+# Board tester core: everything that doesn't need Qt. sample codec and
+# database, the serial protocol, streaming stats, recording and test
+# sessions. the gui (main.py) and the headless runner (python -m
+# boardtester) are both built on it.
+import json
+import math
+import bisect
+import time
+import sqlite3
+import struct
+import zlib
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Optional, List, Dict
+
+import numpy as np
+
+
+# --------------------------------
+# Sample blob codec
+# --------------------------------
+# a recording is stored as chunks, one blob each:
+#   header  magic, version, field count, sample count, names length,
+#           then the field names comma separated
+#   body    zlib of the time column as int64 microsecond deltas followed by
+#           every other field as float32. columns are byte-shuffled so the
+#           slowly changing high bytes sit next to each other for zlib.
+SAMPLES_MAGIC = b'BTS1'
+SAMPLES_HEADER = struct.Struct('<4sBHIH')
+SAMPLES_CHUNK = 65536
+TIME_TICK = 1e-6
+
+
+def _shuffle(a) -> bytes:
+    a = np.ascontiguousarray(a)
+    return a.view(np.uint8).reshape(len(a), a.dtype.itemsize).T.tobytes()
+
+
+def _unshuffle(buf, dtype, n) -> np.ndarray:
+    dtype = np.dtype(dtype)
+    planes = np.frombuffer(buf, np.uint8).reshape(dtype.itemsize, n)
+    return np.ascontiguousarray(planes.T).view(dtype).ravel()
+
+
+def encode_samples(arr, fields=None) -> bytes:
+    # arr is (fields, n) with time in the first row
+    fields = fields or RECORD_FIELDS
+    n = arr.shape[1]
+    ticks = np.round(arr[0] / TIME_TICK).astype('<i8')
+    parts = [_shuffle(np.diff(ticks, prepend=0))]
+    for row in arr[1:]:
+        parts.append(_shuffle(row.astype('<f4')))
+    names = ','.join(fields).encode()
+    header = SAMPLES_HEADER.pack(SAMPLES_MAGIC, 1, len(fields), n, len(names))
+    return header + names + zlib.compress(b''.join(parts), 6)
+
+
+def decode_samples(blob):
+    magic, _, nfields, n, nlen = SAMPLES_HEADER.unpack_from(blob)
+    if magic != SAMPLES_MAGIC:
+        raise ValueError("not a sample blob")
+    off = SAMPLES_HEADER.size
+    fields = blob[off:off + nlen].decode().split(',')
+    body = zlib.decompress(blob[off + nlen:])
+    
+    arr = np.empty((nfields, n))
+    arr[0] = np.cumsum(_unshuffle(body[:8 * n], '<i8', n)) * TIME_TICK
+    pos = 8 * n
+    for k in range(1, nfields):
+        arr[k] = _unshuffle(body[pos:pos + 4 * n], '<f4', n)
+        pos += 4 * n
+    return fields, arr
+
+
+# --------------------------------
+# Database handler
+# --------------------------------
+# adds d to the counters a tests row r ('new' / 'old') falls under
+SUMMARY_UPSERT = '''INSERT INTO test_summary (dim, key, status, n) VALUES
+                    ('all', '', coalesce({r}.status, ''), {d}),
+                    ('board', coalesce({r}.board, ''), coalesce({r}.status, ''), {d}),
+                    ('operator', coalesce({r}.operator, ''), coalesce({r}.status, ''), {d}),
+                    ('day', coalesce(substr({r}.start_time, 1, 10), ''), coalesce({r}.status, ''), {d})
+                ON CONFLICT (dim, key, status) DO UPDATE SET n = n + excluded.n;'''
+
+
+class Database:
+    # one persistent connection per thread (gui, workers), WAL so readers
+    # never wait on a writer. sqlite3 caches the prepared statements per
+    # connection, so the sql strings below are kept constant.
+    # what the records list shows, no stats or raw_data
+    SUMMARY_COLS = ', '.join(f'tests.{c}' for c in (
+        'id', 'name', 'board', 'serial_num', 'operator', 'start_time', 'duration', 'status'))
+    
+    # what update_test() may change
+    UPDATE_COLS = (
+        'name', 'board', 'serial_num', 'operator', 'start_time', 'end_time', 'duration', 'status',
+        'v_min', 'v_max', 'v_avg', 'i_min', 'i_max', 'i_avg', 'p_min', 'p_max', 'p_avg',
+        'f_min', 'f_max', 'f_avg', 'v_violations', 'i_violations', 'f_violations', 'notes', 'params')
+    
+    # what a checkpoint changes. leaves out the columns the summary and fts
+    # triggers watch, sqlite fires those for any column in the SET list
+    CHECKPOINT_COLS = (
+        'end_time', 'duration', 'v_min', 'v_max', 'v_avg', 'i_min', 'i_max', 'i_avg',
+        'p_min', 'p_max', 'p_avg', 'f_min', 'f_max', 'f_avg', 'v_violations', 'i_violations', 'f_violations')
+    
+    def __init__(self, path="test_records.db", init=True):
+        # init=False: the caller runs _init_tables() (schema, migrations)
+        # itself before the first query, e.g. on a background thread
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns = []
+        self.fts = False
+        if init:
+            self._init_tables()
+    
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # autocommit mode, transactions are explicit through _tx()
+            conn = sqlite3.connect(self.path, isolation_level=None,
+                                   check_same_thread=False, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute('PRAGMA cache_size=-16000')
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+    
+    @contextmanager
+    def _tx(self):
+        conn = self._conn()
+        if conn.in_transaction:
+            # nested call, the outer transaction commits
+            yield conn
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+    
+    def release(self):
+        # close the calling thread's connection, for short-lived threads.
+        # the next call on this thread opens a new one
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            self._conns.remove(conn)
+        conn.close()
+    
+    def close(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+    
+    def _init_tables(self):
+        with self._tx() as c:
+            self._create_tables(c)
+        self._migrate()
+        self.fts = self._ensure_fts()
+    
+    def _create_tables(self, c):
+        c.execute('''CREATE TABLE IF NOT EXISTS tests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            board TEXT,
+            serial_num TEXT,
+            operator TEXT,
+            start_time TEXT,
+            end_time TEXT,
+            duration REAL,
+            status TEXT,
+            v_min REAL, v_max REAL, v_avg REAL,
+            i_min REAL, i_max REAL, i_avg REAL,
+            p_min REAL, p_max REAL, p_avg REAL,
+            f_min REAL, f_max REAL, f_avg REAL,
+            v_violations INTEGER,
+            i_violations INTEGER,
+            f_violations INTEGER,
+            notes TEXT,
+            raw_data TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )''')
+        
+        # full recordings, see encode_samples()
+        c.execute('''CREATE TABLE IF NOT EXISTS test_samples (
+            test_id INTEGER,
+            seq INTEGER,
+            n INTEGER,
+            data BLOB,
+            PRIMARY KEY (test_id, seq)
+        )''')
+        
+        c.execute('''CREATE TABLE IF NOT EXISTS templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            board_type TEXT,
+            v_min REAL, v_max REAL,
+            i_min REAL, i_max REAL,
+            f_min REAL, f_max REAL,
+            description TEXT
+        )''')
+    
+    # schema changes after the original tables, applied once each in order
+    # and tracked in PRAGMA user_version
+    def _migrate(self):
+        conn = self._conn()
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for n, sqls in enumerate(self.MIGRATIONS[version:], version + 1):
+            with self._tx() as c:
+                for sql in sqls:
+                    c.execute(sql)
+                c.execute(f'PRAGMA user_version = {n}')
+    
+    MIGRATIONS = [
+        # 1: indexes for the records tab filters
+        [
+            'CREATE INDEX IF NOT EXISTS idx_tests_status ON tests(status, id)',
+            'CREATE INDEX IF NOT EXISTS idx_tests_board ON tests(board)',
+            'CREATE INDEX IF NOT EXISTS idx_tests_serial ON tests(serial_num)',
+            'CREATE INDEX IF NOT EXISTS idx_tests_start ON tests(start_time)',
+        ],
+        # 2: per-status counters overall and by board, operator and day,
+        # kept exact by triggers so the stats row never scans tests
+        [
+            '''CREATE TABLE IF NOT EXISTS test_summary (
+                dim TEXT, key TEXT, status TEXT, n INTEGER,
+                PRIMARY KEY (dim, key, status)
+            ) WITHOUT ROWID''',
+            f'''CREATE TRIGGER tests_sum_ai AFTER INSERT ON tests BEGIN
+                {SUMMARY_UPSERT.format(r='new', d=1)}
+            END''',
+            f'''CREATE TRIGGER tests_sum_ad AFTER DELETE ON tests BEGIN
+                {SUMMARY_UPSERT.format(r='old', d=-1)}
+            END''',
+            f'''CREATE TRIGGER tests_sum_au AFTER UPDATE OF status, board, operator, start_time
+                ON tests BEGIN
+                {SUMMARY_UPSERT.format(r='old', d=-1)}
+                {SUMMARY_UPSERT.format(r='new', d=1)}
+            END''',
+            '''INSERT INTO test_summary (dim, key, status, n)
+                SELECT 'all', '', coalesce(status, ''), COUNT(*) FROM tests GROUP BY 3
+                UNION ALL
+                SELECT 'board', coalesce(board, ''), coalesce(status, ''), COUNT(*) FROM tests GROUP BY 2, 3
+                UNION ALL
+                SELECT 'operator', coalesce(operator, ''), coalesce(status, ''), COUNT(*) FROM tests GROUP BY 2, 3
+                UNION ALL
+                SELECT 'day', coalesce(substr(start_time, 1, 10), ''), coalesce(status, ''), COUNT(*)
+                FROM tests GROUP BY 2, 3''',
+        ],
+        # 3: the test setup (thresholds etc) as json, so an interrupted
+        # test can be resumed with the same limits
+        [
+            'ALTER TABLE tests ADD COLUMN params TEXT',
+        ],
+    ]
+    
+    def _ensure_fts(self) -> bool:
+        # trigram fts5 index over the searchable columns, kept in sync by
+        # triggers. needs sqlite 3.34+, search() falls back to LIKE without it
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tests_fts'").fetchone():
+            return True
+        try:
+            with self._tx() as c:
+                c.execute('''CREATE VIRTUAL TABLE tests_fts USING fts5(
+                    name, board, serial_num, operator,
+                    content='tests', content_rowid='id', tokenize='trigram'
+                )''')
+                c.execute('''CREATE TRIGGER tests_fts_ai AFTER INSERT ON tests BEGIN
+                    INSERT INTO tests_fts (rowid, name, board, serial_num, operator)
+                    VALUES (new.id, new.name, new.board, new.serial_num, new.operator);
+                END''')
+                c.execute('''CREATE TRIGGER tests_fts_ad AFTER DELETE ON tests BEGIN
+                    INSERT INTO tests_fts (tests_fts, rowid, name, board, serial_num, operator)
+                    VALUES ('delete', old.id, old.name, old.board, old.serial_num, old.operator);
+                END''')
+                c.execute('''CREATE TRIGGER tests_fts_au AFTER UPDATE OF name, board, serial_num, operator
+                    ON tests BEGIN
+                    INSERT INTO tests_fts (tests_fts, rowid, name, board, serial_num, operator)
+                    VALUES ('delete', old.id, old.name, old.board, old.serial_num, old.operator);
+                    INSERT INTO tests_fts (rowid, name, board, serial_num, operator)
+                    VALUES (new.id, new.name, new.board, new.serial_num, new.operator);
+                END''')
+                c.execute("INSERT INTO tests_fts (tests_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError:
+            return False
+        return True
+    
+    def save_test(self, data: dict, samples=None) -> int:
+        with self._tx() as c:
+            cur = c.execute('''INSERT INTO tests 
+                (name, board, serial_num, operator, start_time, end_time, duration, status,
+                 v_min, v_max, v_avg, i_min, i_max, i_avg, p_min, p_max, p_avg,
+                 f_min, f_max, f_avg, v_violations, i_violations, f_violations, notes, raw_data, params)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
+                (data['name'], data['board'], data['serial_num'], data['operator'],
+                 data['start_time'], data['end_time'], data['duration'], data['status'],
+                 data['v_min'], data['v_max'], data['v_avg'],
+                 data['i_min'], data['i_max'], data['i_avg'],
+                 data['p_min'], data['p_max'], data['p_avg'],
+                 data['f_min'], data['f_max'], data['f_avg'],
+                 data['v_violations'], data['i_violations'], data['f_violations'],
+                 data['notes'], data['raw_data'], data.get('params')))
+            
+            test_id = cur.lastrowid
+            if samples is not None:
+                c.executemany('INSERT INTO test_samples (test_id, seq, n, data) VALUES (?,?,?,?)',
+                              self._sample_rows(test_id, samples))
+        return test_id
+    
+    def update_test(self, test_id: int, data: dict, cols=None):
+        # cols: only write these of the keys in data
+        cols = [k for k in self.UPDATE_COLS if k in data and (cols is None or k in cols)]
+        if not cols:
+            return
+        with self._tx() as c:
+            c.execute(f'UPDATE tests SET {", ".join(k + " = ?" for k in cols)} WHERE id = ?',
+                      [data[k] for k in cols] + [test_id])
+    
+    def get_interrupted(self) -> List[Dict]:
+        # tests still IN_PROGRESS, i.e. the app went down while recording
+        rows = self._conn().execute(
+            f"SELECT {self.SUMMARY_COLS}, tests.end_time, tests.params FROM tests "
+            "WHERE status = 'IN_PROGRESS' ORDER BY id").fetchall()
+        return [dict(r) for r in rows]
+    
+    def next_sample_seq(self, test_id: int) -> int:
+        row = self._conn().execute(
+            'SELECT MAX(seq) FROM test_samples WHERE test_id = ?', (test_id,)).fetchone()
+        return 0 if row[0] is None else row[0] + 1
+    
+    def get_all_tests(self) -> List[Dict]:
+        rows = self._conn().execute('SELECT * FROM tests ORDER BY id DESC').fetchall()
+        return [dict(r) for r in rows]
+    
+    def get_test(self, test_id: int) -> Optional[Dict]:
+        row = self._conn().execute('SELECT * FROM tests WHERE id = ?', (test_id,)).fetchone()
+        return dict(row) if row else None
+    
+    def delete_test(self, test_id: int):
+        with self._tx() as c:
+            c.execute('DELETE FROM tests WHERE id = ?', (test_id,))
+            c.execute('DELETE FROM test_samples WHERE test_id = ?', (test_id,))
+    
+    # sample storage
+    @staticmethod
+    def _sample_rows(test_id, samples, first_seq=0):
+        # samples is a (fields, n) array or a TestRecorder, read a chunk at a time
+        rec = isinstance(samples, TestRecorder)
+        n = samples.count if rec else samples.shape[1]
+        for seq, a in enumerate(range(0, n, SAMPLES_CHUNK), first_seq):
+            part = samples.to_numpy(a, a + SAMPLES_CHUNK) if rec else samples[:, a:a + SAMPLES_CHUNK]
+            yield (test_id, seq, part.shape[1], encode_samples(part))
+    
+    def save_samples(self, test_id: int, samples, first_seq=0):
+        with self._tx() as c:
+            c.executemany('INSERT OR REPLACE INTO test_samples (test_id, seq, n, data) VALUES (?,?,?,?)',
+                          self._sample_rows(test_id, samples, first_seq))
+    
+    def get_samples(self, test_id: int) -> Optional[Dict[str, np.ndarray]]:
+        decoded = list(self.iter_samples(test_id))
+        if not decoded:
+            return None
+        
+        fields = decoded[0][0]
+        arr = np.concatenate([a for _, a in decoded], axis=1)
+        return {name: arr[n] for n, name in enumerate(fields)}
+    
+    def iter_samples(self, test_id: int):
+        # (fields, array) one stored chunk at a time
+        cur = self._conn().execute(
+            'SELECT data FROM test_samples WHERE test_id = ? ORDER BY seq', (test_id,))
+        for (blob,) in cur:
+            yield decode_samples(blob)
+    
+    # export
+    def export_columns(self) -> List[str]:
+        return [r[1] for r in self._conn().execute('PRAGMA table_info(tests)') if r[1] != 'raw_data']
+    
+    @staticmethod
+    def _export_where(status, since, until):
+        # since / until are 'YYYY-MM-DD', until inclusive
+        where = []
+        params = []
+        if status:
+            where.append('status = ?')
+            params.append(status)
+        if since:
+            where.append('start_time >= ?')
+            params.append(since)
+        if until:
+            where.append('start_time < ?')
+            params.append(until + 'T99')
+        return (' WHERE ' + ' AND '.join(where)) if where else '', params
+    
+    def count_tests(self, status: Optional[str] = None, since: Optional[str] = None,
+                    until: Optional[str] = None) -> int:
+        if not (since or until):
+            counts = self.get_summary().get('', {})
+            return counts.get(status, 0) if status else sum(counts.values())
+        where, params = self._export_where(status, since, until)
+        return self._conn().execute(f'SELECT COUNT(*) FROM tests{where}', params).fetchone()[0]
+    
+    def iter_tests(self, cols: List[str], status: Optional[str] = None, since: Optional[str] = None,
+                   until: Optional[str] = None, batch: int = 1000):
+        # batches of row tuples, newest first, never the whole table at once
+        where, params = self._export_where(status, since, until)
+        cur = self._conn().execute(
+            f'SELECT {", ".join(cols)} FROM tests{where} ORDER BY id DESC', params)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            yield rows
+    
+    def _where(self, query, status):
+        # returns (source, where, params, order key)
+        source, key = 'tests', 'tests.id'
+        where = []
+        params = []
+        # every term must be a case-insensitive substring of some field.
+        # trigrams need 3 characters, shorter terms (or no fts) use LIKE
+        terms = query.split()
+        long_terms = [t for t in terms if len(t) >= 3] if self.fts else []
+        if long_terms:
+            # driving the join from the fts side lets it walk rowids newest
+            # first and stop at the limit instead of collecting every match
+            source, key = 'tests_fts JOIN tests ON tests.id = tests_fts.rowid', 'tests_fts.rowid'
+            where.append('tests_fts MATCH ?')
+            params.append(' '.join('"' + t.replace('"', '""') + '"' for t in long_terms))
+        for t in terms:
+            if long_terms and len(t) >= 3:
+                continue
+            q = '%' + t.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            where.append("(tests.board LIKE ? ESCAPE '\\' OR tests.serial_num LIKE ? ESCAPE '\\' "
+                         "OR tests.name LIKE ? ESCAPE '\\' OR tests.operator LIKE ? ESCAPE '\\')")
+            params += [q, q, q, q]
+        if status:
+            where.append('tests.status = ?')
+            params.append(status)
+        return source, (' WHERE ' + ' AND '.join(where)) if where else '', params, key
+    
+    def _select(self, cols, query, status, limit, before=None):
+        source, where, params, key = self._where(query, status)
+        if before is not None:
+            where += (' AND ' if where else ' WHERE ') + f'{key} < ?'
+            params.append(before)
+        sql = f'SELECT {cols} FROM {source}{where} ORDER BY {key} DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [dict(r) for r in self._conn().execute(sql, params).fetchall()]
+    
+    def search(self, query: str = '', status: Optional[str] = None,
+               limit: Optional[int] = None) -> List[Dict]:
+        return self._select('tests.*', query, status, limit)
+    
+    def get_page(self, before: Optional[int] = None, limit: int = 50,
+                 query: str = '', status: Optional[str] = None) -> List[Dict]:
+        # keyset page of list summaries, newest first. pass the last id of
+        # the previous page as `before` to get the next one
+        return self._select(self.SUMMARY_COLS, query, status, limit, before)
+    
+    def filter_by_status(self, status: str) -> List[Dict]:
+        return self.search(status=status)
+    
+    def get_summary(self, dim: str = 'all') -> Dict[str, Dict[str, int]]:
+        # {key: {status: count}} from the trigger-maintained counters.
+        # dim is 'all' (key ''), 'board', 'operator' or 'day' (YYYY-MM-DD)
+        out = {}
+        for key, status, n in self._conn().execute(
+                'SELECT key, status, n FROM test_summary WHERE dim = ? AND n > 0', (dim,)):
+            out.setdefault(key, {})[status] = n
+        return out
+    
+    def get_stats(self) -> Dict:
+        # tests still running aren't counted until they finish
+        counts = self.get_summary().get('', {})
+        total = sum(n for st, n in counts.items() if st != 'IN_PROGRESS')
+        passed = counts.get('PASS', 0)
+        failed = counts.get('FAIL', 0)
+        
+        rate = (passed / total * 100) if total > 0 else 0
+        return {'total': total, 'passed': passed, 'failed': failed, 'pass_rate': rate}
+    
+    # template stuff
+    def save_template(self, t: dict):
+        with self._tx() as c:
+            c.execute('''INSERT OR REPLACE INTO templates 
+                         (name, board_type, v_min, v_max, i_min, i_max, f_min, f_max, description)
+                         VALUES (?,?,?,?,?,?,?,?,?)''',
+                      (t['name'], t['board_type'], t['v_min'], t['v_max'],
+                       t['i_min'], t['i_max'], t['f_min'], t['f_max'], t['description']))
+    
+    def get_templates(self) -> List[Dict]:
+        rows = self._conn().execute('SELECT * FROM templates ORDER BY name').fetchall()
+        return [dict(r) for r in rows]
+    
+    def delete_template(self, tid: int):
+        with self._tx() as c:
+            c.execute('DELETE FROM templates WHERE id = ?', (tid,))
+
+
+# --------------------------------
+# Write jobs
+# --------------------------------
+# the Database methods a writer may run, see DbWriter in main.py
+WRITE_JOBS = ('save_test', 'update_test', 'save_samples', 'delete_test', 'save_template', 'delete_template')
+
+
+def run_job(db, job, args, ref=None):
+    # WriteRef args are swapped for their values, the result goes into ref
+    resolved = []
+    for a in args:
+        if isinstance(a, WriteRef):
+            if a.value is None:
+                raise ValueError("depends on a write that failed")
+            a = a.value
+        resolved.append(a)
+    result = getattr(db, job)(*resolved)
+    if ref is not None:
+        ref.value = result
+    return result
+
+
+class SyncWriter:
+    # DbWriter.submit() without the thread: every job is committed before
+    # submit() returns. errors go to on_error, or are raised without one
+    def __init__(self, db):
+        self.db = db
+    
+    def submit(self, job: str, *args, on_done=None, on_error=None, ref=None):
+        if job not in WRITE_JOBS:
+            raise ValueError(f"unknown write job {job}")
+        try:
+            with self.db._tx():
+                result = run_job(self.db, job, args, ref)
+        except Exception as e:
+            if ref is not None:
+                ref.value = None
+            if on_error is None:
+                raise
+            on_error(str(e))
+            return None
+        if on_done:
+            on_done(result)
+        return result
+    
+    def pending(self) -> int:
+        return 0
+
+
+# --------------------------------
+# Binary sample protocol
+# --------------------------------
+# frame layout (little endian), see sendFrame() in the firmware:
+#   sync u8 0xA5 | len u8 | seq u8 | v i16 (10 mV) | i i16 (1 mA) | f u16 (Hz) | crc8
+# 10 bytes per sample instead of ~100 for a json line
+FRAME_SYNC = 0xA5
+FRAME_STRUCT = struct.Struct('<BBBhhHB')
+FRAME_SIZE = FRAME_STRUCT.size
+FRAME_LEN = FRAME_SIZE - 3
+FRAME_DTYPE = np.dtype([
+    ('sync', 'u1'), ('len', 'u1'), ('seq', 'u1'),
+    ('v', '<i2'), ('i', '<i2'), ('f', '<u2'), ('crc', 'u1')
+])
+
+V_SCALE = 0.01
+I_SCALE = 0.001
+RMS_WINDOW = 100  # same as BUF_SIZE in the firmware
+SPEED_OF_LIGHT = 299792458.0
+
+# same keys the firmware uses in its json lines
+SAMPLE_FIELDS = ('V', 'I', 'P', 'R', 'F', 'WL', 'Vrms', 'Vpp')
+SAMPLE_DTYPE = np.dtype([(k, 'f8') for k in SAMPLE_FIELDS])
+
+# channels that get min/max/avg in the stats and test records
+STAT_CHANNELS = ('V', 'I', 'P', 'F')
+
+
+def rows_to_samples(rows) -> np.ndarray:
+    return np.array([tuple(d.get(k, 0) for k in SAMPLE_FIELDS) for d in rows], SAMPLE_DTYPE)
+
+
+def derive_samples(v, i, f, v_hist):
+    # the rest of a sample from voltage, current and frequency, computed like
+    # the firmware does. v_hist: the previous RMS_WINDOW - 1 voltages (zeros
+    # after boot). returns the samples and the v_hist for the next call
+    v = np.asarray(v, dtype=np.float64)
+    i = np.asarray(i, dtype=np.float64)
+    f = np.asarray(f, dtype=np.float64)
+    if f.ndim == 0:
+        f = np.full(len(v), f)
+    out = np.empty(len(v), SAMPLE_DTYPE)
+    out['V'] = v
+    out['I'] = i
+    out['P'] = v * i
+    out['F'] = f
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out['R'] = np.where(i != 0, v / i, 0.0)
+        out['WL'] = np.where(f > 0, SPEED_OF_LIGHT / f, 0.0)
+    
+    # rolling rms / peak-to-peak over the same window the firmware uses
+    hist = np.concatenate((v_hist, v))
+    sq = np.concatenate(([0.0], np.cumsum(hist * hist)))
+    out['Vrms'] = np.sqrt(np.maximum(sq[RMS_WINDOW:] - sq[:-RMS_WINDOW], 0) / RMS_WINDOW)
+    win = np.lib.stride_tricks.sliding_window_view(hist, RMS_WINDOW)
+    out['Vpp'] = win.max(axis=1) - win.min(axis=1)
+    return out, hist[-(RMS_WINDOW - 1):]
+
+
+def samples_to_block(samples, t) -> Dict[str, np.ndarray]:
+    # columnar block: one contiguous array per field plus host time 't'
+    block = {k: np.ascontiguousarray(samples[k]) for k in SAMPLE_FIELDS}
+    block['t'] = np.asarray(t, dtype=np.float64)
+    return block
+
+
+def _make_crc8_table():
+    table = []
+    for n in range(256):
+        crc = n
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return np.array(table, dtype=np.uint8)
+
+
+CRC8_TABLE = _make_crc8_table()
+
+
+def crc8(data: bytes) -> int:
+    crc = 0
+    for b in data:
+        crc = CRC8_TABLE[crc ^ b]
+    return int(crc)
+
+
+def encode_frames(seq, v, i, f) -> bytes:
+    # the firmware's sendFrame() for whole arrays at once, seq counts up from seq
+    n = len(v)
+    fr = np.zeros(n, FRAME_DTYPE)
+    fr['sync'] = FRAME_SYNC
+    fr['len'] = FRAME_LEN
+    fr['seq'] = (seq + np.arange(n)) & 0xFF
+    fr['v'] = np.clip(np.round(np.asarray(v) / V_SCALE), -32768, 32767)
+    fr['i'] = np.clip(np.round(np.asarray(i) / I_SCALE), -32768, 32767)
+    fr['f'] = np.clip(np.round(f), 0, 65535)
+    raw = fr.view(np.uint8).reshape(n, FRAME_SIZE)
+    raw[:, -1] = FrameDecoder._crc(raw)
+    return raw.tobytes()
+
+
+def encode_frame(seq, v, i, f) -> bytes:
+    return encode_frames(seq, [v], [i], f)
+
+
+class FrameDecoder:
+    def __init__(self):
+        self.pending = b''
+        self.v_hist = np.zeros(RMS_WINDOW - 1)  # firmware buffer starts zeroed
+        self.last_seq = None
+        self.frames = 0
+        self.dropped = 0
+        self.bad_bytes = 0
+    
+    def feed(self, chunk: bytes) -> np.ndarray:
+        data = self.pending + chunk
+        a = np.frombuffer(data, dtype=np.uint8)
+        n = len(a)
+        if n < FRAME_SIZE:
+            self.pending = data
+            return np.empty(0, SAMPLE_DTYPE)
+        
+        frames, starts = self._aligned(a)
+        if frames is None:
+            frames, starts = self._scan(a)
+        
+        # keep anything that could still be the start of a frame
+        end = int(starts[-1]) + FRAME_SIZE if len(starts) else 0
+        keep = max(end, n - FRAME_SIZE + 1)
+        self.bad_bytes += keep - len(starts) * FRAME_SIZE
+        self.pending = data[keep:]
+        
+        raw = np.ascontiguousarray(frames).view(FRAME_DTYPE).ravel()
+        return self._to_samples(raw)
+    
+    def _aligned(self, a):
+        # fast path: stream is in sync and every frame checks out
+        k = len(a) // FRAME_SIZE
+        frames = a[:k * FRAME_SIZE].reshape(k, FRAME_SIZE)
+        if not (np.all(frames[:, 0] == FRAME_SYNC) and np.all(frames[:, 1] == FRAME_LEN)):
+            return None, None
+        if not np.all(self._crc(frames) == frames[:, -1]):
+            return None, None
+        return frames, np.arange(k) * FRAME_SIZE
+    
+    def _scan(self, a):
+        last = len(a) - FRAME_SIZE + 1
+        starts = np.flatnonzero((a[:last] == FRAME_SYNC) & (a[1:last + 1] == FRAME_LEN))
+        frames = a[starts[:, None] + np.arange(FRAME_SIZE)]
+        ok = self._crc(frames) == frames[:, -1]
+        starts, frames = starts[ok], frames[ok]
+        
+        # a sync pattern inside a real frame can pass the crc by chance
+        if len(starts) > 1 and np.any(np.diff(starts) < FRAME_SIZE):
+            keep = []
+            end = -1
+            for idx, p in enumerate(starts):
+                if p >= end:
+                    keep.append(idx)
+                    end = p + FRAME_SIZE
+            starts, frames = starts[keep], frames[keep]
+        return frames, starts
+    
+    @staticmethod
+    def _crc(frames):
+        crc = np.zeros(len(frames), dtype=np.uint8)
+        for col in range(1, FRAME_SIZE - 1):
+            crc = CRC8_TABLE[crc ^ frames[:, col]]
+        return crc
+    
+    def _to_samples(self, raw):
+        out = np.empty(len(raw), SAMPLE_DTYPE)
+        if not len(raw):
+            return out
+        
+        self.frames += len(raw)
+        seq = raw['seq'].astype(np.int64)
+        if self.last_seq is not None:
+            seq = np.concatenate(([self.last_seq], seq))
+        self.dropped += int(np.sum((np.diff(seq) - 1) % 256))
+        self.last_seq = int(seq[-1])
+        
+        out, self.v_hist = derive_samples(raw['v'] * V_SCALE, raw['i'] * I_SCALE,
+                                          raw['f'].astype(np.float64), self.v_hist)
+        return out
+
+
+# --------------------------------
+# Latency diagnostics
+# --------------------------------
+# the stages a block of samples goes through on its way to the screen.
+# read, split and decode are how long that step took for the block, the
+# rest are the age of its newest sample (now - its host timestamp 't') on
+# reaching the stage: emitted by the worker, delivered to and handled by the
+# gui thread, and first drawn by the meters / plots.
+DIAG_STAGES = ('read', 'split', 'decode', 'emit', 'deliver', 'handled', 'meters', 'plots')
+DIAG_STEPS = 4  # buckets per octave
+# SerialReader times the read, split and decode of one read in this many,
+# and only then copies its counters over. doing either on every read costs
+# well over 1% of parsing with small reads
+DIAG_EVERY = 16
+
+
+class LatencyHistogram:
+    # counts in quarter-octave buckets from 1 us to ~70 min, so adding a
+    # value is a frexp and an increment. percentiles are the bucket's upper
+    # edge (within 19%), the max is exact.
+    def __init__(self, octaves=32):
+        self.counts = [0] * (octaves * DIAG_STEPS + 1)
+        self.count = 0
+        self.max = 0.0
+    
+    def add(self, seconds):
+        us = seconds * 1e6
+        if us < 1.0:
+            k = 0
+        else:
+            m, e = math.frexp(us)  # us = m * 2**e, 0.5 <= m < 1
+            k = min((e - 1) * DIAG_STEPS + int((m - 0.5) * 2 * DIAG_STEPS) + 1, len(self.counts) - 1)
+        self.counts[k] += 1
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+    
+    @staticmethod
+    def _upper(k):
+        # seconds at the top of bucket k
+        if k == 0:
+            return 1e-6
+        e, j = divmod(k - 1, DIAG_STEPS)
+        return 2.0 ** e * (1 + (j + 1) / DIAG_STEPS) * 1e-6
+    
+    def percentile(self, q) -> float:
+        if not self.count:
+            return 0.0
+        target = q / 100 * self.count
+        seen = 0
+        for k, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= target:
+                return self.max if k == len(self.counts) - 1 else min(self._upper(k), self.max)
+        return self.max
+
+
+class Diagnostics:
+    # stage histograms and counters for one acquisition path. a stage is only
+    # ever written by one thread and the panel just reads a snapshot, so
+    # nothing locks. whoever would record checks for None first: with
+    # diagnostics off there is no clock read and no call.
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.stages = {s: LatencyHistogram() for s in DIAG_STAGES}
+        self.samples = 0
+        self.parse_errors = 0   # json lines that didn't decode
+        self.bad_bytes = 0      # binary bytes skipped to resync
+        self.dropped = 0        # frames missing from the sequence
+        self.queued = 0         # bytes waiting at the port after the last read
+        self.pending = 0        # samples the worker holds for the next batch
+        self.started = time.monotonic()
+    
+    def add(self, stage, seconds):
+        self.stages[stage].add(seconds)
+    
+    def age(self, stage, t):
+        # t: host timestamp of the newest sample
+        self.stages[stage].add(time.time() - t)
+    
+    @property
+    def in_flight(self) -> int:
+        # batches emitted that the gui thread hasn't picked up yet
+        return max(self.stages['emit'].count - self.stages['deliver'].count, 0)
+    
+    def summary(self) -> Dict:
+        # times in ms
+        return {
+            'samples': self.samples, 'seconds': time.monotonic() - self.started,
+            'parse_errors': self.parse_errors, 'bad_bytes': self.bad_bytes, 'dropped': self.dropped,
+            'queued': self.queued, 'pending': self.pending, 'in_flight': self.in_flight,
+            'stages': {name: {'count': h.count, 'p50': h.percentile(50) * 1000,
+                              'p99': h.percentile(99) * 1000, 'max': h.max * 1000}
+                       for name, h in self.stages.items()},
+        }
+
+
+# --------------------------------
+# Serial acquisition
+# --------------------------------
+class SerialReader:
+    # the device side of a connection: opens the port, asks for binary
+    # frames when the firmware has them and turns whatever arrived into
+    # sample blocks (see samples_to_block). SerialWorker runs one on its
+    # thread, the headless runner polls one directly. set diag to a
+    # Diagnostics to time the read, split and decode of one read in
+    # DIAG_EVERY. the sample and error counts are kept here and in the
+    # decoder either way and added to diag on those reads.
+    def __init__(self, port, baud=115200, binary=True, on_status=None):
+        self.port = port
+        self.baud = baud
+        self.binary = binary
+        self.on_status = on_status
+        self.ser = None
+        self.device_info = {}
+        self.decoder = None
+        self._bin_requested = False
+        self._buf = bytearray()
+        self._last_read = 0.0
+        self.rows = 0           # json samples
+        self.parse_errors = 0
+        self._diag = None
+        self._diag_reads = 0
+        self._counted = (0, 0, 0, 0)
+        self._timed = False     # this read is timed stage by stage
+    
+    @property
+    def diag(self):
+        return self._diag
+    
+    @diag.setter
+    def diag(self, diag):
+        # only what comes after counts towards a new diag
+        self._counted = self._counters()
+        self._diag = diag
+    
+    def open(self, reset_delay=2.0):
+        import serial   # not needed until a port opens
+        
+        self.ser = serial.Serial(self.port, self.baud, timeout=0.1)
+        time.sleep(reset_delay)  # arduino reset delay
+        
+        # older firmware doesn't advertise "bin", so we just stay on json
+        if self.binary:
+            self.send("INFO")
+        self._last_read = time.time()
+    
+    def close(self):
+        if self._diag is not None:
+            self._count(self._diag)
+        if self.ser and self.ser.is_open:
+            if self.decoder is not None:
+                self.send("JSON")
+            self.ser.close()
+    
+    def send(self, cmd):
+        if self.ser and self.ser.is_open:
+            self.ser.write(f"{cmd}\n".encode())
+    
+    def waiting(self) -> int:
+        return self.ser.in_waiting
+    
+    def read(self) -> Dict[str, np.ndarray]:
+        # everything waiting, possibly an empty block
+        diag = self._diag
+        if diag is not None:
+            self._diag_reads += 1
+            if self._diag_reads == DIAG_EVERY:
+                self._diag_reads = 0
+                return self._timed_read(diag)
+        return self._stamp(self._samples(self.ser.read(self.ser.in_waiting)))
+    
+    def _timed_read(self, diag):
+        self._timed = True
+        try:
+            t = time.perf_counter()
+            data = self.ser.read(self.ser.in_waiting)
+            diag.add('read', time.perf_counter() - t)
+            diag.queued = self.ser.in_waiting
+            block = self._stamp(self._samples(data))
+        finally:
+            self._timed = False
+        self._count(diag)
+        return block
+    
+    def _counters(self):
+        # (samples, parse_errors, bad_bytes, dropped) since the port opened
+        dec = self.decoder
+        if dec is None:
+            return self.rows, self.parse_errors, 0, 0
+        return self.rows + dec.frames, self.parse_errors, dec.bad_bytes, dec.dropped
+    
+    def _count(self, diag):
+        now = self._counters()
+        samples, errors, bad, dropped = (a - b for a, b in zip(now, self._counted))
+        self._counted = now
+        diag.samples += samples
+        diag.parse_errors += errors
+        diag.bad_bytes += bad
+        diag.dropped += dropped
+    
+    def _samples(self, data):
+        decoder = self.decoder
+        if decoder is None:
+            return self._parse_lines(data)
+        if not self._timed:
+            return decoder.feed(data)
+        
+        t = time.perf_counter()
+        samples = decoder.feed(data)
+        self._diag.add('decode', time.perf_counter() - t)
+        return samples
+    
+    def _stamp(self, samples):
+        # spread arrival times across the gap since the previous read
+        now = time.time()
+        n = len(samples)
+        span = min(now - self._last_read, 0.05)
+        t = now - span + span * np.arange(1, n + 1) / max(n, 1)
+        self._last_read = now
+        return samples_to_block(samples, t)
+    
+    def _parse_lines(self, data):
+        # on a timed read, decode is the json and conversion to samples and
+        # split the rest: finding and cutting out the lines
+        diag = self._diag if self._timed else None
+        clock = time.perf_counter
+        decode = 0.0
+        start = clock() if diag is not None else 0.0
+        
+        buf = self._buf
+        buf += data
+        rows = []
+        while self.decoder is None:
+            idx = buf.find(b'\n')
+            if idx < 0:
+                break
+            line = bytes(buf[:idx]).decode('utf-8', errors='ignore').strip()
+            del buf[:idx + 1]
+            if diag is None:
+                d = self._handle_line(line)
+            else:
+                t = clock()
+                d = self._handle_line(line)
+                decode += clock() - t
+            if d is not None:
+                rows.append(d)
+        self.rows += len(rows)
+        
+        if diag is None:
+            samples = rows_to_samples(rows)
+        else:
+            t = clock()
+            samples = rows_to_samples(rows)
+            end = clock()
+            diag.add('split', t - start - decode)
+            diag.add('decode', decode + end - t)
+        # switched mid-read, the rest is already binary
+        if self.decoder is not None and buf:
+            samples = np.concatenate((samples, self.decoder.feed(bytes(buf))))
+            buf.clear()
+        return samples
+    
+    def _handle_line(self, line):
+        if line == "OK" and self._bin_requested:
+            self._bin_requested = False
+            self.decoder = FrameDecoder()
+            if self.on_status:
+                self.on_status(True, f"Connected: {self.port} (binary)")
+            return None
+        
+        if line.startswith('{') and line.endswith('}'):
+            try:
+                d = json.loads(line)
+            except ValueError:
+                # garbled on the wire, counted so it shows in diagnostics
+                self.parse_errors += 1
+                return None
+            if 'device' in d:
+                self.device_info = d
+                if self.binary and d.get('bin'):
+                    self._bin_requested = True
+                    self.send("BIN")
+                return None
+            return d
+        return None
+
+
+# --------------------------------
+# Simulated device
+# --------------------------------
+SIM_PORT = "SIM"
+
+WAVES = {
+    'dc': lambda x: np.zeros_like(x),
+    'sine': lambda x: np.sin(2 * np.pi * x),
+    'square': lambda x: np.where(x % 1.0 < 0.5, 1.0, -1.0),
+    'triangle': lambda x: 4 * np.abs(x % 1.0 - 0.5) - 1,
+    'sawtooth': lambda x: 2 * (x % 1.0) - 1,
+}
+
+
+class Waveform:
+    # offset + amp * shape(freq * t), t in seconds
+    def __init__(self, kind='dc', offset=0.0, amp=0.0, freq=1.0):
+        if kind not in WAVES:
+            raise ValueError(f"unknown waveform {kind}, one of {', '.join(WAVES)}")
+        self.kind = kind
+        self.offset = offset
+        self.amp = amp
+        self.freq = freq
+    
+    @classmethod
+    def parse(cls, spec: str) -> 'Waveform':
+        # "kind[:offset[,amp[,freq]]]", e.g. "sine:12,0.5,2" or "dc:0.5"
+        kind, _, args = spec.partition(':')
+        values = [float(a) for a in args.split(',') if a]
+        return cls(kind, *values)
+    
+    def __call__(self, t):
+        return self.offset + self.amp * WAVES[self.kind](self.freq * t)
+
+
+class SignalSource:
+    # what a simulated board measures: voltage and current waveforms with
+    # gaussian noise on top and, for fault testing, dips to half voltage
+    # (fault_rate per second). SimulatedDevice and the pty VirtualDevice in
+    # boardtester.simulator both sample one, so they simulate the same board
+    def __init__(self, v=None, i=None, v_noise=0.02, i_noise=0.002, fault_rate=0.0, seed=None):
+        self.v = v or Waveform('sine', 12.0, 0.1, 0.2)
+        self.i = i or Waveform('dc', 0.5)
+        self.v_noise = v_noise
+        self.i_noise = i_noise
+        self.fault_rate = fault_rate
+        self.rng = np.random.default_rng(seed)
+    
+    def sample(self, t, rate):
+        # (v, i) at times t, rate samples per second
+        n = len(t)
+        rng = self.rng
+        v = self.v(t) + rng.normal(0, self.v_noise, n)
+        i = self.i(t) + rng.normal(0, self.i_noise, n)
+        if n and self.fault_rate and rng.random() < self.fault_rate * n / rate:
+            v[rng.integers(n):] *= 0.5
+        return v, i
+
+
+class SimulatedDevice:
+    # stands in for a SerialReader on the "SIM" port: samples of a
+    # SignalSource at `rate`, a 1% sine on v at 0.2 Hz with relative
+    # `noise`, handed out as they come due
+    def __init__(self, rate=1000, v=12.0, i=0.5, f=50.0, noise=0.005, fault_rate=0.0, seed=None):
+        self.port = SIM_PORT
+        self.rate = rate
+        self.v = v
+        self.i = i
+        self.f = f
+        self.source = SignalSource(Waveform('sine', v, v * 0.01, 0.2), Waveform('dc', i),
+                                   v * noise, i * noise, fault_rate, seed)
+        self.device_info = {'device': 'simulator', 'version': 'sim'}
+        self.v_hist = np.zeros(RMS_WINDOW - 1)
+        self._last = time.time()
+        self._sent = 0.0
+    
+    def open(self, reset_delay=0.0):
+        self._last = time.time()
+        self._sent = 0.0
+    
+    def close(self):
+        pass
+    
+    def send(self, cmd):
+        pass
+    
+    def waiting(self) -> int:
+        return max(int((time.time() - self._last) * self.rate - self._sent), 0)
+    
+    def read(self) -> Dict[str, np.ndarray]:
+        n = self.waiting()
+        t = self._last + (self._sent + np.arange(1, n + 1)) / self.rate
+        self._sent += n
+        if self._sent > self.rate * 60:
+            # keep the float offsets small
+            self._last += self._sent / self.rate
+            self._sent = 0.0
+        return self._block(t)
+    
+    def _block(self, t):
+        v, i = self.source.sample(t, self.rate)
+        s, self.v_hist = derive_samples(v, i, self.f, self.v_hist)
+        return samples_to_block(s, t)
+
+
+def open_device(port, baud=115200, binary=True, on_status=None):
+    # reader for a port name, the simulator for "SIM". not opened yet
+    if port == SIM_PORT:
+        return SimulatedDevice()
+    return SerialReader(port, baud, binary, on_status)
+
+
+# --------------------------------
+# Streaming statistics
+# --------------------------------
+class ChannelStats:
+    # running count/min/max and Welford mean/variance, merged one block at a
+    # time, plus samples and seconds spent below/above the limits. a sample
+    # is charged the time since the previous one.
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.count = 0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.n_low = 0
+        self.n_high = 0
+        self.t_low = 0.0
+        self.t_high = 0.0
+        self.last_t = None
+    
+    def update(self, values, t=None, lo=None, hi=None):
+        n = len(values)
+        if not n:
+            return
+        
+        mean = float(values.mean())
+        m2 = float(np.square(values - mean).sum())
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        
+        if lo is not None and hi is not None:
+            low = values < lo
+            high = values > hi
+            self.n_low += int(np.count_nonzero(low))
+            self.n_high += int(np.count_nonzero(high))
+            if t is not None:
+                prev = self.last_t if self.last_t is not None else t[0]
+                dt = np.diff(t, prepend=prev)
+                self.t_low += float(dt[low].sum())
+                self.t_high += float(dt[high].sum())
+        
+        if t is not None:
+            self.last_t = float(t[-1])
+    
+    def merge(self, other):
+        # fold in stats of other samples, e.g. the earlier part of a resumed
+        # test. the time counters just add, the gap between the two isn't charged
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.n_low += other.n_low
+        self.n_high += other.n_high
+        self.t_low += other.t_low
+        self.t_high += other.t_high
+        if other.last_t is not None and (self.last_t is None or other.last_t > self.last_t):
+            self.last_t = other.last_t
+    
+    @property
+    def violations(self) -> int:
+        return self.n_low + self.n_high
+    
+    @property
+    def std(self) -> float:
+        return (self.m2 / self.count) ** 0.5 if self.count else 0.0
+    
+    def summary(self) -> Dict[str, float]:
+        # empty channels report zeros, like the old np.array([0]) fallback
+        if not self.count:
+            return {'min': 0.0, 'max': 0.0, 'avg': 0.0}
+        return {'min': self.min, 'max': self.max, 'avg': self.mean}
+
+
+# --------------------------------
+# Test recorder
+# --------------------------------
+# field names match the dicts stored in tests.raw_data
+RECORD_FIELDS = ('time', 'voltage', 'current', 'power', 'resistance', 'frequency', 'wavelength')
+
+
+class TestRecorder:
+    # one float64 row per field in chunks. a sample costs 7 * 8 = 56 bytes,
+    # appends are slice copies and chunks are only ever added, never grown or
+    # copied. the first chunk is small and each new one twice the last, up to
+    # chunk_size, so a short test (or an idle fixture) doesn't hold 3.6 MB.
+    def __init__(self, fields=RECORD_FIELDS, chunk_size=65536, first_chunk=1024):
+        self.fields = tuple(fields)
+        self.index = {name: n for n, name in enumerate(self.fields)}
+        self.chunk_size = chunk_size
+        self.first_chunk = min(first_chunk, chunk_size)
+        self.chunks = []
+        self.starts = []    # sample index of each chunk's first row
+        self.count = 0
+        self._room = 0      # unused rows in the last chunk
+    
+    def __len__(self):
+        return self.count
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.chunks)
+    
+    def clear(self):
+        self.chunks = []
+        self.starts = []
+        self.count = 0
+        self._room = 0
+    
+    def _add_chunk(self):
+        size = min(self.chunks[-1].shape[1] * 2, self.chunk_size) if self.chunks else self.first_chunk
+        self.chunks.append(np.empty((len(self.fields), size)))
+        self.starts.append(self.count)
+        self._room = size
+    
+    def extend(self, cols):
+        # cols: mapping of field -> array, or arrays in field order
+        if isinstance(cols, dict):
+            cols = [cols[name] for name in self.fields]
+        n = len(cols[0])
+        pos = 0
+        while pos < n:
+            if not self._room:
+                self._add_chunk()
+            chunk = self.chunks[-1]
+            fill = chunk.shape[1] - self._room
+            take = min(self._room, n - pos)
+            for row, col in enumerate(cols):
+                chunk[row, fill:fill + take] = col[pos:pos + take]
+            pos += take
+            self.count += take
+            self._room -= take
+    
+    def to_numpy(self, start=0, stop=None) -> np.ndarray:
+        # (fields, n) copy of samples [start, stop)
+        stop = self.count if stop is None else min(stop, self.count)
+        start = max(0, min(start, stop))
+        parts = []
+        k = max(bisect.bisect_right(self.starts, start) - 1, 0)
+        while k < len(self.chunks) and self.starts[k] < stop:
+            first = self.starts[k]
+            a = max(start - first, 0)
+            b = min(stop - first, self.chunks[k].shape[1])
+            parts.append(self.chunks[k][:, a:b])
+            k += 1
+        if not parts:
+            return np.empty((len(self.fields), 0))
+        return np.concatenate(parts, axis=1)
+    
+    def columns(self, start=0, stop=None) -> Dict[str, np.ndarray]:
+        arr = self.to_numpy(start, stop)
+        return {name: arr[n] for n, name in enumerate(self.fields)}
+    
+    def column(self, name) -> np.ndarray:
+        return self.to_numpy()[self.index[name]]
+
+
+# --------------------------------
+# Test session
+# --------------------------------
+class WriteRef:
+    # result of a queued job (e.g. a new test id) that jobs queued after it
+    # can take as an argument before it is known
+    __slots__ = ('value',)
+    
+    def __init__(self, value=None):
+        self.value = value
+
+
+class TestSession:
+    # one board under test: setup and limits, running stats, the recording and
+    # the IN_PROGRESS row it checkpoints into. no qt here; the main window and
+    # each fixture drive one, writes go through anything with DbWriter.submit()
+    def __init__(self):
+        self.info = {}
+        self.stats = {k: ChannelStats() for k in STAT_CHANNELS}
+        self.recorder = TestRecorder()
+        self.start = None
+        self.t0 = time.time()
+        self.ref = None
+        self.seq = 0
+        self.active = False
+        self.restoring = False
+    
+    def limits(self) -> Dict[str, tuple]:
+        i = self.info
+        return {'V': (i.get('v_min'), i.get('v_max')),
+                'I': (i.get('i_min'), i.get('i_max')),
+                'F': (i.get('f_min'), i.get('f_max'))}
+    
+    def begin(self, info, writer, resume=None, db=None, on_created=None, on_error=None):
+        # resume: IN_PROGRESS row to keep recording into (needs db). what it
+        # already recorded isn't read here, that can take a while: pass
+        # load_stats() of its samples to restore(), until then checkpoints
+        # leave the row's stats alone
+        self.info = info
+        self.recorder = TestRecorder()
+        for st in self.stats.values():
+            st.reset()
+        
+        if resume:
+            self.start = datetime.fromisoformat(resume['start_time'])
+            self.t0 = time.time() - (datetime.now() - self.start).total_seconds()
+            self.ref = WriteRef(resume['id'])
+            self.seq = db.next_sample_seq(resume['id'])
+            self.restoring = True
+        else:
+            self.start = datetime.now()
+            self.t0 = time.time()
+            self.ref = WriteRef()
+            self.seq = 0
+            self.restoring = False
+            record = self.record('IN_PROGRESS', self.start)
+            writer.submit('save_test', record, ref=self.ref, on_error=on_error,
+                          on_done=(lambda test_id: on_created(record, test_id)) if on_created else None)
+        self.active = True
+    
+    def load_stats(self, chunks) -> Dict[str, ChannelStats]:
+        # stats of (fields, array) chunks already recorded. only reads the
+        # limits, so it can run on another thread while samples come in
+        limits = self.limits()
+        stats = {k: ChannelStats() for k in STAT_CHANNELS}
+        names = {'V': 'voltage', 'I': 'current', 'P': 'power', 'F': 'frequency'}
+        for fields, arr in chunks:
+            cols = dict(zip(fields, arr))
+            for k, name in names.items():
+                lo, hi = limits.get(k, (None, None))
+                stats[k].update(cols[name], cols['time'], lo, hi)
+        return stats
+    
+    def restore(self, stats):
+        # merge load_stats() of the resumed test into the running stats
+        for k, st in stats.items():
+            self.stats[k].merge(st)
+        self.restoring = False
+    
+    def feed(self, t, b, limits=None):
+        # t: seconds since t0, b: sample block (see samples_to_block)
+        limits = limits or self.limits()
+        for k in STAT_CHANNELS:
+            lo, hi = limits.get(k, (None, None))
+            self.stats[k].update(b[k], t, lo, hi)
+        self.recorder.extend((t, b['V'], b['I'], b['P'], b['R'], b['F'], b['WL']))
+    
+    def verdict(self) -> str:
+        return 'FAIL' if any(self.stats[k].violations for k in ('V', 'I', 'F')) else 'PASS'
+    
+    def record(self, status, end=None) -> Dict:
+        end = end or datetime.now()
+        st = {k: self.stats[k].summary() for k in STAT_CHANNELS}
+        return {
+            'name': self.info.get('name', ''),
+            'board': self.info.get('board', ''),
+            'serial_num': self.info.get('serial', ''),
+            'operator': self.info.get('operator', ''),
+            'start_time': self.start.isoformat(),
+            'end_time': end.isoformat(),
+            'duration': (end - self.start).total_seconds(),
+            'status': status,
+            'v_min': st['V']['min'],
+            'v_max': st['V']['max'],
+            'v_avg': st['V']['avg'],
+            'i_min': st['I']['min'],
+            'i_max': st['I']['max'],
+            'i_avg': st['I']['avg'],
+            'p_min': st['P']['min'],
+            'p_max': st['P']['max'],
+            'p_avg': st['P']['avg'],
+            'f_min': st['F']['min'],
+            'f_max': st['F']['max'],
+            'f_avg': st['F']['avg'],
+            'v_violations': self.stats['V'].violations,
+            'i_violations': self.stats['I'].violations,
+            'f_violations': self.stats['F'].violations,
+            'notes': self.info.get('notes', ''),
+            'raw_data': '',
+            'params': json.dumps(self.info)
+        }
+    
+    def _flush(self, writer, on_error=None):
+        # hand what the recorder holds to the writer, start a new one
+        rec, self.recorder = self.recorder, TestRecorder()
+        if rec.count:
+            writer.submit('save_samples', self.ref, rec, self.seq, on_error=on_error)
+            self.seq += -(-rec.count // SAMPLES_CHUNK)
+    
+    def checkpoint(self, writer, on_error=None):
+        # cheap on the calling thread: a recorder swap and two queued jobs
+        if not self.active:
+            return
+        self._flush(writer, on_error)
+        if not self.restoring:
+            writer.submit('update_test', self.ref, self.record('IN_PROGRESS'), Database.CHECKPOINT_COLS,
+                          on_error=on_error)
+    
+    def finish(self, status, writer, on_saved=None, on_error=None) -> Dict:
+        # on_saved(record, test_id) once the final row is committed
+        self.active = False
+        record = self.record(status)
+        self._flush(writer, on_error)
+        ref = self.ref
+        # stats of the part before a resume never arrived: keep the checkpointed ones
+        cols = ('end_time', 'duration', 'status') if self.restoring else None
+        self.restoring = False
+        writer.submit('update_test', ref, record, cols, on_error=on_error,
+                      on_done=(lambda _: on_saved(record, ref.value)) if on_saved else None)
+        return record
+
+
+# --------------------------------
+# Headless test run
+# --------------------------------
+def run_test(device, db, info, duration, checkpoint=5.0, reset_delay=2.0, poll=0.01, stop=None) -> Dict:
+    # one test from start to the saved verdict on the calling thread. device
+    # is opened and closed here; stop() returning True ends the test early
+    # as ABORTED. returns the final record with its 'id' and 'samples'
+    writer = SyncWriter(db)
+    test = TestSession()
+    device.open(reset_delay)
+    try:
+        test.begin(info, writer)
+        limits = test.limits()
+        end = test.t0 + duration
+        next_ckpt = time.time() + checkpoint
+        status = None
+        while status is None:
+            if device.waiting():
+                b = device.read()
+                if len(b['t']):
+                    test.feed(b['t'] - test.t0, b, limits)
+            else:
+                time.sleep(poll)
+            
+            now = time.time()
+            if now >= end:
+                # a device that sent nothing didn't test anything
+                status = test.verdict() if test.stats['V'].count else 'ABORTED'
+            elif stop is not None and stop():
+                status = 'ABORTED'
+            elif now >= next_ckpt:
+                test.checkpoint(writer)
+                next_ckpt = now + checkpoint
+    except BaseException:
+        # e.g. ctrl-c: keep what was recorded
+        if test.active:
+            test.finish('ABORTED', writer)
+        raise
+    finally:
+        device.close()
+    
+    count = test.stats['V'].count
+    record = test.finish(status, writer)
+    record['id'] = test.ref.value
+    record['samples'] = count
+    return record
@@ -0,0 +1,355 @@
+# Virtual board tester: a pseudo-terminal that talks like arduino-frimware.ino,
+# for running SerialWorker, the gui and the headless runner without hardware.
+#
+#   python -m boardtester.simulator [--rate 10000] [--v sine:12,0.5,2] [--garble 0.001]
+#
+# prints the device path (or makes --link point at it) and runs until ctrl-c.
+# like the real board it resets when the host opens the port: boot delay,
+# BOARD_TESTER_READY, then json lines until the host asks for BIN. the
+# samples come from the same SignalSource as SimulatedDevice. linux only: it
+# polls the pty master, which macos's poll() doesn't support for ttys.
+import os
+import sys
+import pty
+import tty
+import time
+import fcntl
+import select
+import argparse
+import threading
+
+import numpy as np
+
+from boardtester.core import (
+    FRAME_SIZE, RMS_WINDOW, SPEED_OF_LIGHT, WAVES, Waveform, SignalSource, derive_samples, encode_frames
+)
+
+BANNER = b"BOARD_TESTER_READY\r\n"
+INFO = '{"device":"Board Tester","version":"3.1"%s}\r\n'
+
+
+# --------------------------------
+# Wire format
+# --------------------------------
+def format_lines(v, i, f, v_hist=None) -> list:
+    # the firmware's sendData(): one json line per sample, same decimals.
+    # v_hist: the previous RMS_WINDOW - 1 voltages (zeros after boot)
+    if v_hist is None:
+        v_hist = np.zeros(RMS_WINDOW - 1)
+    s, _ = derive_samples(v, i, f, v_hist)
+    wl = SPEED_OF_LIGHT / f if f > 0 else 0.0
+    lines = []
+    for vv, ii, r_ms, p_p in zip(s['V'].tolist(), s['I'].tolist(), s['Vrms'].tolist(), s['Vpp'].tolist()):
+        r = vv / ii if ii != 0 else 0.0
+        lines.append(f'{{"V":{vv:.3f},"I":{ii:.4f},"P":{vv * ii:.3f},"R":{r:.2f},"F":{f:.1f},'
+                     f'"WL":{wl:.2f},"Vrms":{r_ms:.3f},"Vpp":{p_p:.3f}}}\r\n'.encode())
+    return lines
+
+
+# --------------------------------
+# Virtual device
+# --------------------------------
+class VirtualDevice:
+    # one simulated board on its own pty and thread:
+    #
+    #   with VirtualDevice(rate=10000, garble=0.001) as dev:
+    #       SerialWorker().connect_to(dev.path)
+    #
+    # rate          binary frames per second (the firmware does 1000)
+    # json_rate     json lines per second (the firmware does 20)
+    # v, i          Waveform for voltage and current, noise is added on top
+    # freq          pulses per second on the frequency input, counted once
+    #               a second like the firmware (so 0 for the first second)
+    # binary        advertise "bin" in the INFO reply
+    # garble, drop  chance per line / frame of a corrupted byte / losing it
+    # disconnect_every  seconds between simulated unplugs, the device comes
+    #               back on a new pty after reconnect_delay (see on_path)
+    # baud          cap the output at baud / 10 bytes/s like a real uart,
+    #               None for as fast as the host reads
+    # boot_delay    from the port being opened to the banner
+    # link          symlink kept pointing at the current pty
+    def __init__(self, rate=1000, json_rate=20, v=None, i=None, freq=50.0,
+                 v_noise=0.02, i_noise=0.002, binary=True, garble=0.0, drop=0.0,
+                 disconnect_every=None, reconnect_delay=1.0, baud=None, boot_delay=0.1,
+                 link=None, on_path=None, seed=None):
+        self.rate = rate
+        self.json_rate = json_rate
+        self.rng = np.random.default_rng(seed)
+        self.source = SignalSource(v, i, v_noise, i_noise, seed=self.rng)
+        self.freq = freq
+        self.binary = binary
+        self.garble = garble
+        self.drop = drop
+        self.disconnect_every = disconnect_every
+        self.reconnect_delay = reconnect_delay
+        self.baud = baud
+        self.boot_delay = boot_delay
+        self.link = link
+        self.on_path = on_path
+        
+        self.path = None
+        self.stats = dict.fromkeys(
+            ('boots', 'lines', 'frames', 'garbled', 'dropped', 'skipped', 'commands', 'disconnects'), 0)
+        self._master = None
+        self._thread = None
+        self._stop = threading.Event()
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def start(self) -> str:
+        self._stop.clear()
+        self._open_pty()
+        self._thread = threading.Thread(target=self._run, name='VirtualDevice', daemon=True)
+        self._thread.start()
+        return self.path
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._close_pty()
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
+    
+    # pty
+    def _open_pty(self):
+        master, slave = pty.openpty()
+        self.path = os.ttyname(slave)
+        tty.setraw(slave)
+        # nobody holds the slave open, so POLLHUP on the master says
+        # whether a host has the port open
+        os.close(slave)
+        fcntl.fcntl(master, fcntl.F_SETFL, fcntl.fcntl(master, fcntl.F_GETFL) | os.O_NONBLOCK)
+        self._master = master
+        if self.link:
+            tmp = f"{self.link}.tmp"
+            if os.path.lexists(tmp):
+                os.unlink(tmp)
+            os.symlink(self.path, tmp)
+            os.replace(tmp, self.link)
+        if self.on_path:
+            self.on_path(self.link or self.path)
+    
+    def _close_pty(self):
+        if self._master is not None:
+            os.close(self._master)
+            self._master = None
+    
+    def _run(self):
+        while True:
+            self._serve()
+            if self._stop.is_set():
+                return
+            # unplugged: gone for a while, then back on a new pty
+            self._close_pty()
+            self.stats['disconnects'] += 1
+            if self._stop.wait(self.reconnect_delay):
+                return
+            self._open_pty()
+    
+    def _serve(self):
+        poll = select.poll()
+        poll.register(self._master, select.POLLIN | select.POLLHUP)
+        unplug = time.monotonic() + self.disconnect_every if self.disconnect_every else None
+        connected = False
+        while not self._stop.is_set():
+            events = poll.poll(1)
+            now = time.monotonic()
+            if unplug is not None and now >= unplug:
+                return
+            if any(ev & select.POLLHUP for _, ev in events):
+                # port closed, output would go nowhere. reopening resets the
+                # board like the arduino's dtr reset does
+                connected = False
+                time.sleep(0.005)
+                continue
+            if not connected:
+                connected = True
+                self._boot(now)
+            
+            if any(ev & select.POLLIN for _, ev in events):
+                try:
+                    self._rx += os.read(self._master, 4096)
+                except (BlockingIOError, OSError):
+                    pass
+                self._commands()
+            
+            if now >= self._boot_at:
+                if not self._banner:
+                    self._banner = True
+                    self._out += BANNER
+                    self._stream(now)
+                self._produce(now)
+            self._flush(now)
+    
+    # firmware state
+    def _boot(self, now):
+        self.stats['boots'] += 1
+        self._boot_at = now + self.boot_delay
+        self._banner = False
+        self._rx = b''
+        self._out = bytearray()
+        self._sent = 0
+        self._sent_t0 = now
+        self._bin = False
+        self._seq = 0
+        self._v_hist = np.zeros(RMS_WINDOW - 1)
+        self._pulse_freq = 0.0
+        self._freq_at = now
+        self._stream(now)
+    
+    def _stream(self, now):
+        # (re)start the sample clock, e.g. after switching to binary
+        self._t0 = now
+        self._k = 0
+    
+    def _commands(self):
+        while b'\n' in self._rx:
+            line, self._rx = self._rx.split(b'\n', 1)
+            cmd = line.decode('ascii', errors='ignore').strip()
+            self.stats['commands'] += 1
+            if cmd == "PING":
+                self._out += b"PONG\r\n"
+            elif cmd == "INFO":
+                self._out += (INFO % (',"bin":1' if self.binary else '')).encode()
+            elif cmd == "BIN":
+                self._out += b"OK\r\n"
+                self._bin = True
+                self._seq = 0
+                self._stream(time.monotonic())
+            elif cmd == "JSON":
+                self._bin = False
+                self._out += b"OK\r\n"
+                self._stream(time.monotonic())
+            elif cmd == "RESET":
+                # pulse counting starts over, the last reading stays
+                self._seq = 0
+                self._freq_at = time.monotonic()
+                self._out += b"OK\r\n"
+    
+    def _produce(self, now):
+        # samples that came due since the last call. the board samples on
+        # whatever this thread does, so stalls here are caught up (up to a
+        # second). a full output buffer is the board's own problem: it
+        # blocks in Serial.write and those samples are never taken
+        if now - self._freq_at >= 1.0:
+            self._freq_at += 1.0
+            self._pulse_freq = float(int(self.freq + self.rng.random())) if self.freq > 0 else 0.0
+        
+        rate = self.rate if self._bin else self.json_rate
+        due = int((now - self._t0) * rate) - self._k
+        if due <= 0:
+            return
+        if len(self._out) > 65536 or due > rate:
+            self.stats['skipped'] += due
+            self._k += due
+            return
+        
+        t = (self._t0 - self._boot_at) + (self._k + np.arange(due)) / rate
+        self._k += due
+        v, i = self.source.sample(t, rate)
+        
+        if self._bin:
+            data = encode_frames(self._seq, v, i, self._pulse_freq)
+            self._seq = (self._seq + due) & 0xFF
+            self.stats['frames'] += due
+            self._out += self._faults(np.frombuffer(data, np.uint8).reshape(due, FRAME_SIZE))
+        else:
+            lines = format_lines(v, i, self._pulse_freq, self._v_hist)
+            self.stats['lines'] += due
+            self._out += self._faults(lines)
+        self._v_hist = np.concatenate((self._v_hist, v))[-(RMS_WINDOW - 1):]
+    
+    def _faults(self, units) -> bytes:
+        # units: (n, FRAME_SIZE) frame bytes or a list of encoded lines
+        n = len(units)
+        if not (self.garble or self.drop):
+            return units.tobytes() if isinstance(units, np.ndarray) else b''.join(units)
+        keep = self.rng.random(n) >= self.drop
+        bad = (self.rng.random(n) < self.garble) & keep
+        self.stats['dropped'] += int(n - keep.sum())
+        self.stats['garbled'] += int(bad.sum())
+        if isinstance(units, np.ndarray):
+            units = units.copy()
+            rows = np.flatnonzero(bad)
+            cols = self.rng.integers(0, FRAME_SIZE, len(rows))
+            units[rows, cols] ^= self.rng.integers(1, 256, len(rows)).astype(np.uint8)
+            return units[keep].tobytes()
+        out = []
+        for line, k, b in zip(units, keep.tolist(), bad.tolist()):
+            if not k:
+                continue
+            if b:
+                line = bytearray(line)
+                line[int(self.rng.integers(len(line)))] ^= int(self.rng.integers(1, 256))
+            out.append(bytes(line))
+        return b''.join(out)
+    
+    def _flush(self, now):
+        if not self._out:
+            return
+        size = len(self._out)
+        if self.baud:
+            budget = int((now - self._sent_t0) * self.baud / 10) - self._sent
+            size = min(size, budget)
+            if size <= 0:
+                return
+        try:
+            n = os.write(self._master, self._out[:size])
+        except (BlockingIOError, OSError):
+            return
+        del self._out[:n]
+        self._sent += n
+
+
+# --------------------------------
+# Command line
+# --------------------------------
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog='boardtester.simulator', description="Virtual board tester on a pty")
+    ap.add_argument('--rate', type=int, default=1000, help="binary frames per second")
+    ap.add_argument('--json-rate', type=int, default=20, help="json lines per second")
+    ap.add_argument('--v', type=Waveform.parse, default=Waveform('sine', 12.0, 0.1, 0.2),
+                    metavar='WAVE', help="voltage, kind[:offset[,amp[,freq]]] e.g. sine:12,0.5,2 "
+                    f"({', '.join(WAVES)})")
+    ap.add_argument('--i', type=Waveform.parse, default=Waveform('dc', 0.5), metavar='WAVE', help="current")
+    ap.add_argument('--freq', type=float, default=50.0, help="pulses per second on the frequency input")
+    ap.add_argument('--v-noise', type=float, default=0.02, help="voltage noise, V rms")
+    ap.add_argument('--i-noise', type=float, default=0.002, help="current noise, A rms")
+    ap.add_argument('--no-bin', action='store_true', help="old firmware, json only")
+    ap.add_argument('--garble', type=float, default=0.0, help="chance per line/frame of a corrupted byte")
+    ap.add_argument('--drop', type=float, default=0.0, help="chance per line/frame of losing it")
+    ap.add_argument('--disconnect-every', type=float, help="seconds between simulated unplugs")
+    ap.add_argument('--reconnect-delay', type=float, default=1.0)
+    ap.add_argument('--baud', type=int, help="limit output to a real uart's speed")
+    ap.add_argument('--boot-delay', type=float, default=0.1, help="seconds from port open to the banner")
+    ap.add_argument('--link', help="symlink to keep pointing at the device, e.g. /tmp/ttyBT0")
+    ap.add_argument('--seed', type=int)
+    args = ap.parse_args(argv)
+    
+    dev = VirtualDevice(
+        rate=args.rate, json_rate=args.json_rate, v=args.v, i=args.i, freq=args.freq,
+        v_noise=args.v_noise, i_noise=args.i_noise, binary=not args.no_bin,
+        garble=args.garble, drop=args.drop, disconnect_every=args.disconnect_every,
+        reconnect_delay=args.reconnect_delay, baud=args.baud, boot_delay=args.boot_delay,
+        link=args.link, on_path=lambda path: print(path, flush=True), seed=args.seed)
+    dev.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dev.stop()
+    print(' '.join(f"{k} {v}" for k, v in dev.stats.items()), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
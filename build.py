@@ -6,11 +6,15 @@ def main():
     # make sure pyinstaller is there
     subprocess.run([sys.executable, "-m", "pip", "install", "pyinstaller"])
     
+    # onefile unpacks the whole bundle to a temp dir on every launch,
+    # --onedir starts much faster on the line PCs
+    mode = "--onedir" if "--onedir" in sys.argv[1:] else "--onefile"
+    
     # build it
     subprocess.run([
         "pyinstaller",
         "--name=BoardTesterPro",
-        "--onefile",
+        mode,
         "--windowed",
         "--clean",
         "main.py"
@@ -2,22 +2,34 @@ import sys
 import json
 import time
 import sqlite3
+import gzip
 import os
+import threading
+import queue
 from datetime import datetime
-from collections import deque
-from typing import Optional, List, Dict
+from contextlib import nullcontext
+from typing import Optional
 import csv
 
-from PyQt5.QtWidgets import *
-from PyQt5.QtCore import *
-from PyQt5.QtGui import *
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QApplication, QCheckBox, QComboBox, QDateEdit, QDialog, QDialogButtonBox,
+    QDoubleSpinBox, QFileDialog, QFormLayout, QFrame, QGridLayout, QGroupBox, QHBoxLayout, QHeaderView,
+    QLabel, QLineEdit, QListWidget, QListWidgetItem, QMainWindow, QMessageBox, QProgressDialog,
+    QPushButton, QScrollArea, QSpinBox, QSplitter, QStatusBar, QStyle, QStyledItemDelegate, QTabWidget,
+    QTableView, QTextEdit, QVBoxLayout, QWidget
+)
+from PyQt5.QtCore import (
+    QAbstractListModel, QDate, QEvent, QModelIndex, QObject, QRectF, QSize, QThread, QTimer, Qt, pyqtSignal
+)
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QPen, QPolygonF
 
-import serial
-import serial.tools.list_ports
-import pyqtgraph as pg
-from pyqtgraph import PlotWidget
 import numpy as np
 
+from boardtester.core import (
+    Database, SerialReader, SimulatedDevice, SIM_PORT, TestSession, ChannelStats, Diagnostics,
+    DIAG_STAGES, WRITE_JOBS, run_job, SAMPLE_FIELDS, STAT_CHANNELS, rows_to_samples, samples_to_block
+)
+
 
 # --------------------------------
 # Stylesheet for dark theme
@@ -123,174 +135,12 @@ QListWidget::item:selected {
 """
 
 
-# --------------------------------
-# Database handler
-# --------------------------------
-class Database:
-    def __init__(self, path="test_records.db"):
-        self.path = path
-        self._init_tables()
-    
-    def _init_tables(self):
-        conn = sqlite3.connect(self.path)
-        c = conn.cursor()
-        
-        c.execute('''CREATE TABLE IF NOT EXISTS tests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            board TEXT,
-            serial_num TEXT,
-            operator TEXT,
-            start_time TEXT,
-            end_time TEXT,
-            duration REAL,
-            status TEXT,
-            v_min REAL, v_max REAL, v_avg REAL,
-            i_min REAL, i_max REAL, i_avg REAL,
-            p_min REAL, p_max REAL, p_avg REAL,
-            f_min REAL, f_max REAL, f_avg REAL,
-            v_violations INTEGER,
-            i_violations INTEGER,
-            f_violations INTEGER,
-            notes TEXT,
-            raw_data TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )''')
-        
-        c.execute('''CREATE TABLE IF NOT EXISTS templates (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE,
-            board_type TEXT,
-            v_min REAL, v_max REAL,
-            i_min REAL, i_max REAL,
-            f_min REAL, f_max REAL,
-            description TEXT
-        )''')
-        
-        conn.commit()
-        conn.close()
-    
-    def save_test(self, data: dict) -> int:
-        conn = sqlite3.connect(self.path)
-        c = conn.cursor()
-        
-        c.execute('''INSERT INTO tests 
-            (name, board, serial_num, operator, start_time, end_time, duration, status,
-             v_min, v_max, v_avg, i_min, i_max, i_avg, p_min, p_max, p_avg,
-             f_min, f_max, f_avg, v_violations, i_violations, f_violations, notes, raw_data)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
-            (data['name'], data['board'], data['serial_num'], data['operator'],
-             data['start_time'], data['end_time'], data['duration'], data['status'],
-             data['v_min'], data['v_max'], data['v_avg'],
-             data['i_min'], data['i_max'], data['i_avg'],
-             data['p_min'], data['p_max'], data['p_avg'],
-             data['f_min'], data['f_max'], data['f_avg'],
-             data['v_violations'], data['i_violations'], data['f_violations'],
-             data['notes'], data['raw_data']))
-        
-        test_id = c.lastrowid
-        conn.commit()
-        conn.close()
-        return test_id
-    
-    def get_all_tests(self) -> List[Dict]:
-        conn = sqlite3.connect(self.path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute('SELECT * FROM tests ORDER BY id DESC')
-        rows = c.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
-    
-    def get_test(self, test_id: int) -> Optional[Dict]:
-        conn = sqlite3.connect(self.path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute('SELECT * FROM tests WHERE id = ?', (test_id,))
-        row = c.fetchone()
-        conn.close()
-        return dict(row) if row else None
-    
-    def delete_test(self, test_id: int):
-        conn = sqlite3.connect(self.path)
-        c = conn.cursor()
-        c.execute('DELETE FROM tests WHERE id = ?', (test_id,))
-        conn.commit()
-        conn.close()
-    
-    def search(self, query: str) -> List[Dict]:
-        conn = sqlite3.connect(self.path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        q = f'%{query}%'
-        c.execute('''SELECT * FROM tests 
-                     WHERE board LIKE ? OR serial_num LIKE ? OR name LIKE ? OR operator LIKE ?
-                     ORDER BY id DESC''', (q, q, q, q))
-        rows = c.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
-    
-    def filter_by_status(self, status: str) -> List[Dict]:
-        conn = sqlite3.connect(self.path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute('SELECT * FROM tests WHERE status = ? ORDER BY id DESC', (status,))
-        rows = c.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
-    
-    def get_stats(self) -> Dict:
-        conn = sqlite3.connect(self.path)
-        c = conn.cursor()
-        
-        c.execute('SELECT COUNT(*) FROM tests')
-        total = c.fetchone()[0]
-        
-        c.execute('SELECT COUNT(*) FROM tests WHERE status = "PASS"')
-        passed = c.fetchone()[0]
-        
-        c.execute('SELECT COUNT(*) FROM tests WHERE status = "FAIL"')
-        failed = c.fetchone()[0]
-        
-        conn.close()
-        
-        rate = (passed / total * 100) if total > 0 else 0
-        return {'total': total, 'passed': passed, 'failed': failed, 'pass_rate': rate}
-    
-    # template stuff
-    def save_template(self, t: dict):
-        conn = sqlite3.connect(self.path)
-        c = conn.cursor()
-        c.execute('''INSERT OR REPLACE INTO templates 
-                     (name, board_type, v_min, v_max, i_min, i_max, f_min, f_max, description)
-                     VALUES (?,?,?,?,?,?,?,?,?)''',
-                  (t['name'], t['board_type'], t['v_min'], t['v_max'],
-                   t['i_min'], t['i_max'], t['f_min'], t['f_max'], t['description']))
-        conn.commit()
-        conn.close()
-    
-    def get_templates(self) -> List[Dict]:
-        conn = sqlite3.connect(self.path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute('SELECT * FROM templates ORDER BY name')
-        rows = c.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
-    
-    def delete_template(self, tid: int):
-        conn = sqlite3.connect(self.path)
-        c = conn.cursor()
-        c.execute('DELETE FROM templates WHERE id = ?', (tid,))
-        conn.commit()
-        conn.close()
-
-
 # --------------------------------
 # Serial communication thread
 # --------------------------------
 class SerialWorker(QThread):
     data_received = pyqtSignal(dict)
+    batch_received = pyqtSignal(object)
     status_changed = pyqtSignal(bool, str)
     error = pyqtSignal(str)
     
@@ -299,61 +149,466 @@ class SerialWorker(QThread):
         self.port = None
         self.baud = 115200
         self.running = False
-        self.ser = None
+        self.binary = True
+        self.reader = None
+        self.diag = None
+        
+        # batch_received fires when either limit is hit
+        self.batch_size = 2000
+        self.batch_latency = 0.02
+        self._pending = []
+        self._pending_n = 0
+        self._pending_since = 0.0
     
-    def connect_to(self, port, baud=115200):
+    @property
+    def device_info(self):
+        return self.reader.device_info if self.reader else {}
+    
+    def connect_to(self, port, baud=115200, binary=True):
         self.port = port
         self.baud = baud
+        self.binary = binary
         self.running = True
         self.start()
     
+    def set_diag(self, diag):
+        # a Diagnostics to record into, None to stop
+        self.diag = diag
+        if self.reader:
+            self.reader.diag = diag
+    
     def disconnect(self):
         self.running = False
         self.wait(1000)
-        if self.ser and self.ser.is_open:
-            self.ser.close()
+        if self.reader:
+            try:
+                self.reader.close()
+            except Exception:
+                pass
         self.status_changed.emit(False, "Disconnected")
     
     def send(self, cmd):
-        if self.ser and self.ser.is_open:
+        if self.reader:
             try:
-                self.ser.write(f"{cmd}\n".encode())
+                self.reader.send(cmd)
             except Exception as e:
                 self.error.emit(str(e))
     
     def run(self):
+        # pyserial is only needed once a port opens, not at startup
+        import serial
+        
+        self._pending = []
+        self._pending_n = 0
+        self.reader = reader = SerialReader(self.port, self.baud, self.binary,
+                                            on_status=self.status_changed.emit)
+        reader.diag = self.diag
         try:
-            self.ser = serial.Serial(self.port, self.baud, timeout=0.1)
-            time.sleep(2)  # arduino reset delay
+            reader.open()
             self.status_changed.emit(True, f"Connected: {self.port}")
             
-            buf = ""
             while self.running:
-                if self.ser.in_waiting:
+                if reader.waiting():
                     try:
-                        data = self.ser.read(self.ser.in_waiting).decode('utf-8', errors='ignore')
-                        buf += data
-                        
-                        while '\n' in buf:
-                            line, buf = buf.split('\n', 1)
-                            line = line.strip()
-                            if line.startswith('{') and line.endswith('}'):
-                                try:
-                                    self.data_received.emit(json.loads(line))
-                                except:
-                                    pass
+                        self._queue(reader.read())
                     except Exception as e:
                         self.error.emit(str(e))
                 else:
                     time.sleep(0.01)
+                self._flush()
+                if self.diag is not None:
+                    self.diag.pending = self._pending_n
+            self._flush(force=True)
         except serial.SerialException as e:
             self.status_changed.emit(False, f"Failed: {e}")
             self.error.emit(str(e))
+    
+    def _queue(self, block):
+        n = len(block['t'])
+        if n:
+            if not self._pending_n:
+                self._pending_since = time.time()
+            self._pending.append(block)
+            self._pending_n += n
+    
+    def _flush(self, force=False):
+        if not self._pending_n:
+            return
+        if not force and self._pending_n < self.batch_size and \
+                time.time() - self._pending_since < self.batch_latency:
+            return
+        
+        if len(self._pending) == 1:
+            block = self._pending[0]
+        else:
+            block = {k: np.concatenate([b[k] for b in self._pending]) for k in self._pending[0]}
+        self._pending = []
+        self._pending_n = 0
+        
+        n = len(block['t'])
+        diag = self.diag
+        for a in range(0, n, self.batch_size):
+            part = block if n <= self.batch_size else {k: v[a:a + self.batch_size] for k, v in block.items()}
+            if diag is not None:
+                diag.age('emit', part['t'][-1])
+            self.batch_received.emit(part)
+        
+        # per-sample dicts only for listeners that still want them
+        if self.receivers(self.data_received):
+            for row in zip(*(block[k].tolist() for k in SAMPLE_FIELDS)):
+                self.data_received.emit(dict(zip(SAMPLE_FIELDS, row)))
+
+
+# --------------------------------
+# Simulated device
+# --------------------------------
+class SimulatedWorker(QThread):
+    # stands in for SerialWorker on the "SIM" port: same signals, one batch
+    # of SimulatedDevice samples every batch_latency
+    data_received = pyqtSignal(dict)
+    batch_received = pyqtSignal(object)
+    status_changed = pyqtSignal(bool, str)
+    error = pyqtSignal(str)
+    
+    def __init__(self, seed=None, **kw):
+        super().__init__()
+        self.device = SimulatedDevice(seed=seed, **kw)
+        self.port = SIM_PORT
+        self.running = False
+        self.batch_latency = 0.02
+        self.diag = None
+    
+    @property
+    def device_info(self):
+        return self.device.device_info
+    
+    def connect_to(self, port=SIM_PORT, baud=115200, binary=True):
+        self.port = port
+        self.running = True
+        self.start()
+    
+    def disconnect(self):
+        self.running = False
+        self.wait(1000)
+        self.status_changed.emit(False, "Disconnected")
+    
+    def send(self, cmd):
+        pass
+    
+    def set_diag(self, diag):
+        self.diag = diag
+    
+    def run(self):
+        self.device.open()
+        self.status_changed.emit(True, f"Connected: {self.port} (simulated)")
+        while self.running:
+            time.sleep(self.batch_latency)
+            if self.device.waiting():
+                block = self.device.read()
+                diag = self.diag
+                if diag is not None:
+                    diag.samples += len(block['t'])
+                    diag.age('emit', block['t'][-1])
+                self.batch_received.emit(block)
+
+
+def make_worker(port, seed=None):
+    # device thread for a port name, the simulator for "SIM"
+    if port == SIM_PORT:
+        return SimulatedWorker(seed=seed)
+    return SerialWorker()
+
+
+# --------------------------------
+# Multi-channel ring buffer
+# --------------------------------
+class RingBuffer:
+    # channels are rows of one (channels, 2 * capacity) array. writes go to
+    # the right and when they reach the end the newest samples are moved back
+    # to the front, so the live window is always a contiguous slice and
+    # reading it never copies. each move is amortised over `capacity` writes.
+    def __init__(self, channels, capacity, dtype=np.float64):
+        self.channels = list(channels)
+        self.index = {name: n for n, name in enumerate(self.channels)}
+        self.dtype = np.dtype(dtype)
+        self.capacity = 0
+        self.data = np.empty((len(self.channels), 0), self.dtype)
+        self.start = 0
+        self.end = 0
+        self.total = 0  # samples appended since the last clear
+        self.resize(capacity)
+    
+    def __len__(self):
+        return self.end - self.start
+    
+    def __getitem__(self, name) -> np.ndarray:
+        return self.data[self.index[name], self.start:self.end]
+    
+    def view(self) -> np.ndarray:
+        return self.data[:, self.start:self.end]
+    
+    def clear(self):
+        self.start = 0
+        self.end = 0
+        self.total = 0
+    
+    def resize(self, capacity):
+        capacity = max(1, int(capacity))
+        if capacity == self.capacity:
+            return
+        keep = self.view()[:, -capacity:] if len(self) else None
+        data = np.empty((len(self.channels), 2 * capacity), self.dtype)
+        n = 0
+        if keep is not None:
+            n = keep.shape[1]
+            data[:, :n] = keep
+        self.data = data
+        self.capacity = capacity
+        self.start = 0
+        self.end = n
+    
+    def append(self, *values):
+        self.extend(np.asarray(values, self.dtype).reshape(len(self.channels), 1))
+    
+    def extend(self, block):
+        # block is a (channels, n) array or a mapping of channel -> 1-D array
+        if isinstance(block, dict):
+            cols = [block[name] for name in self.channels]
+        else:
+            cols = block
+        n = len(cols[0])
+        if not n:
+            return
+        self.total += n
+        
+        cap = self.capacity
+        if n >= cap:
+            for row, col in enumerate(cols):
+                self.data[row, :cap] = col[-cap:]
+            self.start = 0
+            self.end = cap
+            return
+        
+        if self.end + n > 2 * cap:
+            keep = min(len(self), cap - n)
+            self.data[:, :keep] = self.data[:, self.end - keep:self.end]
+            self.start = 0
+            self.end = keep
+        
+        for row, col in enumerate(cols):
+            self.data[row, self.end:self.end + n] = col
+        self.end += n
+        self.start = max(self.start, self.end - cap)
+
+
+# --------------------------------
+# Min/max decimation
+# --------------------------------
+def minmax_buckets(t, y, group):
+    # (first t, min, max) of each run of `group` samples, last run may be short
+    n = len(y)
+    full = n // group
+    cut = full * group
+    tb = t[:cut:group]
+    lo = y[:cut].reshape(full, group).min(axis=1)
+    hi = y[:cut].reshape(full, group).max(axis=1)
+    if cut < n:
+        tb = np.append(tb, t[cut])
+        lo = np.append(lo, y[cut:].min())
+        hi = np.append(hi, y[cut:].max())
+    return tb, lo, hi
+
+
+def add_curve(plot, color, name=None):
+    # the decimated curves are min/max zigzags, stroking them wide and
+    # antialiased costs far more than the rest of a frame
+    import pyqtgraph as pg
+    pen = pg.mkPen(color, width=1)
+    pen.setCosmetic(True)
+    return plot.plot(pen=pen, name=name, antialias=False)
+
+
+def interleave(tb, lo, hi):
+    x = np.repeat(tb, 2)
+    y = np.empty(2 * len(lo))
+    y[0::2] = lo
+    y[1::2] = hi
+    return x, y
+
+
+class _Level:
+    def __init__(self, names, size, group, buckets):
+        self.size = size    # raw samples per bucket
+        self.group = group  # items from the level below per bucket
+        self.buf = RingBuffer(['t'] + names, buckets)
+        self.n = 0          # items in the unfinished bucket
+        self.t = 0.0
+        self.lo = {}
+        self.hi = {}
+
+
+class MinMaxPyramid:
+    # keeps (t, min, max) per bucket for several channels at growing bucket
+    # sizes (base, base*factor, ...). levels are filled incrementally as
+    # samples arrive and outlive the raw buffer, so the coarse ones cover
+    # the whole run while fine zoom still comes from the raw samples.
+    def __init__(self, channels, capacity, base=16, factor=4, min_buckets=8192):
+        self.channels = list(channels)
+        self.base = base
+        self.factor = factor
+        self.min_buckets = min_buckets
+        self.capacity = capacity
+        self.levels = []
+        self.total = 0
+        self.t_first = None
+        self._build()
+    
+    def _build(self):
+        names = [f"{c}{s}" for c in self.channels for s in ('_lo', '_hi')]
+        self.levels = []
+        size = self.base
+        group = self.base
+        while True:
+            buckets = max(self.capacity // size + 2, self.min_buckets)
+            self.levels.append(_Level(names, size, group, buckets))
+            if size * self.min_buckets >= 1 << 32:
+                break
+            size *= self.factor
+            group = self.factor
+    
+    def clear(self):
+        self.total = 0
+        self.t_first = None
+        self._build()
+    
+    def resize(self, capacity):
+        # coarse levels keep their history, only the bucket counts change
+        self.capacity = capacity
+        for lv in self.levels:
+            lv.buf.resize(max(capacity // lv.size + 2, self.min_buckets))
+    
+    def extend(self, t, cols):
+        if not len(t):
+            return
+        if self.t_first is None:
+            self.t_first = float(t[0])
+        self.total += len(t)
+        self._feed(0, t, cols, cols)
+    
+    def _feed(self, k, t, lo, hi):
+        lv = self.levels[k]
+        g = lv.group
+        done_t = []
+        done_lo = {c: [] for c in self.channels}
+        done_hi = {c: [] for c in self.channels}
+        
+        # top up the unfinished bucket first
+        if lv.n:
+            take = min(g - lv.n, len(t))
+            for c in self.channels:
+                lv.lo[c] = min(lv.lo[c], lo[c][:take].min())
+                lv.hi[c] = max(lv.hi[c], hi[c][:take].max())
+            lv.n += take
+            t = t[take:]
+            lo = {c: a[take:] for c, a in lo.items()}
+            hi = {c: a[take:] for c, a in hi.items()}
+            if lv.n == g:
+                done_t.append([lv.t])
+                for c in self.channels:
+                    done_lo[c].append([lv.lo[c]])
+                    done_hi[c].append([lv.hi[c]])
+                lv.n = 0
+        
+        full = len(t) // g
+        cut = full * g
+        if full:
+            done_t.append(t[:cut:g])
+            for c in self.channels:
+                done_lo[c].append(lo[c][:cut].reshape(full, g).min(axis=1))
+                done_hi[c].append(hi[c][:cut].reshape(full, g).max(axis=1))
+        
+        if cut < len(t):
+            lv.n = len(t) - cut
+            lv.t = t[cut]
+            for c in self.channels:
+                lv.lo[c] = lo[c][cut:].min()
+                lv.hi[c] = hi[c][cut:].max()
+        
+        if not done_t:
+            return
+        tb = np.concatenate(done_t)
+        lob = {c: np.concatenate(done_lo[c]) for c in self.channels}
+        hib = {c: np.concatenate(done_hi[c]) for c in self.channels}
+        block = {'t': tb}
+        for c in self.channels:
+            block[f"{c}_lo"] = lob[c]
+            block[f"{c}_hi"] = hib[c]
+        lv.buf.extend(block)
+        if k + 1 < len(self.levels):
+            self._feed(k + 1, tb, lob, hib)
+    
+    def query(self, name, t0, t1, width, t_raw, y_raw):
+        # at most one min/max pair per pixel between t0 and t1, as (x, y)
+        # ready for setData
+        width = max(int(width), 1)
+        raw_all = len(t_raw) == self.total
+        if len(t_raw) and (raw_all or t_raw[0] <= t0):
+            a = max(int(np.searchsorted(t_raw, t0)) - 1, 0)
+            b = min(int(np.searchsorted(t_raw, t1, 'right')) + 1, len(t_raw))
+            n = b - a
+            if n <= 2 * width:
+                return t_raw[a:b], y_raw[a:b]
+            if n <= self.base * width:
+                return interleave(*minmax_buckets(t_raw[a:b], y_raw[a:b], -(-n // width)))
+        
+        for k, lv in enumerate(self.levels):
+            lt = lv.buf['t']
+            if not len(lt):
+                break
+            covers = lv.buf.total == len(lv.buf) or lt[0] <= t0
+            a = max(int(np.searchsorted(lt, t0, 'right')) - 1, 0)
+            b = int(np.searchsorted(lt, t1, 'right'))
+            if covers and b - a <= width or k == len(self.levels) - 1:
+                return self._assemble(k, a, b, name, t1, t_raw, y_raw)
+        return t_raw, y_raw
+    
+    def _assemble(self, k, a, b, name, t1, t_raw, y_raw):
+        lv = self.levels[k]
+        pieces = [(lv.buf['t'][a:b], lv.buf[f"{name}_lo"][a:b], lv.buf[f"{name}_hi"][a:b])]
+        if b < len(lv.buf):
+            return interleave(*pieces[0])
+        
+        # samples newer than the last full bucket come from finer levels, then raw
+        covered = lv.buf.total * lv.size
+        for j in range(k - 1, -1, -1):
+            fine = self.levels[j]
+            cnt = fine.buf.total - covered // fine.size
+            if cnt > 0:
+                pieces.append((fine.buf['t'][-cnt:], fine.buf[f"{name}_lo"][-cnt:],
+                               fine.buf[f"{name}_hi"][-cnt:]))
+                covered = fine.buf.total * fine.size
+        m = min(self.total - covered, len(t_raw))
+        if m > 0:
+            pieces.append((t_raw[-m:], y_raw[-m:], y_raw[-m:]))
+        
+        tb = np.concatenate([p[0] for p in pieces])
+        lo = np.concatenate([p[1] for p in pieces])
+        hi = np.concatenate([p[2] for p in pieces])
+        keep = tb <= t1
+        return interleave(tb[keep], lo[keep], hi[keep])
 
 
 # --------------------------------
 # Custom meter widget
 # --------------------------------
+STATUS_STYLE = "padding: 3px 10px; border-radius: 3px; font-size: 10px; font-weight: bold;"
+METER_STATES = {
+    'NORMAL': f"background-color: #00a86b; color: white; {STATUS_STYLE}",
+    'LOW': f"background-color: #ffa500; color: black; {STATUS_STYLE}",
+    'HIGH': f"background-color: #e94560; color: white; {STATUS_STYLE}",
+}
+
+
 class Meter(QFrame):
     def __init__(self, title, unit, color="#00d9ff"):
         super().__init__()
@@ -362,6 +617,8 @@ class Meter(QFrame):
         self.max_th = None
         self.value = 0
         self.violation = False
+        self._text = None
+        self._state = 'NORMAL'
         
         self.setStyleSheet(f"""
             Meter {{
@@ -389,18 +646,18 @@ class Meter(QFrame):
         self.unit_lbl.setStyleSheet(f"color: {color}; font-size: 14px;")
         layout.addWidget(self.unit_lbl)
         
-        self.status_lbl = QLabel("NORMAL")
+        self.status_lbl = QLabel(self._state)
         self.status_lbl.setAlignment(Qt.AlignCenter)
-        self.status_lbl.setStyleSheet("""
-            background-color: #00a86b; color: white;
-            padding: 3px 10px; border-radius: 3px;
-            font-size: 10px; font-weight: bold;
-        """)
+        self.status_lbl.setStyleSheet(METER_STATES[self._state])
         layout.addWidget(self.status_lbl)
     
     def set_value(self, val, decimals=3):
         self.value = val
-        self.value_lbl.setText(f"{val:.{decimals}f}")
+        # only touch qt when what's on screen actually changes
+        text = f"{val:.{decimals}f}"
+        if text != self._text:
+            self._text = text
+            self.value_lbl.setText(text)
         self._check()
     
     def set_thresholds(self, min_v, max_v):
@@ -413,29 +670,17 @@ class Meter(QFrame):
             return
         
         if self.value < self.min_th:
-            self.violation = True
-            self.status_lbl.setText("LOW")
-            self.status_lbl.setStyleSheet("""
-                background-color: #ffa500; color: black;
-                padding: 3px 10px; border-radius: 3px;
-                font-size: 10px; font-weight: bold;
-            """)
+            state = 'LOW'
         elif self.value > self.max_th:
-            self.violation = True
-            self.status_lbl.setText("HIGH")
-            self.status_lbl.setStyleSheet("""
-                background-color: #e94560; color: white;
-                padding: 3px 10px; border-radius: 3px;
-                font-size: 10px; font-weight: bold;
-            """)
+            state = 'HIGH'
         else:
-            self.violation = False
-            self.status_lbl.setText("NORMAL")
-            self.status_lbl.setStyleSheet("""
-                background-color: #00a86b; color: white;
-                padding: 3px 10px; border-radius: 3px;
-                font-size: 10px; font-weight: bold;
-            """)
+            state = 'NORMAL'
+        self.violation = state != 'NORMAL'
+        
+        if state != self._state:
+            self._state = state
+            self.status_lbl.setText(state)
+            self.status_lbl.setStyleSheet(METER_STATES[state])
 
 
 # --------------------------------
@@ -454,70 +699,461 @@ class StatusLight(QWidget):
         self.text = QLabel("Disconnected")
         self.text.setStyleSheet("color: #888;")
         layout.addWidget(self.text)
+        
+        self._connected = False
+        self._msg = "Disconnected"
     
     def set_connected(self, connected, msg=""):
+        msg = msg or ("Connected" if connected else "Disconnected")
+        if msg != self._msg:
+            self._msg = msg
+            self.text.setText(msg)
+        if connected == self._connected:
+            return
+        self._connected = connected
         if connected:
             self.dot.setStyleSheet("color: #00a86b; font-size: 20px;")
             self.text.setStyleSheet("color: #00a86b;")
-            self.text.setText(msg or "Connected")
         else:
             self.dot.setStyleSheet("color: #e94560; font-size: 20px;")
             self.text.setStyleSheet("color: #888;")
-            self.text.setText(msg or "Disconnected")
 
 
 # --------------------------------
-# Test record card
+# Test records list
 # --------------------------------
-class TestCard(QFrame):
-    clicked = pyqtSignal(int)
+STATUS_COLORS = {'PASS': '#00a86b', 'FAIL': '#e94560', 'ABORTED': '#ffa500', 'PENDING': '#888',
+                 'IN_PROGRESS': '#00d9ff'}
+
+
+class RecordsModel(QAbstractListModel):
+    # summary rows for the records list, fetched a page at a time as the
+    # view scrolls (see Database.get_page)
+    RecordRole = Qt.UserRole + 1
     
-    def __init__(self, record):
-        super().__init__()
-        self.record = record
-        self.record_id = record['id']
-        
-        status = record.get('status', 'PENDING')
-        colors = {'PASS': '#00a86b', 'FAIL': '#e94560', 'ABORTED': '#ffa500', 'PENDING': '#888'}
-        color = colors.get(status, '#888')
-        
-        self.setStyleSheet(f"""
-            TestCard {{
-                background-color: #16213e;
-                border: 2px solid {color};
-                border-radius: 8px;
-                padding: 10px;
-            }}
-            TestCard:hover {{
-                background-color: #1a3a5c;
-            }}
-        """)
-        self.setCursor(Qt.PointingHandCursor)
-        
-        layout = QVBoxLayout(self)
-        
-        # header row
-        header = QHBoxLayout()
-        title = QLabel(f"#{record['id']} - {record.get('name', 'Untitled')}")
-        title.setStyleSheet("font-size: 14px; font-weight: bold; color: #00d9ff;")
-        header.addWidget(title)
-        header.addStretch()
-        
-        status_lbl = QLabel(status)
-        status_lbl.setStyleSheet(f"background-color: {color}; color: white; padding: 3px 10px; border-radius: 3px; font-weight: bold;")
-        header.addWidget(status_lbl)
-        layout.addLayout(header)
+    def __init__(self, db, page=50, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.page = page
+        self.rows = []
+        self.query = ''
+        self.status = None
+        self.more = False
+    
+    def set_query(self, query='', status=None, rows=None):
+        # rows: first page when it was already fetched elsewhere
+        self.beginResetModel()
+        self.rows = list(rows or [])
+        self.query = query
+        self.status = status
+        self.more = rows is None or len(self.rows) == self.page
+        self.endResetModel()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        r = self.rows[index.row()]
+        if role == self.RecordRole:
+            return r
+        if role == Qt.DisplayRole:
+            return f"#{r['id']} - {r.get('name') or 'Untitled'}"
+        return None
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.more
+    
+    def fetchMore(self, parent=QModelIndex()):
+        before = self.rows[-1]['id'] if self.rows else None
+        page = self.db.get_page(before, self.page, self.query, self.status)
+        self.more = len(page) == self.page
+        if page:
+            n = len(self.rows)
+            self.beginInsertRows(QModelIndex(), n, n + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+    
+    def matches(self, r):
+        if self.status and r.get('status') != self.status:
+            return False
+        # same rule as the db search: every term is a substring of some field
+        text = ' '.join(str(r.get(k) or '') for k in ('board', 'serial_num', 'name', 'operator')).lower()
+        return all(t.lower() in text for t in self.query.split())
+    
+    def add_record(self, r):
+        # new results go on top without refetching the list
+        if not self.matches(r):
+            return
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.rows.insert(0, r)
+        self.endInsertRows()
+    
+    def update_record(self, r):
+        # a test whose row changed (e.g. IN_PROGRESS -> PASS), added if new
+        for n, old in enumerate(self.rows):
+            if old['id'] == r['id']:
+                break
+        else:
+            self.add_record(r)
+            return
+        if self.matches(r):
+            self.rows[n] = r
+            self.dataChanged.emit(self.index(n), self.index(n))
+        else:
+            self.beginRemoveRows(QModelIndex(), n, n)
+            del self.rows[n]
+            self.endRemoveRows()
+
+
+class RecordDelegate(QStyledItemDelegate):
+    # paints the record card straight onto the view, no widgets per row
+    HEIGHT = 76
+    
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.HEIGHT)
+    
+    def paint(self, p, option, index):
+        r = index.data(RecordsModel.RecordRole)
+        if not r:
+            return
+        status = r.get('status') or 'PENDING'
+        color = QColor(STATUS_COLORS.get(status, '#888'))
+        hover = option.state & QStyle.State_MouseOver
+        
+        p.save()
+        p.setRenderHint(QPainter.Antialiasing)
+        rect = QRectF(option.rect).adjusted(2, 3, -2, -3)
+        p.setPen(QPen(color, 2))
+        p.setBrush(QColor('#1a3a5c' if hover else '#16213e'))
+        p.drawRoundedRect(rect, 8, 8)
+        
+        inner = rect.adjusted(12, 8, -12, -8)
+        
+        # status badge
+        font = QFont(option.font)
+        font.setBold(True)
+        p.setFont(font)
+        fm = QFontMetrics(font)
+        badge = QRectF(0, 0, fm.horizontalAdvance(status) + 20, fm.height() + 6)
+        badge.moveTopRight(inner.topRight())
+        p.setPen(Qt.NoPen)
+        p.setBrush(color)
+        p.drawRoundedRect(badge, 3, 3)
+        p.setPen(QColor('white'))
+        p.drawText(badge, Qt.AlignCenter, status)
+        
+        # title
+        title_font = QFont(font)
+        title_font.setPixelSize(14)
+        p.setFont(title_font)
+        p.setPen(QColor('#00d9ff'))
+        title_rect = QRectF(inner.left(), inner.top(), badge.left() - inner.left() - 8, badge.height())
+        title = f"#{r['id']} - {r.get('name') or 'Untitled'}"
+        p.drawText(title_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                   QFontMetrics(title_font).elidedText(title, Qt.ElideRight, int(title_rect.width())))
         
         # info row
-        info = QHBoxLayout()
-        info.addWidget(QLabel(f"Board: {record.get('board', 'N/A')}"))
-        info.addWidget(QLabel(f"Serial: {record.get('serial_num', 'N/A')}"))
-        info.addWidget(QLabel(f"Duration: {record.get('duration', 0):.1f}s"))
-        info.addStretch()
-        layout.addLayout(info)
+        p.setFont(option.font)
+        p.setPen(QColor('#eee'))
+        info = (f"Board: {r.get('board') or 'N/A'}      Serial: {r.get('serial_num') or 'N/A'}"
+                f"      Duration: {r.get('duration') or 0:.1f}s")
+        info_rect = QRectF(inner.left(), badge.bottom() + 6, inner.width(), inner.bottom() - badge.bottom() - 6)
+        p.drawText(info_rect, Qt.AlignLeft | Qt.AlignVCenter, info)
+        p.restore()
+
+
+# --------------------------------
+# Background record search
+# --------------------------------
+class SearchWorker(QThread):
+    # runs the first page of a records search off the gui thread. only the
+    # newest request matters: submit() interrupts the query in flight and
+    # results carry their generation so the ui can drop stale ones
+    results = pyqtSignal(int, str, object, object)
+    error = pyqtSignal(str)
+    
+    def __init__(self, db, page=50):
+        super().__init__()
+        self.db = db
+        self.page = page
+        self.gen = 0
+        self._req = None
+        self._busy = None
+        self._running = True
+        self._cond = threading.Condition()
     
-    def mousePressEvent(self, event):
-        self.clicked.emit(self.record_id)
+    def submit(self, query: str, status: Optional[str]) -> int:
+        with self._cond:
+            self.gen += 1
+            self._req = (self.gen, query, status)
+            if self._busy is not None:
+                self._busy.interrupt()
+            self._cond.notify()
+            return self.gen
+    
+    def stop(self):
+        with self._cond:
+            self._running = False
+            if self._busy is not None:
+                self._busy.interrupt()
+            self._cond.notify()
+        self.wait()
+    
+    def run(self):
+        conn = self.db._conn()
+        while True:
+            with self._cond:
+                while self._running and self._req is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                gen, query, status = self._req
+                self._req = None
+                self._busy = conn
+            
+            rows = None
+            try:
+                rows = self.db.get_page(None, self.page, query, status)
+            except sqlite3.OperationalError as e:
+                if 'interrupt' not in str(e):
+                    self.error.emit(str(e))
+            finally:
+                with self._cond:
+                    self._busy = None
+            
+            if rows is not None and gen == self.gen:
+                self.results.emit(gen, query, status, rows)
+
+
+# --------------------------------
+# Background export
+# --------------------------------
+class ExportWorker(QThread):
+    # streams tests (and optionally their samples) to csv in fixed-size
+    # batches on its own connection, so memory stays flat and the gui
+    # keeps running. a cancelled or failed export removes its files
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal(int)
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+    
+    def __init__(self, db, path, status=None, since=None, until=None,
+                 compress=False, samples=False, batch=1000):
+        super().__init__()
+        self.db = db
+        self.path = path
+        self.status = status
+        self.since = since
+        self.until = until
+        self.compress = compress
+        self.batch = batch
+        self.samples_path = None
+        if samples:
+            root = path[:-3] if path.endswith('.gz') else path
+            root, ext = os.path.splitext(root)
+            self.samples_path = f"{root}_samples{ext or '.csv'}" + ('.gz' if compress else '')
+        self.exported = 0
+        self._cancel = False
+    
+    def cancel(self):
+        self._cancel = True
+    
+    def _open(self, path):
+        if self.compress:
+            return gzip.open(path, 'wt', newline='', encoding='utf-8', compresslevel=6)
+        return open(path, 'w', newline='', encoding='utf-8')
+    
+    def run(self):
+        # exactly one of done / cancelled / failed, whatever happens, the
+        # progress dialog waits for it
+        error = "export stopped"
+        try:
+            self._export()
+            error = None
+        except Exception as e:
+            # not just io and db errors, a corrupt sample blob raises
+            # zlib.error or ValueError from decode_samples
+            error = str(e) or type(e).__name__
+        finally:
+            self.db.release()
+            if error is not None:
+                self._cleanup()
+                self.failed.emit(error)
+            elif self._cancel:
+                self._cleanup()
+                self.cancelled.emit()
+            else:
+                self.done.emit(self.exported)
+    
+    def _export(self):
+        self.exported = 0
+        total = self.db.count_tests(self.status, self.since, self.until)
+        cols = self.db.export_columns()
+        id_col = cols.index('id')
+        
+        with self._open(self.path) as f, \
+                (self._open(self.samples_path) if self.samples_path else nullcontext()) as sf:
+            writer = csv.writer(f)
+            writer.writerow(cols)
+            swriter = csv.writer(sf) if sf else None
+            header = False
+            
+            for rows in self.db.iter_tests(cols, self.status, self.since, self.until, self.batch):
+                if self._cancel:
+                    break
+                writer.writerows(rows)
+                if swriter:
+                    for r in rows:
+                        header = self._write_samples(swriter, r[id_col], header)
+                self.exported += len(rows)
+                self.progress.emit(self.exported, total)
+    
+    def _write_samples(self, writer, test_id, header):
+        for fields, arr in self.db.iter_samples(test_id):
+            if self._cancel:
+                break
+            if not header:
+                writer.writerow(['test_id', *fields])
+                header = True
+            writer.writerows([test_id, *row] for row in arr.T.tolist())
+        return header
+    
+    def _cleanup(self):
+        for p in (self.path, self.samples_path):
+            if p and os.path.exists(p):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+
+# --------------------------------
+# Background calls
+# --------------------------------
+def list_ports():
+    # (label, device) for every serial port, the simulator last. can take a
+    # while on windows, so the window asks for it off the gui thread
+    import serial.tools.list_ports
+    
+    ports = [(f"{p.device} - {p.description}", p.device) for p in serial.tools.list_ports.comports()]
+    ports.append((f"{SIM_PORT} - simulated device", SIM_PORT))
+    return ports
+
+
+class BackgroundCall(QThread):
+    # fn(*args) once on its own thread, result or error back as a signal.
+    # for one-off slow work like opening the database at startup. the
+    # thread's connection to db, if fn opened one, is closed after
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, fn, *args, db=None, parent=None):
+        super().__init__(parent)
+        self.fn = fn
+        self.args = args
+        self.db = db
+    
+    def run(self):
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        finally:
+            if self.db is not None:
+                self.db.release()
+        self.done.emit(result)
+
+
+# --------------------------------
+# Background database writer
+# --------------------------------
+class DbWriter(QThread):
+    # owns every write. jobs are Database method names plus args, queued from
+    # the gui and committed here in groups, one transaction per group.
+    # completion comes back as signals, and as the optional callbacks, which
+    # run on the gui thread
+    done = pyqtSignal(int, str, object)
+    failed = pyqtSignal(int, str, str)
+    
+    JOBS = WRITE_JOBS
+    
+    def __init__(self, db, max_group=64):
+        super().__init__()
+        self.db = db
+        self.max_group = max_group
+        self._q = queue.Queue()
+        self._token = 0
+        self._callbacks = {}
+        self.done.connect(self._on_done)
+        self.failed.connect(self._on_failed)
+    
+    def submit(self, job: str, *args, on_done=None, on_error=None, ref=None) -> int:
+        # ref: WriteRef that receives the result once the job has run
+        if job not in self.JOBS:
+            raise ValueError(f"unknown write job {job}")
+        self._token += 1
+        if on_done or on_error:
+            self._callbacks[self._token] = (on_done, on_error)
+        self._q.put((self._token, job, args, ref))
+        return self._token
+    
+    def pending(self) -> int:
+        return self._q.qsize()
+    
+    def stop(self):
+        # everything queued before stop() is still written
+        self._q.put(None)
+        self.wait()
+    
+    def run(self):
+        while True:
+            group = [self._q.get()]
+            while group[-1] is not None and len(group) < self.max_group:
+                try:
+                    group.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = group[-1] is None
+            jobs = [j for j in group if j is not None]
+            if jobs:
+                self._write(jobs)
+            if stop:
+                return
+    
+    def _write(self, jobs):
+        try:
+            with self.db._tx():
+                results = [run_job(self.db, job, args, ref) for _, job, args, ref in jobs]
+        except Exception:
+            # rolled back, so nothing the group produced exists
+            for j in jobs:
+                if j[3] is not None:
+                    j[3].value = None
+            # one bad job shouldn't take the group down, redo them one by one
+            if len(jobs) > 1:
+                for j in jobs:
+                    self._write([j])
+                return
+            token, job = jobs[0][:2]
+            self.failed.emit(token, job, str(sys.exc_info()[1]))
+            return
+        
+        for (token, job, _, _), result in zip(jobs, results):
+            self.done.emit(token, job, result)
+    
+    def _on_done(self, token, job, result):
+        on_done, _ = self._callbacks.pop(token, (None, None))
+        if on_done:
+            on_done(result)
+    
+    def _on_failed(self, token, job, msg):
+        _, on_error = self._callbacks.pop(token, (None, None))
+        if on_error:
+            on_error(msg)
 
 
 # --------------------------------
@@ -651,9 +1287,18 @@ class NewTestDialog(QDialog):
 # Dialog: Test Details
 # --------------------------------
 class TestDetailsDialog(QDialog):
-    def __init__(self, record, parent=None):
+    # raw samples kept from the end of a recording for zooming in, the whole
+    # of it is only in a min/max pyramid so hours at 10 kHz stay small
+    DETAIL_RAW = 500000
+    
+    def __init__(self, record, parent=None, db=None):
         super().__init__(parent)
         self.record = record
+        self.db = db
+        self.pyramid = None
+        self.raw = None
+        self.plot = None
+        self._cancel = False
         self.setWindowTitle(f"Test #{record['id']}")
         self.setMinimumSize(700, 500)
         
@@ -666,7 +1311,6 @@ class TestDetailsDialog(QDialog):
         
         # header
         status = record.get('status', 'PENDING')
-        colors = {'PASS': '#00a86b', 'FAIL': '#e94560', 'ABORTED': '#ffa500', 'PENDING': '#888'}
         
         header = QHBoxLayout()
         title = QLabel(f"Test #{record['id']}: {record.get('name', 'Untitled')}")
@@ -675,7 +1319,7 @@ class TestDetailsDialog(QDialog):
         header.addStretch()
         
         status_lbl = QLabel(status)
-        status_lbl.setStyleSheet(f"background-color: {colors.get(status)}; color: white; padding: 8px 16px; border-radius: 5px; font-weight: bold;")
+        status_lbl.setStyleSheet(f"background-color: {STATUS_COLORS.get(status, '#888')}; color: white; padding: 8px 16px; border-radius: 5px; font-weight: bold;")
         header.addWidget(status_lbl)
         content_layout.addLayout(header)
         
@@ -737,32 +1381,15 @@ class TestDetailsDialog(QDialog):
             notes_layout.addWidget(notes)
             content_layout.addWidget(notes_grp)
         
-        # graph if we have data
-        raw = record.get('raw_data')
-        if raw and raw != '[]':
-            try:
-                data = json.loads(raw)
-                if data:
-                    graph_grp = QGroupBox("Graph")
-                    graph_layout = QVBoxLayout(graph_grp)
-                    
-                    plot = PlotWidget()
-                    plot.setBackground('#1a1a2e')
-                    plot.showGrid(x=True, y=True, alpha=0.3)
-                    plot.addLegend()
-                    
-                    times = [d.get('time', i) for i, d in enumerate(data)]
-                    volts = [d.get('voltage', 0) for d in data]
-                    amps = [d.get('current', 0) for d in data]
-                    
-                    plot.plot(times, volts, pen=pg.mkPen('#ff6b6b', width=2), name='V')
-                    plot.plot(times, amps, pen=pg.mkPen('#4ecdc4', width=2), name='I')
-                    plot.setMinimumHeight(250)
-                    
-                    graph_layout.addWidget(plot)
-                    content_layout.addWidget(graph_grp)
-            except:
-                pass
+        # graph, filled in by _on_loaded. the recording is read on a
+        # BackgroundCall and the group hidden if there is none
+        self.graph_grp = QGroupBox("Graph")
+        self.graph_layout = QVBoxLayout(self.graph_grp)
+        self.graph_label = QLabel("Loading samples...")
+        self.graph_label.setAlignment(Qt.AlignCenter)
+        self.graph_label.setStyleSheet("color: #888;")
+        self.graph_layout.addWidget(self.graph_label)
+        content_layout.addWidget(self.graph_grp)
         
         content_layout.addStretch()
         scroll.setWidget(content)
@@ -782,12 +1409,101 @@ class TestDetailsDialog(QDialog):
         btn_layout.addWidget(close_btn)
         
         layout.addLayout(btn_layout)
+        
+        self.loader = BackgroundCall(self._load, db=self.db, parent=self)
+        self.loader.done.connect(self._on_loaded)
+        self.loader.failed.connect(lambda msg: self.graph_label.setText(f"Could not read the samples: {msg}"))
+        self.loader.start()
+    
+    def done(self, r):
+        # the loader must not outlive the dialog
+        self._cancel = True
+        self.loader.wait()
+        super().done(r)
+    
+    def _load(self):
+        # BackgroundCall thread: one stored chunk at a time into the pyramid
+        # and the raw tail, None if the test has no samples
+        pyramid = MinMaxPyramid(['V', 'I'], self.DETAIL_RAW)
+        raw = RingBuffer(['t', 'V', 'I'], self.DETAIL_RAW)
+        
+        def add(t, v, i):
+            pyramid.extend(t, {'V': v, 'I': i})
+            raw.extend((t, v, i))
+        
+        if self.db:
+            for fields, arr in self.db.iter_samples(self.record['id']):
+                if self._cancel:
+                    return None
+                cols = dict(zip(fields, arr))
+                add(cols['time'], cols['voltage'], cols['current'])
+        if not pyramid.total:
+            legacy = self._legacy_samples(self.record)
+            if legacy:
+                add(legacy['time'], legacy['voltage'], legacy['current'])
+        return (pyramid, raw) if pyramid.total else None
+    
+    def _on_loaded(self, result):
+        if result is None:
+            self.graph_grp.hide()
+            return
+        self.pyramid, self.raw = result
+        self.graph_grp.setTitle(f"Graph ({self.pyramid.total} samples)")
+        self.graph_layout.removeWidget(self.graph_label)
+        self.graph_label.deleteLater()
+        
+        import pyqtgraph as pg
+        plot = pg.PlotWidget()
+        plot.setBackground('#1a1a2e')
+        plot.showGrid(x=True, y=True, alpha=0.3)
+        plot.addLegend()
+        plot.setMinimumHeight(250)
+        self.curves = [('V', add_curve(plot, '#ff6b6b', 'V')),
+                       ('I', add_curve(plot, '#4ecdc4', 'I'))]
+        plot.getViewBox().sigXRangeChanged.connect(self._on_range_changed)
+        self.graph_layout.addWidget(plot)
+        self.plot = plot
+        self._update_plot()
+    
+    def _update_plot(self):
+        # same decimation as the live plots, a min/max pair per pixel
+        vb = self.plot.getViewBox()
+        t = self.raw['t']
+        if vb.autoRangeEnabled()[0]:
+            t0, t1 = self.pyramid.t_first, t[-1]
+        else:
+            t0, t1 = vb.viewRange()[0]
+        width = max(int(vb.width()), 100)
+        for name, curve in self.curves:
+            curve.setData(*self.pyramid.query(name, t0, t1, width, t, self.raw[name]))
+    
+    def _on_range_changed(self, *_):
+        if not self.plot.getViewBox().autoRangeEnabled()[0]:
+            self._update_plot()
+    
+    @staticmethod
+    def _legacy_samples(record):
+        # older tests only kept the last 1000 samples as json in raw_data
+        raw = record.get('raw_data')
+        if not raw or raw == '[]':
+            return None
+        try:
+            data = json.loads(raw)
+        except:
+            return None
+        if not data:
+            return None
+        return {
+            'time': np.array([d.get('time', i) for i, d in enumerate(data)], dtype=float),
+            'voltage': np.array([d.get('voltage', 0) for d in data], dtype=float),
+            'current': np.array([d.get('current', 0) for d in data], dtype=float),
+        }
     
     def _export(self):
         fname, _ = QFileDialog.getSaveFileName(
             self, "Export",
             f"test_report_{self.record['id']}.txt",
-            "Text Files (*.txt);;HTML Files (*.html)"
+            "Text Files (*.txt);;HTML Files (*.html);;Samples CSV (*.csv)"
         )
         
         if not fname:
@@ -795,9 +1511,29 @@ class TestDetailsDialog(QDialog):
         
         r = self.record
         
-        if fname.endswith('.html'):
+        if fname.endswith('.csv'):
+            # streamed a stored chunk at a time, the dialog doesn't keep them
+            with open(fname, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                header = False
+                for fields, arr in (self.db.iter_samples(r['id']) if self.db else ()):
+                    if not header:
+                        writer.writerow(fields)
+                        header = True
+                    writer.writerows(arr.T.tolist())
+                if not header:
+                    legacy = self._legacy_samples(r)
+                    if legacy:
+                        keys = list(legacy)
+                        writer.writerow(keys)
+                        writer.writerows(zip(*(legacy[k].tolist() for k in keys)))
+                        header = True
+            if not header:
+                os.remove(fname)
+                QMessageBox.information(self, "Info", "No samples stored for this test")
+                return
+        elif fname.endswith('.html'):
             status = r.get('status', 'PENDING')
-            colors = {'PASS': '#00a86b', 'FAIL': '#e94560', 'ABORTED': '#ffa500', 'PENDING': '#888'}
             
             html = f"""<!DOCTYPE html>
 <html>
@@ -806,7 +1542,7 @@ class TestDetailsDialog(QDialog):
 body {{ font-family: Arial; margin: 40px; }}
 .container {{ max-width: 800px; margin: auto; }}
 h1 {{ color: #333; }}
-.status {{ display: inline-block; padding: 8px 16px; border-radius: 5px; color: white; background: {colors.get(status)}; }}
+.status {{ display: inline-block; padding: 8px 16px; border-radius: 5px; color: white; background: {STATUS_COLORS.get(status, '#888')}; }}
 table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
 th, td {{ padding: 10px; text-align: left; border-bottom: 1px solid #ddd; }}
 th {{ background: #f5f5f5; }}
@@ -882,9 +1618,10 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}
 # Dialog: Templates
 # --------------------------------
 class TemplatesDialog(QDialog):
-    def __init__(self, db, parent=None):
+    def __init__(self, db, parent=None, writer=None):
         super().__init__(parent)
         self.db = db
+        self.writer = writer
         self.setWindowTitle("Templates")
         self.setMinimumSize(500, 400)
         
@@ -985,7 +1722,7 @@ class TemplatesDialog(QDialog):
             QMessageBox.warning(self, "Error", "Enter a name")
             return
         
-        self.db.save_template({
+        self._write('save_template', {
             'name': self.name_edit.text(),
             'board_type': self.type_edit.text(),
             'v_min': self.v_min.value(),
@@ -996,16 +1733,23 @@ class TemplatesDialog(QDialog):
             'f_max': 100000,
             'description': self.desc_edit.toPlainText()
         })
-        self._load()
         self._clear()
     
+    def _write(self, job, *args):
+        # through the writer thread when there is one, reload once committed
+        if self.writer:
+            self.writer.submit(job, *args, on_done=lambda _: self._load(),
+                               on_error=lambda msg: QMessageBox.warning(self, "Error", msg))
+        else:
+            getattr(self.db, job)(*args)
+            self._load()
+    
     def _delete(self):
         item = self.list.currentItem()
         if item:
             t = item.data(Qt.UserRole)
             if QMessageBox.question(self, "Delete", f"Delete '{t['name']}'?") == QMessageBox.Yes:
-                self.db.delete_template(t['id'])
-                self._load()
+                self._write('delete_template', t['id'])
                 self._clear()
     
     def _clear(self):
@@ -1018,6 +1762,534 @@ class TemplatesDialog(QDialog):
         self.desc_edit.clear()
 
 
+# --------------------------------
+# Dialog: Export
+# --------------------------------
+class ExportDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export")
+        self.setMinimumWidth(450)
+        
+        layout = QVBoxLayout(self)
+        
+        # file
+        file_grp = QGroupBox("File")
+        file_layout = QHBoxLayout(file_grp)
+        self.path_edit = QLineEdit(f"tests_{datetime.now().strftime('%Y%m%d')}.csv")
+        file_layout.addWidget(self.path_edit)
+        browse_btn = QPushButton("Browse")
+        browse_btn.clicked.connect(self._browse)
+        file_layout.addWidget(browse_btn)
+        layout.addWidget(file_grp)
+        
+        # filters
+        flt_grp = QGroupBox("Filter")
+        flt_layout = QFormLayout(flt_grp)
+        
+        self.status_cb = QComboBox()
+        self.status_cb.addItems(["All", "PASS", "FAIL", "ABORTED"])
+        flt_layout.addRow("Status:", self.status_cb)
+        
+        self.range_chk = QCheckBox("Only tests started between")
+        flt_layout.addRow(self.range_chk)
+        
+        range_row = QHBoxLayout()
+        self.since_edit = QDateEdit(QDate.currentDate().addDays(-30))
+        self.since_edit.setCalendarPopup(True)
+        range_row.addWidget(self.since_edit)
+        range_row.addWidget(QLabel("and"))
+        self.until_edit = QDateEdit(QDate.currentDate())
+        self.until_edit.setCalendarPopup(True)
+        range_row.addWidget(self.until_edit)
+        flt_layout.addRow(range_row)
+        
+        self.range_chk.toggled.connect(self.since_edit.setEnabled)
+        self.range_chk.toggled.connect(self.until_edit.setEnabled)
+        self.since_edit.setEnabled(False)
+        self.until_edit.setEnabled(False)
+        layout.addWidget(flt_grp)
+        
+        # options
+        opt_grp = QGroupBox("Options")
+        opt_layout = QVBoxLayout(opt_grp)
+        self.gzip_chk = QCheckBox("Compress (gzip)")
+        self.gzip_chk.toggled.connect(self._on_gzip)
+        opt_layout.addWidget(self.gzip_chk)
+        self.samples_chk = QCheckBox("Include raw samples (separate _samples file)")
+        opt_layout.addWidget(self.samples_chk)
+        layout.addWidget(opt_grp)
+        
+        btns = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        btns.accepted.connect(self._accept)
+        btns.rejected.connect(self.reject)
+        layout.addWidget(btns)
+    
+    def _browse(self):
+        filt = "Gzip CSV (*.csv.gz)" if self.gzip_chk.isChecked() else "CSV (*.csv)"
+        fname, _ = QFileDialog.getSaveFileName(self, "Export", self.path_edit.text(), filt)
+        if fname:
+            self.path_edit.setText(fname)
+            self._on_gzip(self.gzip_chk.isChecked())
+    
+    def _on_gzip(self, on):
+        path = self.path_edit.text()
+        if on and not path.endswith('.gz'):
+            self.path_edit.setText(path + '.gz')
+        elif not on and path.endswith('.gz'):
+            self.path_edit.setText(path[:-3])
+    
+    def _accept(self):
+        if not self.path_edit.text().strip():
+            QMessageBox.warning(self, "Error", "Choose a file")
+            return
+        self.accept()
+    
+    def get_options(self):
+        status = self.status_cb.currentText()
+        ranged = self.range_chk.isChecked()
+        return {
+            'path': self.path_edit.text().strip(),
+            'status': None if status == "All" else status,
+            'since': self.since_edit.date().toString(Qt.ISODate) if ranged else None,
+            'until': self.until_edit.date().toString(Qt.ISODate) if ranged else None,
+            'compress': self.gzip_chk.isChecked(),
+            'samples': self.samples_chk.isChecked(),
+        }
+
+
+# --------------------------------
+# UI frame scheduler
+# --------------------------------
+class FrameScheduler(QObject):
+    # one timer for all display work. data handlers only mark a task dirty,
+    # each frame runs the dirty ones once and frames with nothing to do are
+    # skipped, so redraw cost is capped by fps rather than the sample rate.
+    def __init__(self, fps=20, idle_fps=2, parent=None):
+        super().__init__(parent)
+        self.fps = fps
+        self.idle_fps = idle_fps
+        self.idle = False
+        self.tasks = {}
+        self.dirty = set()
+        self.paused = set()
+        self.periodic = {}
+        self.frames = 0
+        self.skipped = 0
+        
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._frame)
+    
+    def add(self, name, callback, every=None):
+        # every: also run on its own every N seconds, dirty or not
+        self.tasks[name] = callback
+        if every:
+            self.periodic[name] = [every, 0.0]
+    
+    def mark(self, name):
+        self.dirty.add(name)
+    
+    def set_paused(self, name, paused):
+        # paused tasks stay dirty and catch up once resumed
+        if paused:
+            self.paused.add(name)
+        else:
+            self.paused.discard(name)
+            if name in self.periodic:
+                self.periodic[name][1] = 0.0
+    
+    def set_fps(self, fps):
+        self.fps = max(1, fps)
+        self._apply_rate()
+    
+    def set_idle(self, idle):
+        if idle != self.idle:
+            self.idle = idle
+            self._apply_rate()
+    
+    def start(self):
+        self._apply_rate()
+    
+    def stop(self):
+        self.timer.stop()
+    
+    def _apply_rate(self):
+        fps = min(self.idle_fps, self.fps) if self.idle else self.fps
+        self.timer.start(int(1000 / fps))
+    
+    def _frame(self):
+        now = time.monotonic()
+        for name, slot in self.periodic.items():
+            if name not in self.paused and now >= slot[1]:
+                slot[1] = now + slot[0]
+                self.dirty.add(name)
+        
+        due = self.dirty - self.paused
+        if not due:
+            self.skipped += 1
+            return
+        self.dirty -= due
+        self.frames += 1
+        for name, callback in self.tasks.items():
+            if name in due:
+                callback()
+
+
+# --------------------------------
+# Multi-fixture mode
+# --------------------------------
+class Sparkline(QWidget):
+    # min/max trace of a fixture's recent voltage, drawn with one polyline
+    def __init__(self, color='#00d9ff'):
+        super().__init__()
+        self.setMinimumHeight(40)
+        self.pen = QPen(QColor(color), 1)
+        self.poly = QPolygonF()
+    
+    def set_data(self, y):
+        w = max(self.width(), 2)
+        h = self.height()
+        if len(y) < 2:
+            self.poly = QPolygonF()
+        else:
+            group = max(1, len(y) // w)
+            tb, lo, hi = minmax_buckets(np.arange(len(y), dtype=float), y, group)
+            x, yy = interleave(tb, lo, hi)
+            lo_, hi_ = float(yy.min()), float(yy.max())
+            span = (hi_ - lo_) or 1.0
+            # fill the polygon's point array in place, no QPointF per sample
+            self.poly = QPolygonF(len(x))
+            ptr = self.poly.data()
+            ptr.setsize(len(x) * 16)
+            xy = np.frombuffer(ptr, dtype=np.float64).reshape(-1, 2)
+            xy[:, 0] = x * (w - 1) / max(len(y) - 1, 1)
+            xy[:, 1] = (h - 3) - (yy - lo_) * (h - 6) / span
+        self.update()
+    
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.fillRect(self.rect(), QColor('#0f1a30'))
+        if not self.poly.isEmpty():
+            p.setPen(self.pen)
+            p.drawPolyline(self.poly)
+
+
+class FixtureTile(QFrame):
+    start_clicked = pyqtSignal()
+    stop_clicked = pyqtSignal()
+    connect_clicked = pyqtSignal(str)
+    
+    STATE_COLORS = {'IDLE': '#888', 'TESTING': '#00d9ff', 'PASS': '#00a86b',
+                    'FAIL': '#e94560', 'ABORTED': '#ffa500'}
+    
+    def __init__(self, name, ports):
+        super().__init__()
+        self.setObjectName("tile")
+        self.setStyleSheet("QFrame#tile { background-color: #16213e; border: 1px solid #0f3460; border-radius: 8px; }")
+        self.setMinimumWidth(260)
+        
+        layout = QVBoxLayout(self)
+        layout.setSpacing(4)
+        
+        # header
+        header = QHBoxLayout()
+        self.title = QLabel(name)
+        self.title.setStyleSheet("font-size: 13px; font-weight: bold; color: #00d9ff;")
+        header.addWidget(self.title)
+        header.addStretch()
+        self.light = StatusLight()
+        header.addWidget(self.light)
+        layout.addLayout(header)
+        
+        conn_row = QHBoxLayout()
+        self.port_cb = QComboBox()
+        self.set_ports(ports)
+        conn_row.addWidget(self.port_cb, 1)
+        self.conn_btn = QPushButton("Connect")
+        self.conn_btn.setStyleSheet("padding: 4px 10px;")
+        self.conn_btn.clicked.connect(lambda: self.connect_clicked.emit(self.port_cb.currentData() or ''))
+        conn_row.addWidget(self.conn_btn)
+        layout.addLayout(conn_row)
+        
+        # readouts
+        vals = QHBoxLayout()
+        self.vals = {}
+        for k, unit in (('V', 'V'), ('I', 'A'), ('F', 'Hz')):
+            lbl = QLabel(f"-- {unit}")
+            lbl.setStyleSheet("font-size: 14px; font-weight: bold; color: #00ff88;")
+            vals.addWidget(lbl)
+            self.vals[k] = [lbl, unit, None]
+        layout.addLayout(vals)
+        
+        self.spark = Sparkline()
+        layout.addWidget(self.spark)
+        
+        # state and test controls
+        state_row = QHBoxLayout()
+        self.state_lbl = QLabel("IDLE")
+        state_row.addWidget(self.state_lbl)
+        state_row.addStretch()
+        self.start_btn = QPushButton("Start")
+        self.start_btn.setStyleSheet("padding: 4px 10px;")
+        self.start_btn.clicked.connect(self.start_clicked)
+        state_row.addWidget(self.start_btn)
+        self.stop_btn = QPushButton("Stop")
+        self.stop_btn.setStyleSheet("padding: 4px 10px;")
+        self.stop_btn.clicked.connect(self.stop_clicked)
+        state_row.addWidget(self.stop_btn)
+        layout.addLayout(state_row)
+        
+        self._state = None
+        self._state_text = None
+        self.set_state('IDLE', "IDLE", False, False)
+    
+    def set_ports(self, ports):
+        # keeps the selection if that port is still there
+        current = self.port_cb.currentData()
+        self.port_cb.clear()
+        for label, dev in ports:
+            self.port_cb.addItem(label, dev)
+        idx = self.port_cb.findData(current)
+        if idx >= 0:
+            self.port_cb.setCurrentIndex(idx)
+    
+    def set_value(self, k, value):
+        lbl, unit, last = self.vals[k]
+        txt = f"{value:.3f} {unit}" if k == 'I' else f"{value:.2f} {unit}"
+        if txt != last:
+            self.vals[k][2] = txt
+            lbl.setText(txt)
+    
+    def set_state(self, state, text, connected, testing, can_start=True):
+        if text != self._state_text:
+            self._state_text = text
+            self.state_lbl.setText(text)
+        if state != self._state:
+            self._state = state
+            self.state_lbl.setStyleSheet(f"color: {self.STATE_COLORS.get(state, '#888')}; font-weight: bold;")
+        self.start_btn.setEnabled(connected and not testing and can_start)
+        self.stop_btn.setEnabled(testing)
+        self.conn_btn.setText("Disconnect" if connected else "Connect")
+        self.port_cb.setEnabled(not connected)
+
+
+class Fixture(QObject):
+    # one test position: its own device worker, short history for the tile,
+    # a TestSession and the last result. owned by FixtureManager
+    def __init__(self, index, manager):
+        super().__init__(manager)
+        self.index = index
+        self.name = f"Fixture {index}"
+        self.manager = manager
+        self.worker = None
+        self.connected = False
+        self.buf = RingBuffer(['t', 'V'], 4096)
+        self.latest = None
+        self.test = TestSession()
+        self.testing = False
+        self.result = None
+        self.tile = FixtureTile(self.name, manager.ports())
+        self.tile.connect_clicked.connect(self._toggle_connection)
+        self.tile.start_clicked.connect(lambda: manager.request_start(self))
+        self.tile.stop_clicked.connect(lambda: self.stop())
+    
+    def _toggle_connection(self, port):
+        if self.connected or (self.worker and self.worker.isRunning()):
+            self.disconnect()
+        elif port:
+            self.connect_to(port)
+    
+    def connect_to(self, port, baud=115200):
+        # a new worker per connect, the port may be serial or simulated
+        self.release_worker()
+        self.worker = make_worker(port, seed=self.index)
+        # tiles don't need the main view's latency, bigger batches keep the
+        # per-batch overhead down with many devices
+        self.worker.batch_latency = self.manager.batch_latency
+        self.worker.batch_received.connect(self._on_batch)
+        self.worker.status_changed.connect(self._on_status)
+        self.worker.error.connect(lambda msg: self.manager.error.emit(f"{self.name}: {msg}"))
+        self.worker.connect_to(port, baud)
+    
+    def disconnect(self):
+        if self.testing:
+            self.stop('ABORTED')
+        if self.worker:
+            self.worker.disconnect()
+    
+    def release_worker(self):
+        # stop and delete the worker, its signals go with it
+        worker, self.worker = self.worker, None
+        if worker is None:
+            return
+        if worker.isRunning():
+            worker.disconnect()
+        worker.deleteLater()
+    
+    def _on_status(self, connected, msg):
+        self.connected = connected
+        self.tile.light.set_connected(connected, msg)
+        if connected:
+            self.test.t0 = time.time()
+            self.buf.clear()
+        self.manager.mark(self)
+    
+    def _on_batch(self, b):
+        t = b['t'] - self.test.t0
+        self.buf.extend((t, b['V']))
+        self.latest = (float(b['V'][-1]), float(b['I'][-1]), float(b['F'][-1]))
+        if self.testing:
+            self.test.feed(t, b)
+        self.manager.mark(self)
+    
+    def start(self, info):
+        m = self.manager
+        self.test.begin(info, m.writer, on_created=m._created, on_error=m._failed)
+        self.buf.clear()
+        self.testing = True
+        self.result = None
+        m.mark(self)
+    
+    def stop(self, status=None):
+        # no status: PASS unless a limit was crossed
+        if not self.testing:
+            return
+        m = self.manager
+        self.testing = False
+        self.result = status or self.test.verdict()
+        self.test.finish(self.result, m.writer, on_saved=m._saved, on_error=m._failed)
+        m.mark(self)
+    
+    def refresh(self):
+        tile = self.tile
+        if self.latest:
+            v, i, f = self.latest
+            tile.set_value('V', v)
+            tile.set_value('I', i)
+            tile.set_value('F', f)
+            tile.spark.set_data(self.buf['V'])
+        if self.testing:
+            secs = int((datetime.now() - self.test.start).total_seconds())
+            h, rem = divmod(secs, 3600)
+            mm, ss = divmod(rem, 60)
+            viol = sum(self.test.stats[k].violations for k in ('V', 'I', 'F'))
+            tile.set_state('TESTING', f"TESTING {h:02d}:{mm:02d}:{ss:02d}  viol {viol}", self.connected, True)
+        elif self.result:
+            tile.set_state(self.result, self.result, self.connected, False, self.manager.db_ready)
+        else:
+            tile.set_state('IDLE', "IDLE", self.connected, False, self.manager.db_ready)
+
+
+class FixtureManager(QObject):
+    # N fixtures in one window. each has its own worker thread and session;
+    # the gui thread only folds batches into stats (a few numpy calls per
+    # batch) and redraws dirty tiles on the shared frame scheduler. all
+    # results go through the one DbWriter
+    test_created = pyqtSignal(object, int)
+    test_saved = pyqtSignal(object, int)
+    error = pyqtSignal(str)
+    
+    MAX_FIXTURES = 16
+    
+    def __init__(self, db, writer, frames, parent=None, refresh=0.2, batch_latency=0.1):
+        super().__init__(parent)
+        self.db = db
+        self.writer = writer
+        self.frames = frames
+        self.batch_latency = batch_latency
+        self.fixtures = []
+        self.port_list = [(f"{SIM_PORT} - simulated device", SIM_PORT)]
+        self.dirty = set()
+        # no starting (templates, the writer) until the database is open
+        self.db_ready = False
+        # tiles redraw at their own slower cadence, only the dirty ones
+        frames.add('fixtures', self._refresh, every=refresh)
+        frames.add('fixture_clock', self._tick, every=1.0)
+    
+    def ports(self):
+        # the main window's last scan, see set_ports
+        return self.port_list
+    
+    def set_ports(self, ports):
+        self.port_list = list(ports)
+        for fx in self.fixtures:
+            fx.tile.set_ports(self.port_list)
+    
+    def set_count(self, n):
+        n = max(0, min(n, self.MAX_FIXTURES))
+        while len(self.fixtures) < n:
+            self.fixtures.append(Fixture(len(self.fixtures) + 1, self))
+        while len(self.fixtures) > n:
+            fx = self.fixtures.pop()
+            fx.disconnect()
+            fx.release_worker()
+            fx.tile.deleteLater()
+            fx.deleteLater()
+            self.dirty.discard(fx)
+    
+    def set_db_ready(self):
+        self.db_ready = True
+        self.dirty.update(self.fixtures)
+    
+    def active(self):
+        return [fx for fx in self.fixtures if fx.testing]
+    
+    def mark(self, fx):
+        self.dirty.add(fx)
+    
+    def _tick(self):
+        # running clocks on the tiles
+        self.dirty.update(self.active())
+    
+    def _refresh(self):
+        dirty, self.dirty = self.dirty, set()
+        for fx in dirty:
+            fx.refresh()
+    
+    def request_start(self, fx):
+        if not self.db_ready:
+            return
+        dlg = NewTestDialog(fx.tile.window(), self.db.get_templates())
+        dlg.setWindowTitle(f"New Test - {fx.name}")
+        if dlg.exec_() == QDialog.Accepted:
+            fx.start(dlg.get_data())
+    
+    def start_all(self, info):
+        # same setup on every connected idle fixture, tagged with its number
+        for fx in self.fixtures:
+            if fx.connected and not fx.testing:
+                data = dict(info)
+                data['name'] = f"{info['name']} [{fx.index}]"
+                if info.get('serial'):
+                    data['serial'] = f"{info['serial']}-{fx.index}"
+                fx.start(data)
+    
+    def stop_all(self, status=None):
+        for fx in self.active():
+            fx.stop(status)
+    
+    def checkpoint(self):
+        for fx in self.active():
+            fx.test.checkpoint(self.writer, self._failed)
+    
+    def shutdown(self):
+        self.stop_all('ABORTED')
+        for fx in self.fixtures:
+            if fx.worker:
+                fx.worker.disconnect()
+    
+    def _created(self, record, test_id):
+        record['id'] = test_id
+        self.test_created.emit(record, test_id)
+    
+    def _saved(self, record, test_id):
+        record['id'] = test_id
+        self.test_saved.emit(record, test_id)
+    
+    def _failed(self, msg):
+        self.error.emit(f"Could not save test: {msg}")
+
+
 # --------------------------------
 # Main window
 # --------------------------------
@@ -1027,46 +2299,111 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Board Tester Pro")
         self.setMinimumSize(1300, 850)
         
-        self.db = Database()
+        # the window paints first. opening the database and listing ports run
+        # on BackgroundCall threads, the plots are built after the first paint
+        self.db = Database(init=False)
+        self.db_ready = False
+        self.db_widgets = []
+        self._calls = []
+        self._painted = False
         
         # data buffers
-        self.buf_size = 500
-        self.time_buf = deque(maxlen=self.buf_size)
-        self.v_buf = deque(maxlen=self.buf_size)
-        self.i_buf = deque(maxlen=self.buf_size)
-        self.p_buf = deque(maxlen=self.buf_size)
-        self.f_buf = deque(maxlen=self.buf_size)
+        self.buf_size = 200000
+        self.buf = RingBuffer(['t', 'V', 'I', 'P', 'F'], self.buf_size)
+        self.pyramid = MinMaxPyramid(['V', 'I', 'P', 'F'], self.buf_size)
+        self.latest = None
+        self.latest_t = None
+        
+        # latency diagnostics, see the Diagnostics tab. None when off
+        self.diag = None
+        self._diag_last = (time.monotonic(), 0)
         
         self.t0 = time.time()
         
-        # test state
+        # test state: stats and recording of the board under test
         self.testing = False
-        self.test_data = []
-        self.test_start = None
-        self.test_info = {}
+        self.test = TestSession()
         
-        # violation counts
-        self.v_viols = 0
-        self.i_viols = 0
-        self.f_viols = 0
+        # running stats since connect / last test start
+        self.session_stats = {k: ChannelStats() for k in STAT_CHANNELS}
         
-        # serial
-        self.serial = SerialWorker()
-        self.serial.data_received.connect(self._on_data)
-        self.serial.status_changed.connect(self._on_status)
-        self.serial.error.connect(self._on_error)
+        self.export_worker = None
         
-        self._setup_ui()
-        self.setStyleSheet(STYLESHEET)
+        # records list page size, search debounce (ms)
+        self.records_page = 50
+        self.search_delay = 250
+        
+        # all writes go through one thread, started once the database is open
+        self.writer = DbWriter(self.db)
         
-        # update timer
-        self.timer = QTimer()
-        self.timer.timeout.connect(self._update_plots)
-        self.timer.start(50)
+        # recording checkpoints (s), see _checkpoint
+        self.ckpt_interval = 5.0
+        self.ckpt_timer = QTimer(self)
+        self.ckpt_timer.timeout.connect(self._checkpoint)
+        self.ckpt_timer.start(int(self.ckpt_interval * 1000))
         
-        # test timer
-        self.test_timer = QTimer()
-        self.test_timer.timeout.connect(self._update_duration)
+        # serial
+        self.serial = None
+        self._set_worker(SerialWorker())
+        
+        # display refresh
+        self.frames = FrameScheduler(fps=20, parent=self)
+        self.frames.add('meters', self._update_meters)
+        self.frames.add('plots', self._update_plots)
+        self.frames.add('stats', self._calc_stats)
+        self.frames.add('duration', self._update_duration, every=1.0)
+        self.frames.set_paused('duration', True)
+        self.frames.add('diagnostics', self._update_diagnostics, every=0.5)
+        
+        # before the widgets exist, so each is styled once
+        self.setStyleSheet(STYLESHEET)
+        self._setup_ui()
+        self.frames.start()
+        
+        self._in_background(self._open_db, on_done=self._on_db_ready, on_error=self._on_db_failed)
+    
+    def _in_background(self, fn, *args, on_done=None, on_error=None) -> BackgroundCall:
+        call = BackgroundCall(fn, *args, db=self.db, parent=self)
+        if on_done:
+            call.done.connect(on_done)
+        call.failed.connect(on_error or self._on_error)
+        call.finished.connect(lambda: self._calls.remove(call))
+        call.finished.connect(call.deleteLater)
+        self._calls.append(call)
+        call.start()
+        return call
+    
+    def _open_db(self):
+        # startup thread: schema and migrations (slow once on a big file after
+        # an upgrade), then the interrupted tests, read before one can start
+        self.db._init_tables()
+        return self.db.get_interrupted()
+    
+    def _on_db_ready(self, interrupted):
+        self.db_ready = True
+        self.writer.start()
+        self.search_worker.start()
+        self.fixtures.set_db_ready()
+        for w in self.db_widgets:
+            w.setEnabled(True)
+        self._load_records()
+        if interrupted:
+            self._check_interrupted(interrupted)
+    
+    def _on_db_failed(self, msg):
+        self.status.showMessage(f"Database error: {msg}")
+        QMessageBox.critical(self, "Database Error", f"Could not open {self.db.path}:\n{msg}")
+    
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            # the operator sees the window, now the slow widgets
+            QTimer.singleShot(0, self._build_deferred)
+    
+    def _build_deferred(self):
+        self._build_plots()
+        self._set_fixture_count(self.fixture_spin.value())
     
     def _setup_ui(self):
         central = QWidget()
@@ -1088,6 +2425,10 @@ class MainWindow(QMainWindow):
         self.status = QStatusBar()
         self.setStatusBar(self.status)
         self.status.showMessage("Ready")
+        
+        # until _on_db_ready
+        for w in self.db_widgets:
+            w.setEnabled(False)
     
     def _create_top_bar(self):
         bar = QWidget()
@@ -1102,6 +2443,9 @@ class MainWindow(QMainWindow):
         layout.addWidget(QLabel("Port:"))
         self.port_cb = QComboBox()
         self.port_cb.setMinimumWidth(140)
+        # a path can be typed in too, e.g. a simulator pty
+        self.port_cb.setEditable(True)
+        self.port_cb.setInsertPolicy(QComboBox.NoInsert)
         layout.addWidget(self.port_cb)
         
         refresh = QPushButton("↻")
@@ -1115,6 +2459,11 @@ class MainWindow(QMainWindow):
         self.baud_cb.setCurrentText("115200")
         layout.addWidget(self.baud_cb)
         
+        self.bin_cb = QCheckBox("Binary")
+        self.bin_cb.setChecked(True)
+        self.bin_cb.setToolTip("Use binary frames if the firmware supports them")
+        layout.addWidget(self.bin_cb)
+        
         self.conn_btn = QPushButton("Connect")
         self.conn_btn.clicked.connect(self._toggle_connection)
         layout.addWidget(self.conn_btn)
@@ -1147,6 +2496,7 @@ class MainWindow(QMainWindow):
         self.start_btn = QPushButton("Start Test")
         self.start_btn.clicked.connect(self._start_test)
         btns1.addWidget(self.start_btn)
+        self.db_widgets.append(self.start_btn)
         
         self.stop_btn = QPushButton("Stop")
         self.stop_btn.clicked.connect(self._stop_test)
@@ -1204,25 +2554,78 @@ class MainWindow(QMainWindow):
     
     def _create_right_panel(self):
         tabs = QTabWidget()
-        tabs.addTab(self._create_graphs_tab(), "Graphs")
+        self.graphs_tab = self._create_graphs_tab()
+        tabs.addTab(self.graphs_tab, "Graphs")
         tabs.addTab(self._create_records_tab(), "Records")
         tabs.addTab(self._create_thresholds_tab(), "Thresholds")
-        tabs.addTab(self._create_stats_tab(), "Statistics")
+        self.stats_tab = self._create_stats_tab()
+        tabs.addTab(self.stats_tab, "Statistics")
+        self.fixtures_tab = self._create_fixtures_tab()
+        tabs.addTab(self.fixtures_tab, "Fixtures")
+        self.diag_tab = self._create_diagnostics_tab()
+        tabs.addTab(self.diag_tab, "Diagnostics")
+        tabs.currentChanged.connect(self._on_tab_changed)
+        self.right_tabs = tabs
+        self._on_tab_changed()
         return tabs
     
+    def _on_tab_changed(self, _=None):
+        # hidden tabs don't redraw, they catch up when shown
+        current = self.right_tabs.currentWidget()
+        self.frames.set_paused('plots', current is not self.graphs_tab)
+        self.frames.set_paused('stats', current is not self.stats_tab)
+        self.frames.set_paused('fixtures', current is not self.fixtures_tab)
+        self.frames.set_paused('diagnostics', current is not self.diag_tab)
+    
     def _create_graphs_tab(self):
         w = QWidget()
         layout = QVBoxLayout(w)
         
-        pg.setConfigOptions(antialias=True)
+        hist_row = QHBoxLayout()
+        hist_row.addStretch()
+        hist_row.addWidget(QLabel("History:"))
+        self.hist_spin = QSpinBox()
+        self.hist_spin.setRange(100, 5000000)
+        self.hist_spin.setSingleStep(1000)
+        self.hist_spin.setValue(self.buf_size)
+        self.hist_spin.setSuffix(" pts")
+        self.hist_spin.editingFinished.connect(self._set_history)
+        hist_row.addWidget(self.hist_spin)
+        
+        hist_row.addWidget(QLabel("Refresh:"))
+        self.fps_spin = QSpinBox()
+        self.fps_spin.setRange(1, 60)
+        self.fps_spin.setValue(20)
+        self.fps_spin.setSuffix(" fps")
+        self.fps_spin.valueChanged.connect(lambda fps: self.frames.set_fps(fps))
+        hist_row.addWidget(self.fps_spin)
+        layout.addLayout(hist_row)
+        
+        # pyqtgraph is the slowest import and the plots the slowest widgets,
+        # both wait for _build_plots after the first paint
+        self.graphs_layout = layout
+        self.plot_curves = []
+        self.plots_placeholder = QLabel("Loading plots...")
+        self.plots_placeholder.setAlignment(Qt.AlignCenter)
+        self.plots_placeholder.setStyleSheet("color: #888;")
+        layout.addWidget(self.plots_placeholder, 1)
+        
+        return w
+    
+    def _build_plots(self):
+        from pyqtgraph import PlotWidget
+        
+        layout = self.graphs_layout
+        layout.removeWidget(self.plots_placeholder)
+        self.plots_placeholder.deleteLater()
         
         # V/I plot
         self.vi_plot = PlotWidget()
         self.vi_plot.setBackground('#1a1a2e')
         self.vi_plot.showGrid(x=True, y=True, alpha=0.3)
         self.vi_plot.addLegend()
-        self.v_curve = self.vi_plot.plot(pen=pg.mkPen('#ff6b6b', width=2), name='Voltage')
-        self.i_curve = self.vi_plot.plot(pen=pg.mkPen('#4ecdc4', width=2), name='Current')
+        self.v_curve = add_curve(self.vi_plot, '#ff6b6b', 'Voltage')
+        self.i_curve = add_curve(self.vi_plot, '#4ecdc4', 'Current')
         layout.addWidget(QLabel("Voltage & Current"))
         layout.addWidget(self.vi_plot)
         
@@ -1230,7 +2633,7 @@ class MainWindow(QMainWindow):
         self.p_plot = PlotWidget()
         self.p_plot.setBackground('#1a1a2e')
         self.p_plot.showGrid(x=True, y=True, alpha=0.3)
-        self.p_curve = self.p_plot.plot(pen=pg.mkPen('#ffe66d', width=2))
+        self.p_curve = add_curve(self.p_plot, '#ffe66d')
         layout.addWidget(QLabel("Power"))
         layout.addWidget(self.p_plot)
         
@@ -1238,16 +2641,92 @@ class MainWindow(QMainWindow):
         self.f_plot = PlotWidget()
         self.f_plot.setBackground('#1a1a2e')
         self.f_plot.showGrid(x=True, y=True, alpha=0.3)
-        self.f_curve = self.f_plot.plot(pen=pg.mkPen('#a388ee', width=2))
+        self.f_curve = add_curve(self.f_plot, '#a388ee')
         layout.addWidget(QLabel("Frequency"))
         layout.addWidget(self.f_plot)
         
+        self.plot_curves = [
+            (self.vi_plot, [('V', self.v_curve), ('I', self.i_curve)]),
+            (self.p_plot, [('P', self.p_curve)]),
+            (self.f_plot, [('F', self.f_curve)]),
+        ]
+        for plot, _ in self.plot_curves:
+            vb = plot.getViewBox()
+            vb.sigXRangeChanged.connect(lambda _, r, vb=vb: self._on_range_changed(vb))
+        
+        self.frames.mark('plots')
+    
+    def _create_fixtures_tab(self):
+        w = QWidget()
+        layout = QVBoxLayout(w)
+        
+        self.fixtures = FixtureManager(self.db, self.writer, self.frames, self)
+        self.fixtures.test_created.connect(lambda r, _: self.records_model.update_record(r))
+        self.fixtures.test_saved.connect(self._on_fixture_saved)
+        self.fixtures.error.connect(self._on_error)
+        
+        # controls
+        ctrls = QHBoxLayout()
+        ctrls.addWidget(QLabel("Fixtures:"))
+        self.fixture_spin = QSpinBox()
+        self.fixture_spin.setRange(1, FixtureManager.MAX_FIXTURES)
+        self.fixture_spin.setValue(4)
+        self.fixture_spin.valueChanged.connect(self._set_fixture_count)
+        ctrls.addWidget(self.fixture_spin)
+        
+        start_all = QPushButton("Start All")
+        start_all.clicked.connect(self._start_all_fixtures)
+        ctrls.addWidget(start_all)
+        self.db_widgets.append(start_all)
+        
+        stop_all = QPushButton("Stop All")
+        stop_all.clicked.connect(lambda: self.fixtures.stop_all())
+        ctrls.addWidget(stop_all)
+        ctrls.addStretch()
+        layout.addLayout(ctrls)
+        
+        # tiles
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        grid_w = QWidget()
+        self.fixture_grid = QGridLayout(grid_w)
+        self.fixture_grid.setAlignment(Qt.AlignTop)
+        scroll.setWidget(grid_w)
+        layout.addWidget(scroll)
+        
+        # tiles come with _build_deferred
         return w
     
+    def _set_fixture_count(self, n):
+        self.fixtures.set_count(n)
+        for k, fx in enumerate(self.fixtures.fixtures):
+            self.fixture_grid.addWidget(fx.tile, k // 4, k % 4)
+    
+    def _start_all_fixtures(self):
+        if not self.db_ready:
+            return
+        dlg = NewTestDialog(self, self.db.get_templates())
+        dlg.setWindowTitle("New Test - All Fixtures")
+        if dlg.exec_() == QDialog.Accepted:
+            self.fixtures.start_all(dlg.get_data())
+    
+    def _on_fixture_saved(self, record, test_id):
+        self.records_model.update_record(record)
+        self._update_record_stats()
+    
     def _create_records_tab(self):
         w = QWidget()
         layout = QVBoxLayout(w)
         
+        # search runs on its own thread and connection
+        self.search_worker = SearchWorker(self.db, self.records_page)
+        self.search_worker.results.connect(self._on_search_results)
+        self.search_worker.error.connect(self._on_error)
+        
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self._reload_records)
+        
         # controls
         ctrls = QHBoxLayout()
         
@@ -1272,6 +2751,7 @@ class MainWindow(QMainWindow):
         export_btn = QPushButton("Export All")
         export_btn.clicked.connect(self._export_all)
         ctrls.addWidget(export_btn)
+        self.db_widgets += [refresh_btn, tmpl_btn, export_btn]
         
         layout.addLayout(ctrls)
         
@@ -1297,15 +2777,27 @@ class MainWindow(QMainWindow):
         layout.addLayout(stats_row)
         
         # records list
-        self.records_scroll = QScrollArea()
-        self.records_scroll.setWidgetResizable(True)
-        self.records_widget = QWidget()
-        self.records_layout = QVBoxLayout(self.records_widget)
-        self.records_layout.setAlignment(Qt.AlignTop)
-        self.records_scroll.setWidget(self.records_widget)
-        layout.addWidget(self.records_scroll)
-        
-        self._load_records()
+        self.records_model = RecordsModel(self.db, self.records_page, self)
+        # a one-column table rather than a QListView: fixed row heights mean
+        # appending a page doesn't relayout every row already loaded
+        self.records_view = QTableView()
+        self.records_view.setModel(self.records_model)
+        self.records_view.setItemDelegate(RecordDelegate(self.records_view))
+        self.records_view.horizontalHeader().hide()
+        self.records_view.horizontalHeader().setStretchLastSection(True)
+        self.records_view.verticalHeader().hide()
+        self.records_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.records_view.verticalHeader().setDefaultSectionSize(RecordDelegate.HEIGHT)
+        self.records_view.setShowGrid(False)
+        self.records_view.setFrameShape(QFrame.NoFrame)
+        self.records_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.records_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.records_view.setFocusPolicy(Qt.NoFocus)
+        self.records_view.setMouseTracking(True)
+        self.records_view.viewport().setCursor(Qt.PointingHandCursor)
+        self.records_view.clicked.connect(
+            lambda idx: self._show_record(idx.data(RecordsModel.RecordRole)['id']))
+        layout.addWidget(self.records_view)
         
         return w
     
@@ -1373,7 +2865,7 @@ class MainWindow(QMainWindow):
         grp = QGroupBox("Session Statistics")
         g_layout = QGridLayout(grp)
         
-        headers = ["", "Min", "Max", "Avg", "StdDev"]
+        headers = ["", "Min", "Max", "Avg", "StdDev", "Low (s)", "High (s)"]
         for c, h in enumerate(headers):
             lbl = QLabel(h)
             lbl.setStyleSheet("font-weight: bold;")
@@ -1383,7 +2875,7 @@ class MainWindow(QMainWindow):
         for r, name in enumerate(["Voltage", "Current", "Power", "Frequency"], 1):
             g_layout.addWidget(QLabel(name), r, 0)
             self.stat_labels[name] = {}
-            for c, key in enumerate(["min", "max", "avg", "std"], 1):
+            for c, key in enumerate(["min", "max", "avg", "std", "t_low", "t_high"], 1):
                 lbl = QLabel("---")
                 self.stat_labels[name][key] = lbl
                 g_layout.addWidget(lbl, r, c)
@@ -1398,21 +2890,94 @@ class MainWindow(QMainWindow):
         
         return w
     
+    def _create_diagnostics_tab(self):
+        w = QWidget()
+        layout = QVBoxLayout(w)
+        
+        row = QHBoxLayout()
+        self.diag_cb = QCheckBox("Record latency")
+        self.diag_cb.toggled.connect(self._set_diagnostics)
+        row.addWidget(self.diag_cb)
+        row.addStretch()
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self._reset_diagnostics)
+        row.addWidget(reset_btn)
+        layout.addLayout(row)
+        
+        grp = QGroupBox("Acquisition")
+        g_layout = QGridLayout(grp)
+        self.diag_labels = {}
+        counters = [("rate", "Samples/s"), ("parse_errors", "Parse errors"), ("bad_bytes", "Bad bytes"),
+                    ("dropped", "Dropped frames"), ("queued", "Port queue (bytes)"),
+                    ("pending", "Waiting for batch"), ("in_flight", "Batches in flight")]
+        for n, (key, name) in enumerate(counters):
+            r, c = divmod(n, 2)
+            g_layout.addWidget(QLabel(name), r, c * 2)
+            lbl = QLabel("---")
+            self.diag_labels[key] = lbl
+            g_layout.addWidget(lbl, r, c * 2 + 1)
+        layout.addWidget(grp)
+        
+        # read/split/decode: time spent on a block, the rest: age of its
+        # newest sample on reaching that point
+        grp = QGroupBox("Latency per stage (ms)")
+        g_layout = QGridLayout(grp)
+        for c, h in enumerate(["", "Blocks", "p50", "p99", "Max"]):
+            lbl = QLabel(h)
+            lbl.setStyleSheet("font-weight: bold;")
+            g_layout.addWidget(lbl, 0, c)
+        self.diag_stage_labels = {}
+        for r, stage in enumerate(DIAG_STAGES, 1):
+            g_layout.addWidget(QLabel(stage.capitalize()), r, 0)
+            self.diag_stage_labels[stage] = {}
+            for c, key in enumerate(["count", "p50", "p99", "max"], 1):
+                lbl = QLabel("---")
+                self.diag_stage_labels[stage][key] = lbl
+                g_layout.addWidget(lbl, r, c)
+        layout.addWidget(grp)
+        
+        layout.addStretch()
+        
+        return w
+    
     # --- handlers ---
     
     def _refresh_ports(self):
+        self._in_background(list_ports, on_done=self._on_ports)
+    
+    def _on_ports(self, ports):
+        current = self.port_cb.currentData()
         self.port_cb.clear()
-        for p in serial.tools.list_ports.comports():
-            self.port_cb.addItem(f"{p.device} - {p.description}", p.device)
+        for label, dev in ports:
+            self.port_cb.addItem(label, dev)
+        idx = self.port_cb.findData(current)
+        if idx >= 0:
+            self.port_cb.setCurrentIndex(idx)
+        self.fixtures.set_ports(ports)
+    
+    def _selected_port(self):
+        # the listed port, or whatever was typed
+        text = self.port_cb.currentText().strip()
+        idx = self.port_cb.findText(text)
+        return self.port_cb.itemData(idx) if idx >= 0 else text
+    
+    def _set_worker(self, worker):
+        self.serial = worker
+        worker.set_diag(self.diag)
+        worker.batch_received.connect(self._on_batch)
+        worker.status_changed.connect(self._on_status)
+        worker.error.connect(self._on_error)
     
     def _toggle_connection(self):
         if self.serial.running:
             self.serial.disconnect()
         else:
-            port = self.port_cb.currentData()
+            port = self._selected_port()
             baud = int(self.baud_cb.currentText())
             if port:
-                self.serial.connect_to(port, baud)
+                if (port == SIM_PORT) != isinstance(self.serial, SimulatedWorker):
+                    self._set_worker(make_worker(port))
+                self.serial.connect_to(port, baud, self.bin_cb.isChecked())
             else:
                 QMessageBox.warning(self, "Error", "Select a port first")
     
@@ -1422,61 +2987,94 @@ class MainWindow(QMainWindow):
         self.status.showMessage(msg)
         if connected:
             self.t0 = time.time()
+            for st in self.session_stats.values():
+                st.reset()
     
     def _on_error(self, msg):
         self.status.showMessage(f"Error: {msg}")
     
     def _on_data(self, d):
-        t = time.time() - self.t0
-        
-        v = d.get('V', 0)
-        i = d.get('I', 0)
-        p = d.get('P', 0)
-        r = d.get('R', 0)
-        f = d.get('F', 0)
-        wl = d.get('WL', 0)
-        vrms = d.get('Vrms', 0)
-        vpp = d.get('Vpp', 0)
-        
-        # update meters
-        self.v_meter.set_value(v)
-        self.i_meter.set_value(i, 4)
-        self.p_meter.set_value(p)
-        self.r_meter.set_value(r, 1)
-        self.f_meter.set_value(f, 1)
-        self.wl_meter.set_value(wl, 2)
-        self.vrms_meter.set_value(vrms)
-        self.vpp_meter.set_value(vpp)
+        self._on_batch(samples_to_block(rows_to_samples([d]), [time.time()]))
+    
+    def _on_batch(self, b):
+        diag = self.diag
+        if diag is not None:
+            diag.age('deliver', b['t'][-1])
+        
+        t = b['t'] - self.t0
+        v = b['V']
+        i = b['I']
+        p = b['P']
+        f = b['F']
+        
+        # meters only show the newest sample, drawn on the next frame
+        self.latest = {k: float(b[k][-1]) for k in SAMPLE_FIELDS}
+        self.latest_t = float(b['t'][-1])
+        self.frames.mark('meters')
         
         # store
-        self.time_buf.append(t)
-        self.v_buf.append(v)
-        self.i_buf.append(i)
-        self.p_buf.append(p)
-        self.f_buf.append(f)
-        
-        # violations
-        if self.v_meter.violation:
-            self.v_viols += 1
-        if self.i_meter.violation:
-            self.i_viols += 1
-        if self.f_meter.violation:
-            self.f_viols += 1
-        
-        # record if testing
+        self.buf.extend((t, v, i, p, f))
+        self.pyramid.extend(t, {'V': v, 'I': i, 'P': p, 'F': f})
+        self.frames.mark('plots')
+        
+        # stats and violations
+        limits = self._limits()
+        for k, col in (('V', v), ('I', i), ('P', p), ('F', f)):
+            lo, hi = limits.get(k, (None, None))
+            self.session_stats[k].update(col, t, lo, hi)
+        self.frames.mark('stats')
+        
+        # test stats and recording
         if self.testing:
-            self.test_data.append({
-                'time': t, 'voltage': v, 'current': i,
-                'power': p, 'resistance': r, 'frequency': f, 'wavelength': wl
-            })
+            self.test.feed(t, b, limits)
+        
+        if diag is not None:
+            diag.age('handled', b['t'][-1])
+    
+    def _limits(self):
+        return {k: (m.min_th, m.max_th) for k, m in
+                (('V', self.v_meter), ('I', self.i_meter), ('F', self.f_meter))}
+    
+    def _update_meters(self):
+        d = self.latest
+        if d is None:
+            return
+        self.v_meter.set_value(d['V'])
+        self.i_meter.set_value(d['I'], 4)
+        self.p_meter.set_value(d['P'])
+        self.r_meter.set_value(d['R'], 1)
+        self.f_meter.set_value(d['F'], 1)
+        self.wl_meter.set_value(d['WL'], 2)
+        self.vrms_meter.set_value(d['Vrms'])
+        self.vpp_meter.set_value(d['Vpp'])
+        if self.diag is not None:
+            self.diag.age('meters', self.latest_t)
     
     def _update_plots(self):
-        if len(self.time_buf) > 0:
-            t = np.array(self.time_buf)
-            self.v_curve.setData(t, np.array(self.v_buf))
-            self.i_curve.setData(t, np.array(self.i_buf))
-            self.p_curve.setData(t, np.array(self.p_buf))
-            self.f_curve.setData(t, np.array(self.f_buf))
+        if len(self.buf) == 0:
+            return
+        t = self.buf['t']
+        for plot, curves in self.plot_curves:
+            vb = plot.getViewBox()
+            if vb.autoRangeEnabled()[0]:
+                t0, t1 = self.pyramid.t_first, t[-1]
+            else:
+                t0, t1 = vb.viewRange()[0]
+            width = max(int(vb.width()), 100)
+            for name, curve in curves:
+                curve.setData(*self.pyramid.query(name, t0, t1, width, t, self.buf[name]))
+        if self.diag is not None and self.plot_curves:
+            self.diag.age('plots', self.latest_t)
+    
+    def _on_range_changed(self, vb):
+        # zoom/pan while not auto-ranging: recompute for the new span
+        if not vb.autoRangeEnabled()[0]:
+            self.frames.mark('plots')
+    
+    def _set_history(self):
+        self.buf_size = self.hist_spin.value()
+        self.buf.resize(self.buf_size)
+        self.pyramid.resize(self.buf_size)
     
     def _apply_thresholds(self):
         self.v_meter.set_thresholds(self.th_v_min.value(), self.th_v_max.value())
@@ -1490,7 +3088,11 @@ class MainWindow(QMainWindow):
         if dlg.exec_() != QDialog.Accepted:
             return
         
-        data = dlg.get_data()
+        self._begin_test(dlg.get_data())
+    
+    def _begin_test(self, data, resume=None):
+        # resume: IN_PROGRESS row (see Database.get_interrupted) to keep
+        # recording into instead of creating a new test
         
         # set thresholds
         self.th_v_min.setValue(data['v_min'])
@@ -1501,23 +3103,17 @@ class MainWindow(QMainWindow):
         self.th_f_max.setValue(data['f_max'])
         self._apply_thresholds()
         
-        # save info
-        self.test_info = data
-        
         # reset
-        self.test_data = []
-        self.v_viols = 0
-        self.i_viols = 0
-        self.f_viols = 0
-        self.test_start = datetime.now()
+        for st in self.session_stats.values():
+            st.reset()
         
         # clear buffers
-        self.time_buf.clear()
-        self.v_buf.clear()
-        self.i_buf.clear()
-        self.p_buf.clear()
-        self.f_buf.clear()
-        self.t0 = time.time()
+        self.buf.clear()
+        self.pyramid.clear()
+        
+        self.test.begin(data, self.writer, resume=resume, db=self.db,
+                        on_created=self._on_test_created, on_error=self._on_save_failed)
+        self.t0 = self.test.t0
         
         # ui
         self.testing = True
@@ -1529,61 +3125,95 @@ class MainWindow(QMainWindow):
         self.pass_btn.setEnabled(True)
         self.fail_btn.setEnabled(True)
         
-        self.test_timer.start(1000)
-        self.status.showMessage(f"Test started: {data['name']}")
+        self.frames.set_paused('duration', False)
+        self.status.showMessage(f"Test {'resumed' if resume else 'started'}: {data['name']}")
+        
+        if resume:
+            # the earlier recording can be hours long, its stats are read on a
+            # BackgroundCall. the verdict waits for them
+            self.stop_btn.setEnabled(False)
+            self.pass_btn.setEnabled(False)
+            self.fail_btn.setEnabled(False)
+            self.status.showMessage(f"Test resumed: {data['name']}, loading the recorded samples...")
+            rid = resume['id']
+            self._in_background(self._load_resumed, rid,
+                                on_done=lambda stats: self._on_resumed(rid, stats),
+                                on_error=lambda msg: self._on_resume_failed(rid, msg))
+    
+    def _check_interrupted(self, interrupted):
+        # offer to resume or close out tests the app went down in the middle of
+        for r in interrupted:
+            box = QMessageBox(self)
+            box.setIcon(QMessageBox.Warning)
+            box.setWindowTitle("Interrupted Test")
+            box.setText(
+                f"Test #{r['id']} - {r.get('name') or 'Untitled'} ({r.get('board') or 'N/A'}, "
+                f"{r.get('serial_num') or 'N/A'}) was interrupted after {r.get('duration') or 0:.0f}s.\n\n"
+                "Resume recording into it, or finalize it as ABORTED?"
+            )
+            resume_btn = box.addButton("Resume", QMessageBox.AcceptRole)
+            finalize_btn = box.addButton("Finalize", QMessageBox.DestructiveRole)
+            box.addButton("Later", QMessageBox.RejectRole)
+            resume_btn.setEnabled(not self.testing)
+            box.exec_()
+            
+            if box.clickedButton() is resume_btn:
+                self._resume_test(r)
+            elif box.clickedButton() is finalize_btn:
+                self.writer.submit('update_test', r['id'], {'status': 'ABORTED'},
+                                   on_done=lambda _: self._load_records(),
+                                   on_error=self._on_save_failed)
+    
+    def _resume_test(self, r):
+        data = {'name': r.get('name') or '', 'board': r.get('board') or '',
+                'serial': r.get('serial_num') or '', 'operator': r.get('operator') or '',
+                'v_min': 0, 'v_max': 50, 'i_min': 0, 'i_max': 5, 'f_min': 0, 'f_max': 100000,
+                'notes': ''}
+        try:
+            data.update(json.loads(r.get('params') or '{}'))
+        except ValueError:
+            pass
+        self._begin_test(data, resume=r)
+    
+    def _load_resumed(self, test_id):
+        # BackgroundCall thread
+        return self.test.load_stats(self.db.iter_samples(test_id))
+    
+    def _on_resumed(self, test_id, stats):
+        if not (self.testing and self.test.restoring and self.test.ref.value == test_id):
+            return
+        self.test.restore(stats)
+        self.stop_btn.setEnabled(True)
+        self.pass_btn.setEnabled(True)
+        self.fail_btn.setEnabled(True)
+        self.status.showMessage(f"Test resumed: {self.test.info.get('name', '')}")
+    
+    def _on_resume_failed(self, test_id, msg):
+        # carry on with the stats since the resume only
+        self._on_resumed(test_id, {})
+        self.status.showMessage(f"Could not read the recorded samples: {msg}")
     
     def _stop_test(self):
         self._finish_test("ABORTED")
     
+    def _checkpoint(self):
+        # every ckpt_interval s. the gui side is one swap of the recorder per
+        # running test (a few seconds of samples), encoding is on the writer
+        if self.testing:
+            self.test.checkpoint(self.writer, self._on_save_failed)
+        self.fixtures.checkpoint()
+    
     def _finish_test(self, status):
         if not self.testing:
             return
         
         self.testing = False
-        self.test_timer.stop()
-        
-        end = datetime.now()
-        duration = (end - self.test_start).total_seconds()
+        self.frames.set_paused('duration', True)
         
-        # calc stats
-        if self.test_data:
-            v_arr = np.array([d['voltage'] for d in self.test_data])
-            i_arr = np.array([d['current'] for d in self.test_data])
-            p_arr = np.array([d['power'] for d in self.test_data])
-            f_arr = np.array([d['frequency'] for d in self.test_data])
-        else:
-            v_arr = i_arr = p_arr = f_arr = np.array([0])
-        
-        # save
-        record = {
-            'name': self.test_info.get('name', ''),
-            'board': self.test_info.get('board', ''),
-            'serial_num': self.test_info.get('serial', ''),
-            'operator': self.test_info.get('operator', ''),
-            'start_time': self.test_start.isoformat(),
-            'end_time': end.isoformat(),
-            'duration': duration,
-            'status': status,
-            'v_min': float(np.min(v_arr)),
-            'v_max': float(np.max(v_arr)),
-            'v_avg': float(np.mean(v_arr)),
-            'i_min': float(np.min(i_arr)),
-            'i_max': float(np.max(i_arr)),
-            'i_avg': float(np.mean(i_arr)),
-            'p_min': float(np.min(p_arr)),
-            'p_max': float(np.max(p_arr)),
-            'p_avg': float(np.mean(p_arr)),
-            'f_min': float(np.min(f_arr)),
-            'f_max': float(np.max(f_arr)),
-            'f_avg': float(np.mean(f_arr)),
-            'v_violations': self.v_viols,
-            'i_violations': self.i_viols,
-            'f_violations': self.f_viols,
-            'notes': self.test_info.get('notes', ''),
-            'raw_data': json.dumps(self.test_data[-1000:])
-        }
-        
-        test_id = self.db.save_test(record)
+        # rest of the samples, then the final row
+        count = self.test.stats['V'].count
+        self.test.finish(status, self.writer, on_error=self._on_save_failed,
+                         on_saved=lambda record, test_id: self._on_test_saved(record, test_id, count))
         
         # reset ui
         self.test_label.setText("No active test")
@@ -1594,40 +3224,43 @@ class MainWindow(QMainWindow):
         self.stop_btn.setEnabled(False)
         self.pass_btn.setEnabled(False)
         self.fail_btn.setEnabled(False)
+    
+    def _on_test_created(self, record, test_id):
+        record['id'] = test_id
+        self.records_model.update_record(record)
+    
+    def _on_test_saved(self, record, test_id, count):
+        record['id'] = test_id
+        self.records_model.update_record(record)
+        self._update_record_stats()
         
-        self._load_records()
-        
+        # not modal, the operator can start the next board right away
         result_txt = {'PASS': 'PASSED', 'FAIL': 'FAILED', 'ABORTED': 'ABORTED'}
-        QMessageBox.information(
-            self, "Test Complete",
-            f"Test #{test_id}\nResult: {result_txt.get(status)}\nDuration: {duration:.1f}s\nSamples: {len(self.test_data)}"
+        box = QMessageBox(
+            QMessageBox.Information, "Test Complete",
+            f"Test #{test_id}\nResult: {result_txt.get(record['status'])}\nDuration: {record['duration']:.1f}s\nSamples: {count}",
+            QMessageBox.Ok, self
         )
-        
-        self.test_data = []
-        self.test_info = {}
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        box.setWindowModality(Qt.NonModal)
+        box.show()
+    
+    def _on_save_failed(self, msg):
+        QMessageBox.warning(self, "Error", f"Could not save test: {msg}")
     
     def _update_duration(self):
-        if self.test_start:
-            elapsed = datetime.now() - self.test_start
+        if self.testing:
+            elapsed = datetime.now() - self.test.start
             secs = int(elapsed.total_seconds())
             h, rem = divmod(secs, 3600)
             m, s = divmod(rem, 60)
             self.duration_label.setText(f"{h:02d}:{m:02d}:{s:02d}")
     
     def _load_records(self):
-        # clear
-        while self.records_layout.count():
-            item = self.records_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        
-        records = self.db.get_all_tests()
-        
-        for r in records[:50]:
-            card = TestCard(r)
-            card.clicked.connect(self._show_record)
-            self.records_layout.addWidget(card)
-        
+        self._reload_records()
+        self._update_record_stats()
+    
+    def _update_record_stats(self):
         stats = self.db.get_stats()
         self.total_lbl.setText(f"Total: {stats['total']}")
         self.pass_lbl.setText(f"Passed: {stats['passed']}")
@@ -1635,82 +3268,126 @@ class MainWindow(QMainWindow):
         self.rate_lbl.setText(f"Pass Rate: {stats['pass_rate']:.1f}%")
     
     def _search_records(self, query):
-        while self.records_layout.count():
-            item = self.records_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        
-        records = self.db.search(query) if query else self.db.get_all_tests()
-        
-        for r in records[:50]:
-            card = TestCard(r)
-            card.clicked.connect(self._show_record)
-            self.records_layout.addWidget(card)
+        # wait for typing to pause before querying
+        self.search_timer.start(self.search_delay)
     
     def _filter_records(self, status):
-        while self.records_layout.count():
-            item = self.records_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        
-        records = self.db.filter_by_status(status) if status != "All" else self.db.get_all_tests()
-        
-        for r in records[:50]:
-            card = TestCard(r)
-            card.clicked.connect(self._show_record)
-            self.records_layout.addWidget(card)
+        self._reload_records()
+    
+    def _reload_records(self):
+        self.search_timer.stop()
+        status = self.filter_cb.currentText()
+        self.search_worker.submit(self.search_edit.text(), None if status == "All" else status)
+    
+    def _on_search_results(self, gen, query, status, rows):
+        if gen != self.search_worker.gen:
+            return
+        # further pages come through canFetchMore/fetchMore on scroll
+        self.records_model.set_query(query, status, rows)
     
     def _show_record(self, rid):
         r = self.db.get_test(rid)
         if r:
-            dlg = TestDetailsDialog(r, self)
+            dlg = TestDetailsDialog(r, self, self.db)
             dlg.exec_()
     
     def _show_templates(self):
-        dlg = TemplatesDialog(self.db, self)
+        dlg = TemplatesDialog(self.db, self, self.writer)
         dlg.exec_()
     
     def _export_all(self):
-        fname, _ = QFileDialog.getSaveFileName(
-            self, "Export",
-            f"tests_{datetime.now().strftime('%Y%m%d')}.csv",
-            "CSV (*.csv)"
-        )
-        
-        if not fname:
+        if self.export_worker and self.export_worker.isRunning():
             return
         
-        records = self.db.get_all_tests()
-        if not records:
-            QMessageBox.information(self, "Info", "No records to export")
+        dlg = ExportDialog(self)
+        if dlg.exec_() != QDialog.Accepted:
             return
         
-        # get keys except raw_data
-        keys = [k for k in records[0].keys() if k != 'raw_data']
+        self.export_worker = w = ExportWorker(self.db, **dlg.get_options())
+        prog = QProgressDialog("Exporting records...", "Cancel", 0, 0, self)
+        prog.setWindowTitle("Export")
+        prog.setMinimumDuration(300)
+        prog.setAutoClose(False)
+        prog.setAutoReset(False)
+        prog.canceled.connect(w.cancel)
+        
+        def on_progress(n, total):
+            prog.setMaximum(max(total, n))
+            prog.setValue(n)
+        
+        def on_done(n):
+            prog.close()
+            if n:
+                QMessageBox.information(self, "Done", f"Exported {n} records")
+            else:
+                QMessageBox.information(self, "Info", "No records to export")
         
-        with open(fname, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
-            writer.writeheader()
-            for r in records:
-                row = {k: r[k] for k in keys}
-                writer.writerow(row)
+        def on_failed(msg):
+            prog.close()
+            QMessageBox.warning(self, "Export failed", msg)
         
-        QMessageBox.information(self, "Done", f"Exported {len(records)} records")
+        w.progress.connect(on_progress)
+        w.done.connect(on_done)
+        w.cancelled.connect(prog.close)
+        w.failed.connect(on_failed)
+        w.start()
     
     def _calc_stats(self):
-        data = {
-            'Voltage': np.array(self.v_buf),
-            'Current': np.array(self.i_buf),
-            'Power': np.array(self.p_buf),
-            'Frequency': np.array(self.f_buf)
-        }
+        names = {'V': 'Voltage', 'I': 'Current', 'P': 'Power', 'F': 'Frequency'}
+        for k, name in names.items():
+            st = self.session_stats[k]
+            if not st.count:
+                continue
+            lbls = self.stat_labels[name]
+            lbls['min'].setText(f"{st.min:.4f}")
+            lbls['max'].setText(f"{st.max:.4f}")
+            lbls['avg'].setText(f"{st.mean:.4f}")
+            lbls['std'].setText(f"{st.std:.4f}")
+            if k != 'P':
+                lbls['t_low'].setText(f"{st.t_low:.1f}")
+                lbls['t_high'].setText(f"{st.t_high:.1f}")
+    
+    def _set_diagnostics(self, on):
+        # off means no Diagnostics at all, the hot paths only see None
+        self.diag = Diagnostics() if on else None
+        self.serial.set_diag(self.diag)
+        self._diag_last = (time.monotonic(), 0)
+        self.frames.mark('diagnostics')
+    
+    def _reset_diagnostics(self):
+        if self.diag is not None:
+            self.diag.reset()
+            self._diag_last = (time.monotonic(), 0)
+            self.frames.mark('diagnostics')
+    
+    def _update_diagnostics(self):
+        diag = self.diag
+        if diag is None:
+            for lbl in self.diag_labels.values():
+                lbl.setText("---")
+            for lbls in self.diag_stage_labels.values():
+                for lbl in lbls.values():
+                    lbl.setText("---")
+            return
         
-        for name, arr in data.items():
-            if len(arr) > 0:
-                self.stat_labels[name]['min'].setText(f"{np.min(arr):.4f}")
-                self.stat_labels[name]['max'].setText(f"{np.max(arr):.4f}")
-                self.stat_labels[name]['avg'].setText(f"{np.mean(arr):.4f}")
-                self.stat_labels[name]['std'].setText(f"{np.std(arr):.4f}")
+        s = diag.summary()
+        now = time.monotonic()
+        then, samples = self._diag_last
+        self._diag_last = (now, s['samples'])
+        rate = (s['samples'] - samples) / (now - then) if now > then else 0.0
+        self.diag_labels['rate'].setText(f"{rate:.0f}")
+        for key in ("parse_errors", "bad_bytes", "dropped", "queued", "pending", "in_flight"):
+            self.diag_labels[key].setText(str(s[key]))
+        for stage, st in s['stages'].items():
+            lbls = self.diag_stage_labels[stage]
+            lbls['count'].setText(str(st['count']))
+            for key in ("p50", "p99", "max"):
+                lbls[key].setText(f"{st[key]:.2f}" if st['count'] else "---")
+    
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            self.frames.set_idle(self.isMinimized())
+        super().changeEvent(event)
     
     def closeEvent(self, event):
         if self.testing:
@@ -1720,6 +3397,15 @@ class MainWindow(QMainWindow):
             self._finish_test("ABORTED")
         
         self.serial.disconnect()
+        self.fixtures.shutdown()
+        self.writer.stop()
+        self.search_worker.stop()
+        if self.export_worker:
+            self.export_worker.cancel()
+            self.export_worker.wait()
+        for call in list(self._calls):
+            call.wait()
+        self.db.close()
         event.accept()
 
 
@@ -0,0 +1,79 @@
+# Database queries the records tab relies on.
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from boardtester.core import Database
+
+
+def record(name, board, serial, operator, status='PASS'):
+    rec = {
+        'name': name, 'board': board, 'serial_num': serial, 'operator': operator,
+        'start_time': "2024-01-01T08:00:00", 'end_time': "2024-01-01T08:01:00",
+        'duration': 60.0, 'status': status, 'notes': "", 'raw_data': "",
+        'v_violations': 0, 'i_violations': 0, 'f_violations': 0,
+    }
+    for k in "vipf":
+        rec[f"{k}_min"], rec[f"{k}_max"], rec[f"{k}_avg"] = 1.0, 2.0, 1.5
+    return rec
+
+
+@pytest.fixture(params=[True, False], ids=['fts', 'like'])
+def db(request, tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    if not request.param:
+        db.fts = False
+    for r in [record("Test_1", "PSU-12V", "P12000123", "ana"),
+              record("Test_2", "PSU-5V", "P05000456", "ben", 'FAIL'),
+              record("Test_3", "CTRL-A", "CTA000123", "ana"),
+              record("Test_4", "DRV-3", "DR3100_1%", "chen")]:
+        db.save_test(r)
+    yield db
+    db.close()
+
+
+def names(rows):
+    return sorted(r['name'] for r in rows)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("psu", ["Test_1", "Test_2"]),
+    ("ana 123", ["Test_1", "Test_3"]),
+    # short terms match anywhere too, not only as one substring
+    ("ana 12", ["Test_1", "Test_3"]),
+    ("12 ana", ["Test_1", "Test_3"]),
+    ("5V ben", ["Test_2"]),
+    ("b 5", ["Test_2"]),
+    ("psu ana 99", []),
+    # LIKE wildcards are literal
+    ("_1%", ["Test_4"]),
+    ("%", ["Test_4"]),
+])
+def test_search_terms(db, query, expected):
+    assert names(db.search(query)) == expected
+    assert names(db.get_page(query=query)) == expected
+
+
+def test_search_with_status(db):
+    assert names(db.search("P 0", status='FAIL')) == ["Test_2"]
+    assert names(db.get_page(query="ana", status='FAIL')) == []
+
+
+def test_release_closes_thread_connection(db):
+    def read():
+        assert len(db.get_page(limit=10)) == 4
+        db.release()
+    
+    threads = [threading.Thread(target=read) for _ in range(20)]
+    for t in threads:
+        t.start()
+        t.join()
+    # only the fixture's own connection is left
+    assert len(db._conns) == 1
+    db.release()
+    assert db._conns == []
+    assert len(db.get_page(limit=10)) == 4
@@ -0,0 +1,108 @@
+# TestSession against simulated devices, several fixtures on one database
+# like multi-fixture mode, written through SyncWriter. no qt needed.
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# aliased so pytest doesn't try to collect it
+from boardtester.core import Database, SimulatedDevice, SyncWriter, TestSession as Session
+
+RATE = 1000
+LIMITS = {'v_min': 0, 'v_max': 50, 'i_min': 0, 'i_max': 5, 'f_min': 0, 'f_max': 100000}
+
+
+def info(name, **limits):
+    d = {'name': name, 'board': 'PSU', 'serial': name, 'operator': 'test', 'notes': ''}
+    d.update(LIMITS, **limits)
+    return d
+
+
+def run(test, device, writer, seconds, block=100, checkpoint_every=5):
+    # feed seconds of samples in blocks on a steady clock, checkpointing now and then
+    fed = []
+    n = int(seconds * RATE)
+    for k, a in enumerate(range(0, n, block)):
+        t = test.t0 + (a + np.arange(1, block + 1)) / RATE
+        b = device._block(t)
+        test.feed(b['t'] - test.t0, b)
+        fed.append(b)
+        if k % checkpoint_every == checkpoint_every - 1:
+            test.checkpoint(writer)
+    return {k: np.concatenate([b[k] for b in fed]) for k in fed[0]}
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    yield db
+    db.close()
+
+
+def test_fixtures_keep_separate_stats(db):
+    writer = SyncWriter(db)
+    fixtures = [(Session(), SimulatedDevice(rate=RATE, v=v, seed=n))
+                for n, v in enumerate((5.0, 12.0, 24.0))]
+    for n, (test, _) in enumerate(fixtures):
+        test.begin(info(f"fx{n}"), writer)
+    fed = [run(test, dev, writer, 2.0) for test, dev in fixtures]
+
+    for (test, dev), b in zip(fixtures, fed):
+        st = test.stats['V']
+        assert st.count == len(b['V'])
+        assert st.mean == pytest.approx(b['V'].mean())
+        assert st.min == pytest.approx(b['V'].min())
+        assert abs(st.mean - dev.v) < dev.v * 0.02
+
+    ids = [test.ref.value for test, _ in fixtures]
+    assert len(set(ids)) == 3
+    for (test, _), test_id in zip(fixtures, ids):
+        row = db.get_test(test_id)
+        assert row['status'] == 'IN_PROGRESS'
+        assert row['v_avg'] == pytest.approx(test.stats['V'].mean, rel=1e-3)
+
+
+def test_in_progress_then_verdict(db):
+    writer = SyncWriter(db)
+    good, bad = Session(), Session()
+    good.begin(info("good"), writer)
+    # 12 V board against a 10 V limit
+    bad.begin(info("bad", v_max=10), writer)
+    assert db.get_test(good.ref.value)['status'] == 'IN_PROGRESS'
+    assert [r['id'] for r in db.get_interrupted()] == [good.ref.value, bad.ref.value]
+
+    run(good, SimulatedDevice(rate=RATE, seed=1), writer, 1.0)
+    run(bad, SimulatedDevice(rate=RATE, seed=2), writer, 1.0)
+    assert good.verdict() == 'PASS'
+    assert bad.verdict() == 'FAIL'
+
+    saved = []
+    for test in (good, bad):
+        test.finish(test.verdict(), writer, on_saved=lambda r, test_id: saved.append((r['status'], test_id)))
+    assert saved == [('PASS', good.ref.value), ('FAIL', bad.ref.value)]
+    assert db.get_interrupted() == []
+    row = db.get_test(bad.ref.value)
+    assert row['status'] == 'FAIL'
+    assert row['v_violations'] == bad.stats['V'].violations > 0
+    assert db.get_summary()['']['FAIL'] == 1
+
+
+def test_samples_round_trip(db):
+    writer = SyncWriter(db)
+    fixtures = [(Session(), SimulatedDevice(rate=RATE, v=v, seed=n)) for n, v in enumerate((5.0, 12.0))]
+    for n, (test, _) in enumerate(fixtures):
+        test.begin(info(f"fx{n}"), writer)
+    fed = [run(test, dev, writer, 1.5) for test, dev in fixtures]
+    for test, _ in fixtures:
+        test.finish('PASS', writer)
+
+    for (test, _), b in zip(fixtures, fed):
+        s = db.get_samples(test.ref.value)
+        assert len(s['time']) == len(b['t'])
+        np.testing.assert_allclose(s['time'], b['t'] - test.t0, atol=2e-6)
+        # stored as float32
+        np.testing.assert_allclose(s['voltage'], b['V'], rtol=1e-6)
+        np.testing.assert_allclose(s['current'], b['I'], rtol=1e-6)